@@ -17,6 +17,6 @@ class VeiculoIpirangaAdmin(admin.ModelAdmin):  # type: ignore[reportMissingTypeA
 class CertificadoVeiculoAdmin(admin.ModelAdmin):  # type: ignore[reportMissingTypeArgument]
     """Administração de Certificados de Veículos."""
 
-    list_display = ("nome", "veiculo", "status", "data_atualizacao")
-    search_fields = ("nome", "veiculo__placa")
-    list_filter = ("status", "data_criacao")
+    list_display = ("nome", "veiculo", "status", "data_vencimento", "data_atualizacao")
+    search_fields = ("nome", "numero_certificado", "veiculo__placa")
+    list_filter = ("status", "tipo_licenca", "data_vencimento", "data_criacao")
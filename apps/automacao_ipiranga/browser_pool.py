@@ -0,0 +1,200 @@
+"""Pool de navegadores Chromium reutilizáveis para a automação Ipiranga."""
+
+import asyncio
+import logging
+import os
+import threading
+from collections.abc import AsyncIterator, Coroutine
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from django.conf import settings
+from playwright.async_api import Browser, BrowserContext, Playwright, async_playwright
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _NavegadorDoPool:
+    """Navegador mantido pelo pool e seus contadores de uso."""
+
+    browser: Browser
+    usos: int = 0
+    contextos_ativos: int = 0
+    aposentado: bool = False
+
+
+class BrowserPool:
+    """Mantém navegadores Chromium aquecidos e entrega um BrowserContext novo a cada uso.
+
+    Cada navegador é reciclado após `max_usos` contextos entregues e é descartado
+    assim que deixa de responder (`is_connected()`), sendo substituído por um novo
+    na próxima solicitação.
+    """
+
+    def __init__(
+        self,
+        tamanho: int,
+        max_usos: int,
+        launch_options: dict[str, Any] | None = None,
+    ) -> None:
+        """Inicializa o pool sem lançar navegadores (lançamento sob demanda)."""
+        self._tamanho = max(1, tamanho)
+        self._max_usos = max_usos
+        self._launch_options = launch_options or {}
+        self._playwright: Playwright | None = None
+        self._navegadores: list[_NavegadorDoPool] = []
+        self._lock = asyncio.Lock()
+
+    async def _lancar_navegador(self) -> _NavegadorDoPool:
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+        browser = await self._playwright.chromium.launch(**self._launch_options)
+        logger.info("[BROWSER_POOL] Novo navegador Chromium lançado.")
+        return _NavegadorDoPool(browser=browser)
+
+    @staticmethod
+    async def _fechar_navegador(navegador: _NavegadorDoPool) -> None:
+        try:
+            await navegador.browser.close()
+            logger.info(f"[BROWSER_POOL] Navegador fechado após {navegador.usos} usos.")
+        except Exception as e:
+            logger.warning(f"[BROWSER_POOL] Erro ao fechar navegador: {e}")
+
+    async def _adquirir(self) -> _NavegadorDoPool:
+        """Escolhe um navegador saudável, lançando um novo se necessário."""
+        async with self._lock:
+            for navegador in list(self._navegadores):
+                if not navegador.browser.is_connected():
+                    logger.warning(
+                        "[BROWSER_POOL] Navegador desconectado detectado. Removendo do pool."
+                    )
+                    self._navegadores.remove(navegador)
+
+            disponiveis = [n for n in self._navegadores if not n.aposentado]
+            ociosos = [n for n in disponiveis if n.contextos_ativos == 0]
+            if ociosos:
+                navegador = ociosos[0]
+            elif len(disponiveis) < self._tamanho:
+                navegador = await self._lancar_navegador()
+                self._navegadores.append(navegador)
+            else:
+                navegador = min(disponiveis, key=lambda n: n.contextos_ativos)
+
+            navegador.usos += 1
+            navegador.contextos_ativos += 1
+            if self._max_usos and navegador.usos >= self._max_usos:
+                navegador.aposentado = True
+            return navegador
+
+    async def _liberar(self, navegador: _NavegadorDoPool) -> None:
+        """Devolve o navegador ao pool, fechando-o se já estiver aposentado."""
+        async with self._lock:
+            navegador.contextos_ativos -= 1
+            fechar = navegador.aposentado and navegador.contextos_ativos == 0
+            if fechar and navegador in self._navegadores:
+                self._navegadores.remove(navegador)
+        if fechar:
+            await self._fechar_navegador(navegador)
+
+    @asynccontextmanager
+    async def context(self, **context_options: Any) -> AsyncIterator[BrowserContext]:  # noqa: ANN401
+        """Entrega um BrowserContext isolado, fechado automaticamente ao final."""
+        navegador = await self._adquirir()
+        try:
+            contexto = await navegador.browser.new_context(**context_options)
+        except Exception:
+            navegador.aposentado = True
+            await self._liberar(navegador)
+            raise
+
+        try:
+            yield contexto
+        finally:
+            try:
+                await contexto.close()
+            except Exception as e:
+                logger.warning(f"[BROWSER_POOL] Erro ao fechar contexto: {e}")
+            await self._liberar(navegador)
+
+    async def close(self) -> None:
+        """Fecha todos os navegadores e encerra o driver do Playwright."""
+        async with self._lock:
+            navegadores, self._navegadores = self._navegadores, []
+        for navegador in navegadores:
+            await self._fechar_navegador(navegador)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+# Estado por thread: o pool fica preso ao event loop em que foi criado. Workers
+# Celery (prefork) executam as tarefas na thread principal de cada processo e
+# reutilizam nela um único loop persistente; outras threads (ex.: `runserver` com
+# Celery em modo eager) usam um loop e um pool próprios, encerrados a cada execução.
+class _EstadoDaThread(threading.local):
+    pid: int | None = None
+    loop: asyncio.AbstractEventLoop | None = None
+    pool: BrowserPool | None = None
+
+
+_estado = _EstadoDaThread()
+
+
+def _estado_atual() -> _EstadoDaThread:
+    if _estado.pid != os.getpid():
+        _estado.pid = os.getpid()
+        _estado.loop = None
+        _estado.pool = None
+    return _estado
+
+
+def get_browser_pool() -> BrowserPool:
+    """Retorna o pool de navegadores da thread atual, criando-o se necessário."""
+    estado = _estado_atual()
+    if estado.pool is None:
+        estado.pool = BrowserPool(
+            tamanho=settings.IPIRANGA_BROWSER_POOL_SIZE,
+            max_usos=settings.IPIRANGA_BROWSER_MAX_USES,
+            launch_options={"headless": settings.IPIRANGA_BROWSER_HEADLESS},
+        )
+    return estado.pool
+
+
+async def _executar_e_fechar_pool[T](coro: Coroutine[Any, Any, T]) -> T:
+    try:
+        return await coro
+    finally:
+        estado = _estado_atual()
+        pool, estado.pool = estado.pool, None
+        if pool is not None:
+            await pool.close()
+
+
+def run_in_worker_loop[T](coro: Coroutine[Any, Any, T]) -> T:
+    """Executa a corrotina no event loop persistente do processo atual.
+
+    Diferente de `asyncio.run`, o loop não é fechado ao final, permitindo que os
+    navegadores do pool sobrevivam entre execuções de tarefas. Fora da thread
+    principal (várias execuções simultâneas no mesmo processo), cada chamada usa
+    `asyncio.run` com um pool próprio, fechado ao final.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return asyncio.run(_executar_e_fechar_pool(coro))
+    estado = _estado_atual()
+    if estado.loop is None or estado.loop.is_closed():
+        estado.loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(estado.loop)
+    return estado.loop.run_until_complete(coro)
+
+
+def shutdown_browser_pool() -> None:
+    """Fecha o pool e o event loop da thread atual."""
+    estado = _estado_atual()
+    if estado.loop is not None and not estado.loop.is_closed():
+        if estado.pool is not None:
+            estado.loop.run_until_complete(estado.pool.close())
+        estado.loop.close()
+    estado.loop = None
+    estado.pool = None
@@ -0,0 +1,98 @@
+"""Extração em lote do DOM do portal Ipiranga.
+
+Cada função lê uma tabela ou um conjunto de painéis inteiro em uma única
+avaliação de JavaScript e devolve dados Python estruturados, evitando uma ida e
+volta ao navegador por linha (`.nth(i)` + `text_content()`).
+"""
+
+from dataclasses import dataclass
+from typing import Any, cast
+
+from playwright.async_api import Page
+
+SELETOR_TABELA_VEICULO = "table#tabela-veiculo"
+SELETOR_LINHAS_VEICULO = "table#tabela-veiculo tbody tr"
+SELETOR_LINK_ALTERAR = "a.btn.btn--square.alterar-veiculo-js"
+SELETOR_PAINEL_CERTIFICADO = "fieldset.certificado-box"
+
+_JS_LINHAS_VEICULO = """
+rows => rows.map(row => {
+    const celulaPlaca = row.querySelector('td:nth-child(2)');
+    const link = row.querySelector('a.alterar-veiculo-js');
+    return {
+        placa: (celulaPlaca && celulaPlaca.textContent || '').trim(),
+        href: link ? (link.getAttribute('href') || '') : '',
+    };
+})
+"""
+
+_JS_PAINEIS_CERTIFICADO = """
+fieldsets => fieldsets.map(fieldset => {
+    const titulo = fieldset.querySelector('.licenca-titulo .titulo.h3');
+    const badges = Array.from(fieldset.querySelectorAll('.badge--vermelho'));
+    const inputNumero = fieldset.querySelector("input[name^='licenca-numero-']");
+    return {
+        nome: (titulo && titulo.textContent || '').trim(),
+        vencido: badges.some(b => (b.textContent || '').toLowerCase().includes('vencido')),
+        numero_input_id: inputNumero ? (inputNumero.id || '') : '',
+    };
+})
+"""
+
+
+@dataclass(frozen=True)
+class LinhaVeiculo:
+    """Linha da tabela de veículos de uma listagem."""
+
+    indice: int
+    placa: str
+    href_edicao: str
+
+
+@dataclass(frozen=True)
+class PainelCertificado:
+    """Fieldset de certificado da aba de certificados do veículo."""
+
+    indice: int
+    nome: str
+    vencido: bool
+    numero_input_id: str
+
+    def corresponde(self, nome_certificado: str) -> bool:
+        """Indica se o painel se refere ao certificado informado."""
+        return nome_certificado.upper() in self.nome.upper()
+
+
+async def snapshot_tabela_veiculos(page: Page) -> list[LinhaVeiculo]:
+    """Lê todas as linhas de `table#tabela-veiculo` em uma única avaliação."""
+    linhas = cast(
+        list[dict[str, Any]],
+        await page.eval_on_selector_all(SELETOR_LINHAS_VEICULO, _JS_LINHAS_VEICULO),
+    )
+    return [
+        LinhaVeiculo(
+            indice=i,
+            placa=str(linha.get("placa", "")),
+            href_edicao=str(linha.get("href", "")),
+        )
+        for i, linha in enumerate(linhas)
+    ]
+
+
+async def snapshot_paineis_certificado(page: Page) -> list[PainelCertificado]:
+    """Lê todos os `fieldset.certificado-box` em uma única avaliação."""
+    paineis = cast(
+        list[dict[str, Any]],
+        await page.eval_on_selector_all(
+            SELETOR_PAINEL_CERTIFICADO, _JS_PAINEIS_CERTIFICADO
+        ),
+    )
+    return [
+        PainelCertificado(
+            indice=i,
+            nome=str(painel.get("nome", "")),
+            vencido=bool(painel.get("vencido")),
+            numero_input_id=str(painel.get("numero_input_id", "")),
+        )
+        for i, painel in enumerate(paineis)
+    ]
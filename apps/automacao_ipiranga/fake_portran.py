@@ -0,0 +1,342 @@
+"""Servidor local que imita as partes do portal Portran usadas pela automação.
+
+Reproduz o formulário de login (incluindo a página ocasional de "Erro Inesperado"),
+as listagens `table#tabela-veiculo`, os fieldsets de certificado com o badge
+"Vencido", o envio do certificado via XHR e o redirecionamento de `botaoAtualizar`.
+Serve para medir certificados/minuto e detectar regressões de desempenho sem
+acessar o portal real. Use com o perfil `core.settings_fake_portran`.
+"""
+
+import html
+import random
+import re
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PREFIXO = "/WAPortranNew"
+COOKIE_SESSAO = "sessao_portran_falso"
+TIPOS_CERTIFICADO = ("CIPP", "CIV")
+
+
+def placa_falsa(indice: int) -> str:
+    """Placa do veículo de índice `indice` da frota falsa."""
+    return f"FAK{indice:04d}"
+
+
+@dataclass
+class ConfiguracaoPortranFalso:
+    """Parâmetros do portal falso."""
+
+    tamanho_frota: int = 100
+    latencia_ms: int = 150
+    jitter_ms: int = 50
+    taxa_erro_login: float = 0.1
+    ttl_sessao: int = 1800
+    seed: int | None = None
+
+
+@dataclass
+class CertificadoFalso:
+    """Certificado de um veículo do portal falso."""
+
+    id: int
+    tipo: str
+    vencido: bool
+
+
+@dataclass
+class VeiculoFalso:
+    """Veículo do portal falso e seus certificados."""
+
+    placa: str
+    listagem: str
+    certificados: list[CertificadoFalso] = field(default_factory=list[CertificadoFalso])
+
+
+class EstadoPortranFalso:
+    """Frota e sessões do portal falso, compartilhadas entre as threads do servidor."""
+
+    def __init__(self, config: ConfiguracaoPortranFalso) -> None:
+        """Gera a frota: todo veículo tem o CIPP vencido; 1 em cada 5 também o CIV."""
+        self.config = config
+        self.random = random.Random(config.seed)  # Não é uso criptográfico.
+        self.lock = threading.Lock()
+        self.sessoes: dict[str, float] = {}
+        self.erro_exibido: set[str] = set()
+        self.veiculos: dict[str, VeiculoFalso] = {}
+        self.resetar()
+
+    def resetar(self) -> None:
+        """Restaura a frota ao estado inicial."""
+        with self.lock:
+            self.veiculos = {}
+            proximo_id = 1
+            for i in range(1, self.config.tamanho_frota + 1):
+                veiculo = VeiculoFalso(
+                    placa=placa_falsa(i), listagem="2" if i % 2 else "3"
+                )
+                for tipo in TIPOS_CERTIFICADO:
+                    vencido = tipo == "CIPP" or i % 5 == 0
+                    veiculo.certificados.append(
+                        CertificadoFalso(id=proximo_id, tipo=tipo, vencido=vencido)
+                    )
+                    proximo_id += 1
+                self.veiculos[veiculo.placa] = veiculo
+
+    def criar_sessao(self) -> str:
+        """Cria uma sessão autenticada e retorna seu token."""
+        token = secrets.token_hex(16)
+        with self.lock:
+            self.sessoes[token] = time.time() + self.config.ttl_sessao
+        return token
+
+    def sessao_valida(self, token: str | None) -> bool:
+        """Indica se o token corresponde a uma sessão não expirada."""
+        with self.lock:
+            return bool(token) and self.sessoes.get(token or "", 0) > time.time()
+
+
+_PAGINA = """<!DOCTYPE html>
+<html lang="pt-br"><head><meta charset="utf-8"><title>Portran (falso)</title></head>
+<body>{corpo}</body></html>"""
+
+_JS_VEICULO = """
+<script>
+document.getElementById('certificados-tab').addEventListener('click', e => {
+    e.preventDefault();
+    document.getElementById('certificados').style.display = 'block';
+});
+document.querySelectorAll('.btn-atualizar-requisito').forEach(b => b.addEventListener('click', () => {
+    b.closest('fieldset').querySelector('.requisito').style.display = 'block';
+}));
+document.querySelectorAll('.enviar-certificado').forEach(b => b.addEventListener('click', async () => {
+    const fieldset = b.closest('fieldset');
+    const dados = new FormData();
+    fieldset.querySelectorAll('.requisito input').forEach(i => {
+        if (i.type === 'file') { if (i.files[0]) dados.append(i.name, i.files[0]); }
+        else dados.append(i.name, i.value);
+    });
+    const resposta = await fetch(fieldset.dataset.upload, {method: 'POST', body: dados});
+    const badge = fieldset.querySelector('.badge--vermelho');
+    if (resposta.ok && badge) { badge.className = 'badge badge--amarelo'; badge.textContent = 'Em análise'; }
+}));
+document.getElementById('botaoAtualizar').addEventListener('click', async e => {
+    e.preventDefault();
+    const resposta = await fetch(e.currentTarget.dataset.salvar, {method: 'POST'});
+    if (resposta.ok) window.location.href = '%(prefixo)s/veiculo/index';
+});
+</script>
+"""
+
+
+class PortranFalsoHandler(BaseHTTPRequestHandler):
+    """Responde às rotas do portal falso."""
+
+    server_version = "PortranFalso/1.0"
+    estado: EstadoPortranFalso
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002, PLR6301
+        """Silencia o log de acesso padrão do http.server."""
+        return
+
+    def _latencia(self) -> None:
+        atraso = self.estado.config.latencia_ms + self.estado.random.randint(
+            0, max(0, self.estado.config.jitter_ms)
+        )
+        time.sleep(atraso / 1000)
+
+    def _token(self) -> str | None:
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get(COOKIE_SESSAO)
+        return morsel.value if morsel else None
+
+    def _responder(
+        self,
+        corpo: str,
+        status: HTTPStatus = HTTPStatus.OK,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        dados = corpo.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        for nome, valor in (headers or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _redirecionar(
+        self, caminho: str, headers: dict[str, str] | None = None
+    ) -> None:
+        self._responder(
+            "", HTTPStatus.SEE_OTHER, {"Location": caminho, **(headers or {})}
+        )
+
+    def _exigir_sessao(self) -> bool:
+        if self.estado.sessao_valida(self._token()):
+            return True
+        self._redirecionar(f"{PREFIXO}/usuario/exibir")
+        return False
+
+    def _descartar_corpo(self) -> None:
+        restante = int(self.headers.get("Content-Length", "0") or 0)
+        while restante > 0:
+            restante -= len(self.rfile.read(min(restante, 65536)))
+
+    def do_GET(self) -> None:
+        """Trata as rotas GET."""
+        self._latencia()
+        url = urlparse(self.path)
+        caminho = url.path
+        if caminho == f"{PREFIXO}/usuario/exibir":
+            self._pagina_login()
+        elif caminho == f"{PREFIXO}/usuario/erro":
+            self._pagina_erro_login()
+        elif not self._exigir_sessao():
+            return
+        elif caminho == f"{PREFIXO}/dashboard/index":
+            self._responder(_PAGINA.format(corpo="<h1>Dashboard</h1>"))
+        elif caminho == f"{PREFIXO}/veiculo/index":
+            situacao = parse_qs(url.query).get("situacoesDocumentos", [""])[0]
+            self._pagina_listagem(situacao)
+        elif match := re.fullmatch(rf"{PREFIXO}/veiculo/alterar/(\w+)", caminho):
+            self._pagina_veiculo(match.group(1))
+        else:
+            self._responder("Não encontrado", HTTPStatus.NOT_FOUND)
+
+    def do_POST(self) -> None:
+        """Trata as rotas POST."""
+        self._latencia()
+        caminho = urlparse(self.path).path
+        self._descartar_corpo()
+        if caminho == f"{PREFIXO}/usuario/autenticar":
+            self._autenticar()
+        elif caminho == "/__fake__/reset":
+            self.estado.resetar()
+            # O corpo informa o tamanho da frota (usado pelo benchmark).
+            self._responder(str(self.estado.config.tamanho_frota))
+        elif not self._exigir_sessao():
+            return
+        elif match := re.fullmatch(
+            rf"{PREFIXO}/veiculo/certificado/(\w+)/(\d+)", caminho
+        ):
+            self._enviar_certificado(match.group(1), int(match.group(2)))
+        elif re.fullmatch(rf"{PREFIXO}/veiculo/salvar/\w+", caminho):
+            self._responder("ok")
+        else:
+            self._responder("Não encontrado", HTTPStatus.NOT_FOUND)
+
+    def _pagina_login(self) -> None:
+        self._responder(
+            _PAGINA.format(
+                corpo=f"""
+<form method="post" action="{PREFIXO}/usuario/autenticar">
+  <input id="codigoUsuario" name="codigoUsuario">
+  <input id="senha" name="senha" type="password">
+  <input type="submit" value="Autenticar">
+</form>"""
+            )
+        )
+
+    def _autenticar(self) -> None:
+        token = self.estado.criar_sessao()
+        cookie = {"Set-Cookie": f"{COOKIE_SESSAO}={token}; Path=/; HttpOnly"}
+        if self.estado.random.random() < self.estado.config.taxa_erro_login:
+            self._redirecionar(f"{PREFIXO}/usuario/erro", cookie)
+        else:
+            self._redirecionar(f"{PREFIXO}/dashboard/index", cookie)
+
+    def _pagina_erro_login(self) -> None:
+        # Como no portal real, atualizar a página após o erro conclui o login.
+        token = self._token() or ""
+        with self.estado.lock:
+            primeira_exibicao = token not in self.estado.erro_exibido
+            self.estado.erro_exibido.add(token)
+        if primeira_exibicao or not self.estado.sessao_valida(token):
+            self._responder(
+                _PAGINA.format(corpo="<p>Erro Inesperado. Favor tente novamente.</p>")
+            )
+        else:
+            self._redirecionar(f"{PREFIXO}/dashboard/index")
+
+    def _pagina_listagem(self, situacao: str) -> None:
+        with self.estado.lock:
+            veiculos = [
+                v
+                for v in self.estado.veiculos.values()
+                if not situacao or v.listagem == situacao
+            ]
+        linhas = "".join(
+            f"""<tr><td>{i}</td><td>{html.escape(v.placa)}</td><td>
+<a class="btn btn--square alterar-veiculo-js" href="{PREFIXO}/veiculo/alterar/{v.placa}">Alterar</a>
+</td></tr>"""
+            for i, v in enumerate(veiculos, start=1)
+        )
+        self._responder(
+            _PAGINA.format(
+                corpo=f"""<table id="tabela-veiculo">
+<thead><tr><th>#</th><th>Placa</th><th></th></tr></thead><tbody>{linhas}</tbody></table>"""
+            )
+        )
+
+    def _pagina_veiculo(self, placa: str) -> None:
+        with self.estado.lock:
+            veiculo = self.estado.veiculos.get(placa)
+            certificados = list(veiculo.certificados) if veiculo else []
+        if veiculo is None:
+            self._responder("Veículo não encontrado", HTTPStatus.NOT_FOUND)
+            return
+        fieldsets = "".join(
+            f"""
+<fieldset class="certificado-box" data-upload="{PREFIXO}/veiculo/certificado/{placa}/{c.id}">
+  <div class="licenca-titulo"><span class="titulo h3">{c.tipo}</span>
+{'<span class="badge badge--vermelho">Vencido</span>' if c.vencido else '<span class="badge badge--verde">Em dia</span>'}
+  </div>
+  <button type="button" class="btn-atualizar-requisito">Atualizar</button>
+  <div class="requisito" style="display:none">
+<input name="licenca-numero-{c.id}" id="licenca-numero-{c.id}">
+<input name="licenca-vencimento-{c.id}" id="licenca-vencimento-{c.id}">
+<input type="file" name="licenca-arquivo-{c.id}">
+<button type="button" class="enviar-certificado">Enviar novo certificado</button>
+  </div>
+</fieldset>"""
+            for c in certificados
+        )
+        self._responder(
+            _PAGINA.format(
+                corpo=f"""
+<h1>Veículo {html.escape(placa)}</h1>
+<a id="certificados-tab" href="#certificados">Certificados</a>
+<div id="certificados" style="display:none">{fieldsets}</div>
+<a id="botaoAtualizar" href="#" data-salvar="{PREFIXO}/veiculo/salvar/{placa}">Salvar</a>
+{_JS_VEICULO % {"prefixo": PREFIXO}}"""
+            )
+        )
+
+    def _enviar_certificado(self, placa: str, certificado_id: int) -> None:
+        with self.estado.lock:
+            veiculo = self.estado.veiculos.get(placa)
+            for certificado in veiculo.certificados if veiculo else []:
+                if certificado.id == certificado_id:
+                    certificado.vencido = False
+        self._responder("ok")
+
+
+def criar_servidor(
+    host: str, porta: int, config: ConfiguracaoPortranFalso
+) -> ThreadingHTTPServer:
+    """Cria o servidor HTTP do portal falso (sem iniciá-lo) com uma frota nova."""
+    handler = type(
+        "PortranFalsoHandlerConfigurado",
+        (PortranFalsoHandler,),
+        {"estado": EstadoPortranFalso(config)},
+    )
+    servidor = ThreadingHTTPServer((host, porta), handler)
+    servidor.daemon_threads = True
+    return servidor
@@ -0,0 +1,107 @@
+"""Fila de trabalho dos certificados, sobre a própria tabela `CertificadoVeiculo`.
+
+Um worker reserva certificados (status "processando") numa transação com
+`SELECT ... FOR UPDATE SKIP LOCKED`: workers concorrentes reservam linhas
+diferentes sem esperar uns pelos outros, e a tentativa é contada no mesmo `UPDATE`,
+com `F()`. A reserva de um worker que morreu expira após
+`IPIRANGA_QUEUE_CLAIM_TIMEOUT` segundos e o certificado volta a ser elegível.
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.automacao_ipiranga.models import CertificadoVeiculo
+from apps.automacao_ipiranga.status_stream import publicar_status
+
+
+def _elegiveis(agora: datetime) -> Q:
+    """Certificados pendentes ou reservados por um worker cuja reserva expirou."""
+    expiracao = agora - timedelta(seconds=settings.IPIRANGA_QUEUE_CLAIM_TIMEOUT)
+    return Q(status="pendente") | Q(status="processando", reservado_em__lt=expiracao)
+
+
+def _marcar_reservados(certificado_ids: list[int], agora: datetime) -> None:
+    CertificadoVeiculo.objects.filter(pk__in=certificado_ids).update(
+        status="processando",
+        reservado_em=agora,
+        tentativas_automacao=F("tentativas_automacao") + 1,
+        data_atualizacao=agora,
+    )
+
+
+def reservar_proximos_certificados(limite: int) -> list[int]:
+    """Reserva os certificados elegíveis mais antigos e conta uma tentativa de cada.
+
+    A seleção e a reserva ocorrem na mesma transação: as linhas ficam travadas até
+    o `UPDATE`, e linhas sendo reservadas por outro worker neste instante são
+    puladas.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        certificado_ids = list(
+            CertificadoVeiculo.objects.select_for_update(skip_locked=True)
+            .filter(_elegiveis(agora))
+            .order_by("data_criacao")
+            .values_list("pk", flat=True)[:limite]
+        )
+        if certificado_ids:
+            _marcar_reservados(certificado_ids, agora)
+    publicar_status(certificado_ids)
+    return certificado_ids
+
+
+def reservar_certificados(certificado_ids: list[int]) -> list[int]:
+    """Reserva os certificados informados e conta uma tentativa de cada.
+
+    Só certificados pendentes (ou de reserva expirada) são reservados: os com status
+    final, os reservados por outro worker e os travados por outra reserva em
+    andamento ficam de fora.
+
+    Returns:
+        Os IDs efetivamente reservados, na ordem recebida.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        livres = set(
+            CertificadoVeiculo.objects.select_for_update(skip_locked=True)
+            .filter(pk__in=certificado_ids)
+            .filter(_elegiveis(agora))
+            .values_list("pk", flat=True)
+        )
+        if livres:
+            _marcar_reservados(list(livres), agora)
+    publicar_status(livres)
+    return [
+        certificado_id for certificado_id in certificado_ids if certificado_id in livres
+    ]
+
+
+def marcar_falha_em_processamento(certificado_ids: list[int], mensagem: str) -> int:
+    """Marca como falha os certificados que ainda estão reservados (sem status final)."""
+    marcados = CertificadoVeiculo.objects.filter(
+        pk__in=certificado_ids, status="processando"
+    ).update(
+        status="falha", error_message=mensagem[:500], data_atualizacao=timezone.now()
+    )
+    if marcados:
+        publicar_status(certificado_ids)
+    return marcados
+
+
+def devolver_a_fila(certificado_ids: list[int]) -> int:
+    """Desfaz a reserva de certificados adiados, sem contar a tentativa."""
+    devolvidos = CertificadoVeiculo.objects.filter(
+        pk__in=certificado_ids, status="processando"
+    ).update(
+        status="pendente",
+        reservado_em=None,
+        tentativas_automacao=F("tentativas_automacao") - 1,
+        data_atualizacao=timezone.now(),
+    )
+    if devolvidos:
+        publicar_status(certificado_ids)
+    return devolvidos
@@ -0,0 +1,226 @@
+"""Leitura das páginas somente-leitura do portal Ipiranga via HTTP, sem renderização.
+
+As listagens de veículos e a página do veículo são buscadas com o
+`APIRequestContext` do próprio BrowserContext, que compartilha os cookies da sessão
+autenticada e o pool de conexões do navegador. O HTML é interpretado com o
+`html.parser` da biblioteca padrão e devolvido nos mesmos dataclasses de
+`dom_snapshot`, de modo que o navegador fica reservado para o upload e o salvamento.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from http import HTTPStatus
+from urllib.parse import urlparse
+
+from django.conf import settings
+from playwright.async_api import Error as PlaywrightError
+
+from apps.automacao_ipiranga.dom_snapshot import LinhaVeiculo, PainelCertificado
+from apps.automacao_ipiranga.readiness import EsperasPagina
+from apps.common.rate_limit import aguardar_vez_portran, registrar_erro_portran
+
+_ELEMENTOS_VAZIOS = frozenset({
+    "area",
+    "base",
+    "br",
+    "col",
+    "embed",
+    "hr",
+    "img",
+    "input",
+    "link",
+    "meta",
+    "source",
+    "track",
+    "wbr",
+})
+
+
+@dataclass
+class _No:
+    """Elemento HTML mínimo: tag, atributos, filhos e texto direto."""
+
+    tag: str
+    atributos: dict[str, str]
+    filhos: list["_No"] = field(default_factory=list["_No"])
+    textos: list[str] = field(default_factory=list[str])
+
+    @property
+    def classes(self) -> set[str]:
+        return set(self.atributos.get("class", "").split())
+
+    def descendentes(self) -> list["_No"]:
+        """Todos os descendentes, em ordem de documento."""
+        resultado: list[_No] = []
+        pilha = list(reversed(self.filhos))
+        while pilha:
+            no = pilha.pop()
+            resultado.append(no)
+            pilha.extend(reversed(no.filhos))
+        return resultado
+
+    def texto(self) -> str:
+        """Texto do elemento e de seus descendentes."""
+        partes = list(self.textos)
+        for no in self.descendentes():
+            partes.extend(no.textos)
+        return " ".join(" ".join(partes).split())
+
+
+class _ConstrutorArvore(HTMLParser):
+    """Monta uma árvore de `_No` tolerante a tags não fechadas."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.raiz = _No("#documento", {})
+        self._pilha = [self.raiz]
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        no = _No(tag, {nome: valor or "" for nome, valor in attrs})
+        self._pilha[-1].filhos.append(no)
+        if tag not in _ELEMENTOS_VAZIOS:
+            self._pilha.append(no)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self._pilha[-1].filhos.append(
+            _No(tag, {nome: valor or "" for nome, valor in attrs})
+        )
+
+    def handle_endtag(self, tag: str) -> None:
+        # Fecha até a tag correspondente; tags de fechamento órfãs são ignoradas.
+        for i in range(len(self._pilha) - 1, 0, -1):
+            if self._pilha[i].tag == tag:
+                del self._pilha[i:]
+                return
+
+    def handle_data(self, data: str) -> None:
+        self._pilha[-1].textos.append(data)
+
+
+def _arvore(html: str) -> _No:
+    construtor = _ConstrutorArvore()
+    construtor.feed(html)
+    construtor.close()
+    return construtor.raiz
+
+
+def extrair_tabela_veiculos(html: str) -> list[LinhaVeiculo] | None:
+    """Lê as linhas de `table#tabela-veiculo`, ou None se a tabela não estiver no HTML.
+
+    A ausência da tabela indica que a página a monta via JavaScript (ou que a sessão
+    expirou); nesse caso o chamador deve recorrer ao navegador.
+    """
+    tabela = next(
+        (
+            no
+            for no in _arvore(html).descendentes()
+            if no.tag == "table" and no.atributos.get("id") == "tabela-veiculo"
+        ),
+        None,
+    )
+    if tabela is None:
+        return None
+    corpo = next((no for no in tabela.descendentes() if no.tag == "tbody"), None)
+    if corpo is None:
+        return None
+
+    linhas: list[LinhaVeiculo] = []
+    for linha in (no for no in corpo.filhos if no.tag == "tr"):
+        celulas = [no for no in linha.filhos if no.tag == "td"]
+        link = next(
+            (
+                no
+                for no in linha.descendentes()
+                if no.tag == "a" and "alterar-veiculo-js" in no.classes
+            ),
+            None,
+        )
+        linhas.append(
+            LinhaVeiculo(
+                indice=len(linhas),
+                placa=celulas[1].texto() if len(celulas) > 1 else "",
+                href_edicao=link.atributos.get("href", "") if link else "",
+            )
+        )
+    return linhas
+
+
+def extrair_paineis_certificado(html: str) -> list[PainelCertificado]:
+    """Lê os `fieldset.certificado-box` da página do veículo."""
+    paineis: list[PainelCertificado] = []
+    for fieldset in _arvore(html).descendentes():
+        if fieldset.tag != "fieldset" or "certificado-box" not in fieldset.classes:
+            continue
+        descendentes = fieldset.descendentes()
+        cabecalho = next(
+            (no for no in descendentes if "licenca-titulo" in no.classes), None
+        )
+        titulo = next(
+            (
+                no
+                for no in (cabecalho.descendentes() if cabecalho else [])
+                if {"titulo", "h3"} <= no.classes
+            ),
+            None,
+        )
+        input_numero = next(
+            (
+                no
+                for no in descendentes
+                if no.tag == "input"
+                and no.atributos.get("name", "").startswith("licenca-numero-")
+            ),
+            None,
+        )
+        paineis.append(
+            PainelCertificado(
+                indice=len(paineis),
+                nome=titulo.texto() if titulo else "",
+                vencido=any(
+                    "badge--vermelho" in no.classes and "vencido" in no.texto().lower()
+                    for no in descendentes
+                ),
+                numero_input_id=input_numero.atributos.get("id", "")
+                if input_numero
+                else "",
+            )
+        )
+    return paineis
+
+
+async def buscar_html(
+    esperas: EsperasPagina, etapa: str, url: str, timeout_ms: float = 30000
+) -> str | None:
+    """Busca a página com os cookies do contexto, sem renderizá-la.
+
+    Retorna None quando a resposta não é utilizável (erro HTTP ou redirecionamento
+    para o login), para que o chamador recorra ao navegador. O sucesso junto ao
+    portal (`registrar_sucesso_portran`) fica a cargo do chamador, depois de
+    confirmar que o HTML traz o que ele precisa.
+    """
+    logger: logging.Logger = esperas.logger
+    with esperas.medir(etapa, "http"):
+        await aguardar_vez_portran("navegacao")
+        try:
+            resposta = await esperas.page.context.request.get(
+                url, timeout=esperas.timeout_ms(timeout_ms, etapa)
+            )
+        except PlaywrightError as e:
+            logger.warning(f"[HTTP] Falha ao buscar {url}: {e}")
+            return None
+        try:
+            if not resposta.ok:
+                logger.warning(f"[HTTP] {url} respondeu {resposta.status}.")
+                if resposta.status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                    await registrar_erro_portran()
+                return None
+            if (
+                urlparse(resposta.url).path
+                == urlparse(settings.IPIRANGA_LOGIN_URL).path
+            ):
+                logger.warning(f"[HTTP] {url} redirecionou para o login.")
+                return None
+            return await resposta.text()
+        finally:
+            await resposta.dispose()
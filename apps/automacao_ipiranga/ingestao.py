@@ -0,0 +1,188 @@
+"""Ingestão em lote dos arquivos de certificado enviados pelo dashboard.
+
+Todos os nomes de arquivo são interpretados antes de tocar o banco e os arquivos
+são copiados para o storage fora do event loop. Os veículos são resolvidos com uma
+consulta (mais um `bulk_create` para os novos) e os certificados inseridos com um
+único `bulk_create`, na mesma transação. Como `bulk_create` não dispara `post_save`,
+a automação é agendada uma única vez para o lote, após o commit.
+
+O storage é endereçado pelo SHA-256 do conteúdo: o reenvio de um PDF já
+registrado para o mesmo veículo (pendente, em processamento ou enviado) devolve o
+certificado existente, sem criar outro nem visitar o portal de novo.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import cast
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.db.models import FileField
+
+from apps.automacao_ipiranga.models import CertificadoVeiculo, VeiculoIpiranga
+from apps.automacao_ipiranga.tasks import agendar_veiculos_task
+from apps.common.services import (
+    ExtractedCertificateData,
+    extract_certificate_data_from_filename,
+)
+from apps.common.storage import ContentAddressedStorage
+
+# Certificados que um reenvio do mesmo arquivo reaproveita; após uma falha, o
+# reenvio cria um novo certificado (nova tentativa).
+STATUS_REAPROVEITAVEIS = ("pendente", "processando", "enviado")
+
+
+@dataclass
+class ArquivoIngerido:
+    """Resultado da ingestão de um arquivo, na ordem de envio."""
+
+    file_name: str
+    status: str  # "salvo", "duplicado", "erro_validacao" ou "erro_interno"
+    dados: ExtractedCertificateData | None = None
+    certificado: CertificadoVeiculo | None = None
+    error_message: str = ""
+
+
+def _resolver_veiculos(placas: set[str]) -> dict[str, VeiculoIpiranga]:
+    """Busca os veículos das placas, criando os que não existem."""
+    veiculos = VeiculoIpiranga.objects.in_bulk(placas, field_name="placa")
+    novas = placas - veiculos.keys()
+    if novas:
+        # ignore_conflicts: outra requisição pode ter criado a mesma placa.
+        VeiculoIpiranga.objects.bulk_create(
+            [VeiculoIpiranga(placa=placa) for placa in novas], ignore_conflicts=True
+        )
+        veiculos.update(VeiculoIpiranga.objects.in_bulk(novas, field_name="placa"))
+    return veiculos
+
+
+def _interpretar(
+    arquivos: list[UploadedFile], logger: logging.Logger
+) -> list[ArquivoIngerido]:
+    resultados: list[ArquivoIngerido] = []
+    for arquivo in arquivos:
+        file_name = str(arquivo.name)
+        try:
+            dados = extract_certificate_data_from_filename(file_name, logger)
+            resultados.append(ArquivoIngerido(file_name, "salvo", dados=dados))
+        except ValueError as ve:
+            logger.warning(f"[POST] Erro de validação do nome do arquivo: {ve}")
+            resultados.append(
+                ArquivoIngerido(file_name, "erro_validacao", error_message=str(ve))
+            )
+    return resultados
+
+
+def _salvar_arquivo(arquivo: UploadedFile, file_name: str) -> str:
+    """Grava o upload no storage do campo `arquivo` (move o temporário do handler)."""
+    campo = cast(FileField, CertificadoVeiculo._meta.get_field("arquivo"))
+    nome = campo.generate_filename(None, file_name)
+    return campo.storage.save(nome, arquivo, max_length=campo.max_length)
+
+
+def _falhar(
+    resultado: ArquivoIngerido, erro: Exception, logger: logging.Logger
+) -> None:
+    resultado.status = "erro_interno"
+    resultado.certificado = None
+    resultado.error_message = (
+        f"Erro CRÍTICO ao salvar certificado no banco de dados: {erro}"
+    )
+    logger.critical(f"[POST] {resultado.error_message}", exc_info=erro)
+
+
+def _inserir(
+    gravados: list[tuple[ArquivoIngerido, ExtractedCertificateData, str]],
+    logger: logging.Logger,
+) -> None:
+    """Insere os certificados cujos arquivos já estão no storage, em uma transação.
+
+    Arquivos cujo conteúdo já está registrado para o veículo (inclusive repetidos no
+    próprio lote) apontam para o certificado existente e ficam como "duplicado".
+    """
+    try:
+        with transaction.atomic():
+            veiculos = _resolver_veiculos({dados.placa for _, dados, _ in gravados})
+            existentes: dict[tuple[int, str], CertificadoVeiculo] = {
+                (certificado.veiculo_id, certificado.arquivo_sha256): certificado  # type: ignore[reportAttributeAccessIssue]
+                for certificado in CertificadoVeiculo.objects.filter(
+                    veiculo__in=veiculos.values(),
+                    arquivo_sha256__in={
+                        ContentAddressedStorage.sha256_do_nome(nome) or ""
+                        for _, _, nome in gravados
+                    }
+                    - {""},
+                    status__in=STATUS_REAPROVEITAVEIS,
+                ).order_by("data_criacao")
+            }
+            novos: list[CertificadoVeiculo] = []
+            for resultado, dados, nome_arquivo in gravados:
+                veiculo = veiculos[dados.placa]
+                sha256 = ContentAddressedStorage.sha256_do_nome(nome_arquivo) or ""
+                existente = existentes.get((veiculo.id, sha256)) if sha256 else None
+                if existente is not None:
+                    resultado.status = "duplicado"
+                    resultado.certificado = existente
+                    continue
+                certificado = CertificadoVeiculo(
+                    veiculo=veiculo,
+                    nome=dados.tipo_licenca,
+                    tipo_licenca=dados.tipo_licenca,
+                    numero_certificado=dados.numero_certificado,
+                    data_vencimento=dados.data_vencimento,
+                    arquivo_sha256=sha256,
+                    status="pendente",
+                )
+                certificado.arquivo.name = nome_arquivo
+                resultado.certificado = certificado
+                novos.append(certificado)
+                if sha256:
+                    existentes[veiculo.id, sha256] = certificado
+            CertificadoVeiculo.objects.bulk_create(novos)
+
+            if novos and settings.IPIRANGA_DISPATCH_MODE == "celery":
+                veiculo_ids = sorted({c.veiculo_id for c in novos})  # type: ignore[reportAttributeAccessIssue]
+                transaction.on_commit(lambda: agendar_veiculos_task.delay(veiculo_ids))  # type: ignore[reportFunctionMemberAccess]
+    except Exception as e:
+        for resultado, _, _ in gravados:
+            _falhar(resultado, e, logger)
+        return
+    duplicados = len(gravados) - len(novos)
+    logger.info(
+        f"[POST] {len(novos)} certificado(s) salvo(s) em lote para {len(veiculos)} veículo(s); {duplicados} reenvio(s) de arquivo já registrado."
+    )
+
+
+async def ingerir_certificados(
+    arquivos: list[UploadedFile], logger: logging.Logger
+) -> list[ArquivoIngerido]:
+    """Valida e grava os certificados enviados, agendando a automação do lote.
+
+    Os arquivos são copiados para o storage em paralelo, em threads, sem bloquear o
+    event loop; a inserção no banco ocorre depois, em uma única transação.
+    """
+    resultados = _interpretar(arquivos, logger)
+    validos = [
+        (resultado, resultado.dados, arquivo)
+        for resultado, arquivo in zip(resultados, arquivos, strict=True)
+        if resultado.dados is not None
+    ]
+    nomes = await asyncio.gather(
+        *(
+            asyncio.to_thread(_salvar_arquivo, arquivo, resultado.file_name)
+            for resultado, _, arquivo in validos
+        ),
+        return_exceptions=True,
+    )
+    gravados: list[tuple[ArquivoIngerido, ExtractedCertificateData, str]] = []
+    for (resultado, dados, _), nome in zip(validos, nomes, strict=True):
+        if isinstance(nome, BaseException):
+            _falhar(resultado, cast(Exception, nome), logger)
+        else:
+            gravados.append((resultado, dados, nome))
+    if gravados:
+        await sync_to_async(_inserir)(gravados, logger)
+    return resultados
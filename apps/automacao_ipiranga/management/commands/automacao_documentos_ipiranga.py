@@ -5,75 +5,384 @@ import logging
 import os
 import re
 from argparse import ArgumentParser
-from typing import Any
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from typing import Any, cast
+from urllib.parse import urljoin
 
 from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
-from playwright.async_api import Page, async_playwright, expect
+from playwright.async_api import (
+    Locator,
+    Page,
+    Response,
+    TimeoutError as PlaywrightTimeoutError,
+)
 
+from apps.automacao_ipiranga.browser_pool import (
+    get_browser_pool,
+    run_in_worker_loop,
+    shutdown_browser_pool,
+)
+from apps.automacao_ipiranga.dom_snapshot import (
+    SELETOR_LINHAS_VEICULO,
+    SELETOR_LINK_ALTERAR,
+    SELETOR_PAINEL_CERTIFICADO,
+    SELETOR_TABELA_VEICULO,
+    PainelCertificado,
+    snapshot_paineis_certificado,
+)
+from apps.automacao_ipiranga.fila import (
+    devolver_a_fila,
+    marcar_falha_em_processamento,
+    reservar_certificados,
+)
+from apps.automacao_ipiranga.html_snapshot import (
+    buscar_html,
+    extrair_paineis_certificado,
+)
 from apps.automacao_ipiranga.models import CertificadoVeiculo
-from apps.common.services import (
-    extract_certificate_data_from_filename,
-    login_to_portran,
+from apps.automacao_ipiranga.plate_index import (
+    EntradaIndicePlaca,
+    construir_indice_placas,
+    invalidar_indice_placas,
+    obter_indice_placas,
+    obter_ou_construir_indice_placas,
 )
+from apps.automacao_ipiranga.preflight import (
+    ResultadoPreflight,
+    avaliar,
+    avaliar_paineis,
+    gravar_status_documentos,
+    vencidos_em_cache,
+)
+from apps.automacao_ipiranga.readiness import EsperasPagina, RespostaInesperadaError
+from apps.automacao_ipiranga.request_policy import instalar_politica_requisicoes
+from apps.automacao_ipiranga.status_stream import publicar_status
+from apps.automacao_ipiranga.timing import (
+    CronometroExecucao,
+    registrar_execucao_segura,
+)
+from apps.common.circuit_breaker import (
+    ERROS_DO_PORTAL,
+    CircuitoAbertoError,
+    liberar_sonda,
+    registrar_falha_portal,
+    registrar_sucesso_portal,
+    verificar_circuito_portran,
+)
+from apps.common.deadline import Deadline
+from apps.common.locks import Lease, LeaseOcupadoError, adquirir_lease
+from apps.common.portran_session import garantir_sessao_portran
+from apps.common.rate_limit import registrar_sucesso_portran
+from apps.common.services import extract_certificate_data_from_filename
 
 logger = logging.getLogger(__name__)
 
+SELETOR_ABA_CERTIFICADOS = "a#certificados-tab"
+CHAVE_LEASE_PLACA = "automacao_ipiranga:lease_placa:{placa}"
+# O lease cobre o prazo da execução mais a gravação dos status; se o worker morrer,
+# a placa fica livre após esse tempo.
+MARGEM_LEASE_PLACA = 60  # segundos
+ESPERA_MAXIMA_PLACA_OCUPADA = 30  # segundos
+
+
+def resposta_de_upload(response: Response) -> bool:
+    """Identifica a resposta da requisição de envio do certificado."""
+    return (
+        response.request.method == "POST"
+        and re.search(settings.IPIRANGA_UPLOAD_RESPONSE_URL_PATTERN, response.url)
+        is not None
+    )
+
+
+def _prazo_visita(quantidade_certificados: int) -> int:
+    """Prazo, em segundos, de uma visita com a quantidade de certificados informada."""
+    return 90 + 30 * (quantidade_certificados - 1)
+
+
+class AutomacaoAdiadaError(CommandError):
+    """A execução foi adiada sem consumir tentativas (ex.: portal indisponível)."""
+
+    def __init__(self, mensagem: str, retry_em: float) -> None:
+        """Inicializa o erro com o número de segundos até a nova tentativa."""
+        super().__init__(mensagem)
+        self.retry_em = retry_em
+
 
 class Command(BaseCommand):
     """Comando Django para automatizar a atualização de documentos no portal Ipiranga."""
 
-    help = "Automatiza o processo de atualização de um único certificado no portal Ipiranga."
+    help = "Automatiza o processo de atualização de certificados no portal Ipiranga."
 
     def add_arguments(self, parser: ArgumentParser) -> None:  # noqa: PLR6301
         """Adiciona argumentos ao comando."""
         parser.add_argument(
-            "certificado_id",
+            "certificado_ids",
+            type=int,
+            nargs="+",
+            help="Os IDs dos CertificadoVeiculo a serem processados.",
+        )
+        parser.add_argument(
+            "--concorrencia",
             type=int,
-            help="O ID do CertificadoVeiculo a ser processado.",
+            default=None,
+            help="Número máximo de certificados executados ao mesmo tempo (padrão: IPIRANGA_CONCURRENT_CERTIFICATES).",
+        )
+
+    async def handle_many_async(
+        self,
+        certificado_ids: list[int],
+        concorrencia: int | None = None,
+        reservados: bool = False,
+    ) -> dict[int, str]:
+        """Executa vários certificados em paralelo, uma visita (BrowserContext) por veículo.
+
+        Certificados do mesmo veículo são agrupados e enviados na mesma visita. A
+        concorrência entre veículos é limitada por um semáforo e a falha de um veículo
+        não interrompe os demais. Com `reservados`, os certificados já foram
+        reservados na fila pelo chamador. Retorna as mensagens de erro por ID de
+        certificado.
+        """
+        veiculo_por_certificado = await sync_to_async(
+            lambda: dict(
+                CertificadoVeiculo.objects.filter(pk__in=certificado_ids).values_list(
+                    "pk", "veiculo_id"
+                )
+            )
+        )()
+        grupos: defaultdict[int, list[int]] = defaultdict(list)
+        for certificado_id in certificado_ids:
+            # IDs inexistentes seguem sozinhos e falham na validação.
+            grupos[veiculo_por_certificado.get(certificado_id, -certificado_id)].append(
+                certificado_id
+            )
+
+        limite = asyncio.Semaphore(
+            concorrencia or settings.IPIRANGA_CONCURRENT_CERTIFICATES
+        )
+
+        async def executar(ids_do_veiculo: list[int]) -> None:
+            async with limite:
+                await self.handle_certificados_async(ids_do_veiculo, reservados)
+
+        lotes = list(grupos.values())
+        resultados = await asyncio.gather(
+            *(executar(ids_do_veiculo) for ids_do_veiculo in lotes),
+            return_exceptions=True,
+        )
+        falhas: dict[int, str] = {}
+        for ids_do_veiculo, resultado in zip(lotes, resultados, strict=True):
+            if isinstance(resultado, BaseException):
+                falhas.update(dict.fromkeys(ids_do_veiculo, str(resultado)))
+        logger.info(
+            f"[AUTOMACAO_IPIRANGA] Lote concluído: {len(certificado_ids) - len(falhas)} sucesso(s), {len(falhas)} falha(s)."
         )
+        return falhas
+
+    async def handle_veiculo_async(self, veiculo_id: int) -> list[int]:
+        """Envia, em uma única visita ao portal, todos os certificados pendentes do veículo.
+
+        Returns:
+            Os IDs dos certificados processados (vazio se não havia pendentes).
+        """
+        certificado_ids = await sync_to_async(
+            lambda: list(
+                CertificadoVeiculo.objects.filter(
+                    veiculo_id=veiculo_id, status="pendente"
+                )
+                .order_by("data_criacao")
+                .values_list("pk", flat=True)
+            )
+        )()
+        if not certificado_ids:
+            logger.info(
+                f"[AUTOMACAO_IPIRANGA] Veículo ID {veiculo_id}: nenhum certificado pendente."
+            )
+            return []
+        await self.handle_certificados_async(certificado_ids)
+        return certificado_ids
 
     async def handle_async(
         self, certificado_id: int, *args: str, **options: dict[str, Any]
     ) -> None:
         """Lógica assíncrona principal do comando de automação."""
+        await self.handle_certificados_async([certificado_id])
+
+    async def handle_certificados_async(
+        self, certificado_ids: list[int], reservados: bool = False
+    ) -> None:
+        """Executa a automação para certificados de um mesmo veículo em uma única visita.
+
+        Args:
+            certificado_ids: IDs dos certificados, todos do mesmo veículo.
+            reservados: Se os certificados já foram reservados na fila pelo
+                chamador; se a visita for adiada, a reserva é desfeita.
+        """
+        rotulo = ", ".join(str(certificado_id) for certificado_id in certificado_ids)
         logger.info(
-            f"[AUTOMACAO_IPIRANGA] handle_async iniciado para certificado ID: {certificado_id}"
+            f"[AUTOMACAO_IPIRANGA] handle_async iniciado para certificado ID(s): {rotulo}"
         )
-        automation_timeout = 90
+        sonda = False
+        lease: Lease | None = None
+        try:
+            try:
+                # Antes da reserva: um adiamento não consome tentativas.
+                sonda = await self._verificar_circuito(rotulo)
+                lease = await self._reservar_placa(
+                    certificado_ids,
+                    _prazo_visita(len(certificado_ids)) + MARGEM_LEASE_PLACA,
+                )
+            except AutomacaoAdiadaError:
+                if reservados:
+                    await sync_to_async(devolver_a_fila)(certificado_ids)
+                raise
+            if not reservados:
+                certificado_ids = await sync_to_async(reservar_certificados)(
+                    certificado_ids
+                )
+            if not certificado_ids:
+                logger.info(
+                    f"[FILA] Certificado(s) ID {rotulo} já em processamento por outro worker ou concluído(s)."
+                )
+                return
+            await self._executar_visita(certificado_ids, sonda)
+        finally:
+            if lease is not None:
+                await lease.liberar()
+            if sonda:
+                # Resultados do portal já liberaram a vaga; saídas antecipadas não.
+                await liberar_sonda()
+
+    @staticmethod
+    async def _verificar_circuito(rotulo: str) -> bool:
+        """Consulta o circuit breaker; retorna se a execução é a sonda do circuito."""
+        try:
+            return await verificar_circuito_portran()
+        except CircuitoAbertoError as e:
+            logger.warning(f"[CIRCUITO] Certificado(s) ID {rotulo} adiado(s): {e}")
+            raise AutomacaoAdiadaError(str(e), retry_em=e.retry_em) from e
+
+    async def _executar_visita(self, certificado_ids: list[int], sonda: bool) -> None:
+        """Executa a visita com prazo, registrando os tempos da execução."""
+        rotulo = ", ".join(str(certificado_id) for certificado_id in certificado_ids)
+        automation_timeout = _prazo_visita(len(certificado_ids))
+        # As etapas usam o prazo menos a reserva; o wait_for é só a garantia final.
+        cronometro = CronometroExecucao(
+            deadline=Deadline(
+                automation_timeout, reserva=settings.IPIRANGA_DEADLINE_RESERVE
+            )
+        )
+        status_execucao, mensagem_execucao = "falha", ""
         try:
             await asyncio.wait_for(
-                self._run_automation_steps(certificado_id), timeout=automation_timeout
+                self._run_automation_steps(certificado_ids, cronometro, sonda),
+                timeout=automation_timeout,
             )
+            status_execucao = "sucesso"
+        except AutomacaoAdiadaError as e:
+            status_execucao, mensagem_execucao = "alerta", str(e)
+            raise
         except TimeoutError:
+            mensagem_execucao = (
+                f"Automação excedeu o tempo limite de {automation_timeout} segundos."
+            )
             logger.error(
-                f"AUTOMATION TIMEOUT: Automação para o certificado ID {certificado_id} excedeu o tempo limite de {automation_timeout} segundos."
+                f"AUTOMATION TIMEOUT: Automação para o(s) certificado(s) ID {rotulo} excedeu o tempo limite de {automation_timeout} segundos."
             )
-            raise CommandError(
-                f"Automação excedeu o tempo limite de {automation_timeout} segundos."
-            ) from None
+            # As etapas foram canceladas sem gravar o status; libera a reserva da fila.
+            await sync_to_async(marcar_falha_em_processamento)(
+                certificado_ids, mensagem_execucao
+            )
+            raise CommandError(mensagem_execucao) from None
         except Exception as e:
+            mensagem_execucao = str(e)
             logger.error(
-                f"FALHA GERAL na automação para o certificado ID {certificado_id}: {e}",
+                f"FALHA GERAL na automação para o(s) certificado(s) ID {rotulo}: {e}",
                 exc_info=True,
             )
             raise CommandError(f"Erro geral na automação: {e}") from e
+        finally:
+            logger.info(f"[TEMPOS] Certificado(s) ID {rotulo}: {cronometro.resumo()}")
+            await sync_to_async(registrar_execucao_segura)(
+                cronometro, certificado_ids, status_execucao, mensagem_execucao, logger
+            )
+
+    async def _reservar_placa(  # noqa: PLR6301
+        self, certificado_ids: list[int], ttl: float
+    ) -> Lease | None:
+        """Reserva a placa da visita para que apenas um worker edite o veículo por vez.
+
+        A reserva ocorre antes da validação, de modo que um adiamento não consome
+        tentativas. Sem uma placa única, retorna None e a validação rejeita a visita.
+
+        Raises:
+            AutomacaoAdiadaError: Se outra execução está atualizando o mesmo veículo.
+        """
+        placas = await sync_to_async(
+            lambda: set(
+                CertificadoVeiculo.objects.filter(pk__in=certificado_ids).values_list(
+                    "veiculo__placa", flat=True
+                )
+            )
+        )()
+        if len(placas) != 1:
+            return None
+        placa = placas.pop()
+        try:
+            return await adquirir_lease(CHAVE_LEASE_PLACA.format(placa=placa), ttl)
+        except LeaseOcupadoError as e:
+            logger.warning(
+                f"[LEASE] Placa {placa} em atualização por outra execução; certificado(s) ID {certificado_ids} adiado(s)."
+            )
+            raise AutomacaoAdiadaError(
+                f"Veículo {placa} já está sendo atualizado por outra execução.",
+                retry_em=min(e.restante, ESPERA_MAXIMA_PLACA_OCUPADA),
+            ) from e
+
+    async def _validar_certificados(
+        self, certificado_ids: list[int]
+    ) -> list[CertificadoVeiculo]:
+        """Valida os certificados da visita, descartando os que não podem ser enviados.
+
+        Um certificado inválido (ex.: máximo de tentativas) não impede o envio dos
+        demais do mesmo veículo; se nenhum for válido, o primeiro erro é propagado.
+        Os inválidos ainda reservados na fila são marcados como falha.
+        """
+        certificados: list[CertificadoVeiculo] = []
+        erros: list[CommandError] = []
+        for certificado_id in certificado_ids:
+            try:
+                certificados.append(
+                    await self._get_and_validate_certificado(certificado_id)
+                )
+            except CommandError as e:
+                await sync_to_async(marcar_falha_em_processamento)(
+                    [certificado_id], str(e)
+                )
+                erros.append(e)
+        if not certificados:
+            raise erros[0]
+        if len({c.veiculo_id for c in certificados}) > 1:  # type: ignore[reportAttributeAccessIssue]
+            raise CommandError(
+                "Certificados de veículos diferentes não podem ser enviados na mesma visita."
+            )
+        return certificados
 
     async def _get_and_validate_certificado(  # noqa: PLR6301
         self, certificado_id: int
     ) -> CertificadoVeiculo:
-        """Busca o certificado e realiza as validações iniciais."""
+        """Busca o certificado e realiza as validações iniciais.
+
+        A tentativa já foi contada ao reservar o certificado na fila.
+        """
         try:
             certificado = await sync_to_async(
                 CertificadoVeiculo.objects.select_related("veiculo").get
             )(pk=certificado_id)
             assert certificado is not None
 
-            certificado.tentativas_automacao = (
-                certificado.tentativas_automacao or 0
-            ) + 1
-            await sync_to_async(certificado.save)()
             logger.info(
                 f"[AUTOMACAO_IPIRANGA] Certificado ID {certificado_id}: Tentativa {certificado.tentativas_automacao}"
             )
@@ -84,7 +393,10 @@ class Command(BaseCommand):
                     f"Certificado ID {certificado_id} excedeu o número máximo de tentativas ({max_automation_attempts}). Marcando como falha_max_tentativas."
                 )
                 certificado.status = "falha_max_tentativas"
-                await sync_to_async(certificado.save)()
+                await sync_to_async(certificado.save)(
+                    update_fields=["status", "data_atualizacao"]
+                )
+                await sync_to_async(publicar_status)([certificado_id])
                 raise CommandError(
                     f"Certificado ID {certificado_id} excedeu o número máximo de tentativas."
                 )
@@ -99,85 +411,165 @@ class Command(BaseCommand):
                 f"Certificado com ID {certificado_id} não encontrado."
             ) from err
 
-    async def _navigate_and_find_placa(self, page: Page, placa_alvo: str) -> bool:  # noqa: PLR6301
-        """Navega pelas páginas de veículos e busca pela placa."""
-        logger.info("Iniciando loop de navegação para páginas de veículos...")
-        for url, nome_pagina in [
-            (settings.IPIRANGA_VENCIDOS_URL, "Vencidos"),
-            (settings.IPIRANGA_A_VENCER_URL, "À vencer"),
-        ]:
+    async def _abrir_veiculo(
+        self,
+        esperas: EsperasPagina,
+        entrada: EntradaIndicePlaca,
+        paginas_listagem: dict[str, Page],
+        certificados: list[CertificadoVeiculo],
+    ) -> bool:
+        """Abre a página de edição do veículo a partir da entrada do índice.
+
+        Sem link direto, o clique ocorre na página em que a listagem da placa já
+        está renderizada, que passa a ser a página de trabalho de `esperas`.
+        """
+        href = entrada.href_edicao
+        if href and not href.startswith(("#", "javascript")):
+            url_veiculo = urljoin(entrada.url_listagem, href)
+            if settings.IPIRANGA_HTTP_SNAPSHOTS:
+                await self._preflight_http(esperas, url_veiculo, certificados)
+            logger.info(f"[NAVEGACAO] Abrindo diretamente o veículo {entrada.placa}.")
+            await esperas.navegar(
+                "abrir_veiculo", url_veiculo, SELETOR_ABA_CERTIFICADOS
+            )
+            return True
+
+        pagina_listagem = paginas_listagem.get(entrada.url_listagem)
+        if pagina_listagem is not None and pagina_listagem is not esperas.page:
+            await esperas.page.close()
+            esperas.page = pagina_listagem
+        page = esperas.page
+        if page.url != entrada.url_listagem:
             logger.info(
-                f"[NAVEGACAO] Tentando navegar para a página: {nome_pagina} ({url})"
+                f"[NAVEGACAO] Abrindo listagem {entrada.listagem} da placa {entrada.placa}."
+            )
+            await esperas.navegar(
+                "abrir_listagem", entrada.url_listagem, SELETOR_TABELA_VEICULO
             )
-            try:
-                await page.goto(url, timeout=60000)
-                await page.wait_for_load_state("networkidle", timeout=60000)
-                logger.info(f"[NAVEGACAO] Página {nome_pagina} carregada.")
-            except Exception as nav_error:
-                logger.error(
-                    f"[ERRO_NAVEGACAO] Erro ao carregar a página {nome_pagina}: {nav_error}"
-                )
-                continue
 
-            try:
-                await page.locator("table#tabela-veiculo").wait_for(
-                    state="visible", timeout=30000
-                )
-                logger.info(f"[TABELA] Tabela visível na página {nome_pagina}.")
-            except Exception as table_error:
-                logger.warning(
-                    f"[ERRO_TABELA] Tabela não visível na página {nome_pagina}: {table_error}"
+        linha = page.locator(SELETOR_LINHAS_VEICULO).filter(
+            has=page.locator("td:nth-child(2)", has_text=entrada.placa)
+        )
+        if await linha.count() == 0:
+            return False
+        logger.info(f"Placa '{entrada.placa}' encontrada! Clicando para alterar.")
+        await linha.first.locator(SELETOR_LINK_ALTERAR).click(
+            timeout=esperas.timeout_ms()
+        )
+        await esperas.elemento_visivel(
+            "abrir_veiculo", SELETOR_ABA_CERTIFICADOS, timeout_ms=60000
+        )
+        return True
+
+    async def _preflight_http(
+        self,
+        esperas: EsperasPagina,
+        url_veiculo: str,
+        certificados: list[CertificadoVeiculo],
+    ) -> None:
+        """Avalia o veículo pela página buscada via HTTP, antes de renderizá-la.
+
+        Um veículo que não poderá ser salvo é recusado (ou adiado) sem abrir sua
+        página no navegador. Se a página não trouxer os painéis no HTML, a avaliação
+        fica para a aba de certificados renderizada.
+        """
+        html = await buscar_html(esperas, "veiculo_http", url_veiculo)
+        paineis = extrair_paineis_certificado(html) if html is not None else []
+        if paineis:
+            await registrar_sucesso_portran()
+            await self._preflight(certificados, paineis)
+
+    async def _navigate_and_find_placa(
+        self,
+        esperas: EsperasPagina,
+        placa_alvo: str,
+        cronometro: CronometroExecucao,
+        certificados: list[CertificadoVeiculo],
+    ) -> bool:
+        """Localiza a placa pelo índice de placas e abre a página do veículo."""
+        # Páginas irmãs em que as listagens foram renderizadas (modo navegador).
+        paginas_listagem: dict[str, Page] = {}
+        with cronometro.etapa("navegar_listagens"):
+            indice_do_cache = await obter_indice_placas() is not None
+            indice = await obter_ou_construir_indice_placas(
+                esperas, logger, paginas_listagem
+            )
+
+        entrada = indice.buscar(placa_alvo)
+        if entrada is not None:
+            with cronometro.etapa("encontrar_placa"):
+                if await self._abrir_veiculo(
+                    esperas, entrada, paginas_listagem, certificados
+                ):
+                    return True
+
+        if indice_do_cache:
+            # Índice desatualizado: reconstrói uma única vez antes de desistir.
+            logger.info(
+                f"[INDICE_PLACAS] Placa {placa_alvo} não localizada com o índice em cache. Reconstruindo."
+            )
+            await invalidar_indice_placas()
+            with cronometro.etapa("navegar_listagens"):
+                indice = await construir_indice_placas(
+                    esperas, logger, paginas_listagem
                 )
-                continue
-
-            rows_locator = page.locator("table#tabela-veiculo tbody tr")
-            num_rows = await rows_locator.count()
-            for i in range(num_rows):
-                row_locator = rows_locator.nth(i)
-                placa_text = (
-                    await row_locator.locator("td:nth-child(2)").text_content() or ""
-                ).strip()
-                if placa_alvo in placa_text:
-                    logger.info(
-                        f"Placa '{placa_alvo}' encontrada! Clicando para alterar."
+            entrada = indice.buscar(placa_alvo)
+            if entrada is not None:
+                with cronometro.etapa("encontrar_placa"):
+                    return await self._abrir_veiculo(
+                        esperas, entrada, paginas_listagem, certificados
                     )
-                    await row_locator.locator(
-                        "a.btn.btn--square.alterar-veiculo-js"
-                    ).click()
-                    await page.wait_for_load_state("networkidle", timeout=60000)
-                    return True
         return False
 
-    async def _update_certificate(  # noqa: PLR6301
-        self, page: Page, certificado: CertificadoVeiculo
+    async def _abrir_aba_certificados(  # noqa: PLR6301
+        self, esperas: EsperasPagina, cronometro: CronometroExecucao
+    ) -> list[PainelCertificado]:
+        """Abre a aba de certificados do veículo e lê seus painéis."""
+        page = esperas.page
+        with cronometro.etapa("aba_certificados"):
+            await page.locator(SELETOR_ABA_CERTIFICADOS).click(
+                timeout=esperas.timeout_ms()
+            )
+            await esperas.elemento_visivel(
+                "aba_certificados", SELETOR_PAINEL_CERTIFICADO
+            )
+            paineis = await snapshot_paineis_certificado(page)
+        logger.info(f"Número de certificados encontrados: {len(paineis)}")
+        return paineis
+
+    async def _update_certificate(
+        self,
+        esperas: EsperasPagina,
+        certificado: CertificadoVeiculo,
+        paineis: list[PainelCertificado],
+        cronometro: CronometroExecucao,
     ) -> None:
         """Encontra e atualiza o certificado específico na página do veículo."""
-        await page.locator("a#certificados-tab").click()
-        await page.wait_for_load_state("networkidle", timeout=60000)
-
-        certificate_fieldsets = page.locator("fieldset.certificado-box")
-        num_certificates = await certificate_fieldsets.count()
-        logger.info(f"Número de certificados encontrados: {num_certificates}")
-
-        for i in range(num_certificates):
-            fieldset = certificate_fieldsets.nth(i)
-            current_name = (
-                await fieldset.locator(".licenca-titulo .titulo.h3").text_content()
-                or ""
-            ).strip()
-            is_vencido = (
-                await fieldset.locator('*.badge--vermelho:has-text("Vencido")').count()
-                > 0
-            )
-
-            if (
-                str(certificado.nome).upper() in str(current_name).upper()
-                and is_vencido
-            ):
-                logger.info(f"Certificado '{certificado.nome}' (Vencido) encontrado.")
-                await fieldset.locator("button.btn-atualizar-requisito").click()
-                await page.wait_for_load_state("networkidle")
+        page = esperas.page
+        painel = next(
+            (p for p in paineis if p.vencido and p.corresponde(str(certificado.nome))),
+            None,
+        )
+        if painel is None:
+            raise CommandError(
+                f"Certificado '{certificado.nome}' (Vencido) não encontrado."
+            )
+
+        logger.info(f"Certificado '{certificado.nome}' (Vencido) encontrado.")
+        with cronometro.etapa("upload"):
+            fieldset = page.locator(SELETOR_PAINEL_CERTIFICADO).nth(painel.indice)
+            await fieldset.locator("button.btn-atualizar-requisito").click(
+                timeout=esperas.timeout_ms()
+            )
+            await esperas.elemento_visivel(
+                "abrir_requisito",
+                f"{SELETOR_PAINEL_CERTIFICADO} >> nth={painel.indice} >> input[name^='licenca-numero-']",
+            )
 
+            numero_certificado = certificado.numero_certificado
+            data_vencimento = certificado.data_vencimento
+            if not numero_certificado or data_vencimento is None:
+                # Registros sem os metadados gravados na ingestão (ex.: criados pelo admin).
                 try:
                     extracted_data = extract_certificate_data_from_filename(
                         os.path.basename(certificado.arquivo.path), logger
@@ -186,123 +578,321 @@ class Command(BaseCommand):
                     raise CommandError(
                         f"Erro ao extrair dados do nome do arquivo: {ve}"
                     ) from ve
-
-                numero_input_id = await fieldset.locator(
-                    "input[name^='licenca-numero-']"
-                ).get_attribute("id")
-                match_id = re.search(r"licenca-numero-(\d+)", numero_input_id or "")
-                if not match_id:
+                numero_certificado = extracted_data.numero_certificado
+                data_vencimento = extracted_data.data_vencimento
+                if data_vencimento is None:
                     raise CommandError(
-                        "Não foi possível extrair o ID dinâmico do campo."
+                        f"Data de vencimento inválida: {extracted_data.data_vencimento_formatada}"
                     )
-                dynamic_id = match_id.group(1)
 
-                await page.fill(
-                    f"#licenca-numero-{dynamic_id}", extracted_data.numero_certificado
-                )
-                await page.fill(
-                    f"#licenca-vencimento-{dynamic_id}",
-                    extracted_data.data_vencimento_formatada,
-                )
-                await fieldset.locator('input[type="file"]:visible').set_input_files(
-                    certificado.arquivo.path
+            numero_input_id = painel.numero_input_id or await fieldset.locator(
+                "input[name^='licenca-numero-']"
+            ).get_attribute("id", timeout=esperas.timeout_ms())
+            match_id = re.search(r"licenca-numero-(\d+)", numero_input_id or "")
+            if not match_id:
+                raise CommandError("Não foi possível extrair o ID dinâmico do campo.")
+            dynamic_id = match_id.group(1)
+
+            await page.fill(
+                f"#licenca-numero-{dynamic_id}",
+                numero_certificado,
+                timeout=esperas.timeout_ms(),
+            )
+            await page.fill(
+                f"#licenca-vencimento-{dynamic_id}",
+                data_vencimento.strftime("%d/%m/%Y"),
+                timeout=esperas.timeout_ms(),
+            )
+            await fieldset.locator('input[type="file"]:visible').set_input_files(
+                certificado.arquivo.path, timeout=esperas.timeout_ms()
+            )
+            botao_enviar = fieldset.locator(
+                'button:has-text("Enviar novo certificado")'
+            )
+            if not settings.IPIRANGA_UPLOAD_RESPONSE_URL_PATTERN:
+                await self._enviar_sem_url_conhecida(
+                    esperas, fieldset, botao_enviar, certificado
                 )
-                await fieldset.locator(
-                    'button:has-text("Enviar novo certificado")'
-                ).click()
-                await page.wait_for_timeout(3000)
                 return
+            try:
+                async with esperas.resposta(
+                    "upload_certificado",
+                    resposta_de_upload,
+                    timeout_ms=settings.IPIRANGA_UPLOAD_RESPONSE_TIMEOUT,
+                ):
+                    await botao_enviar.click(timeout=esperas.timeout_ms())
+            except PlaywrightTimeoutError as e:
+                raise CommandError(
+                    f"Nenhuma resposta de upload do certificado {certificado.id} em {settings.IPIRANGA_UPLOAD_RESPONSE_TIMEOUT} ms após 'Enviar novo certificado'."
+                ) from e
+            except RespostaInesperadaError as e:
+                raise CommandError(
+                    f"Upload do certificado {certificado.id} recusado pelo portal ({e})."
+                ) from e
+
+    @staticmethod
+    async def _enviar_sem_url_conhecida(
+        esperas: EsperasPagina,
+        fieldset: Locator,
+        botao_enviar: Locator,
+        certificado: CertificadoVeiculo,
+    ) -> None:
+        """Envia o certificado aguardando apenas uma mudança no fieldset.
 
-        raise CommandError(
-            f"Certificado '{certificado.nome}' (Vencido) não encontrado."
-        )
+        Sem `IPIRANGA_UPLOAD_RESPONSE_URL_PATTERN` a requisição de upload não é
+        identificável; a ausência de mudança só gera um aviso, e o redirecionamento
+        após "Salvar" valida o resultado.
+        """
+        try:
+            async with esperas.mudanca_dom(
+                "upload_certificado",
+                fieldset,
+                timeout_ms=settings.IPIRANGA_UPLOAD_RESPONSE_TIMEOUT,
+            ):
+                await botao_enviar.click(timeout=esperas.timeout_ms())
+        except PlaywrightTimeoutError:
+            logger.warning(
+                f"Nenhuma mudança no formulário do certificado {certificado.id} após 'Enviar novo certificado'. Prosseguindo."
+            )
 
-    async def _check_other_expired_and_save(  # noqa: PLR6301
-        self, page: Page, certificado: CertificadoVeiculo
+    async def _check_other_expired_and_save(
+        self, esperas: EsperasPagina, certificados: list[CertificadoVeiculo]
     ) -> None:
         """Verifica se há outros certificados vencidos antes de salvar."""
+        page = esperas.page
         logger.info("Verificando outros certificados vencidos antes de salvar...")
-        certificate_fieldsets = page.locator("fieldset.certificado-box")
-        num_certificates = await certificate_fieldsets.count()
-
-        for i in range(num_certificates):
-            fieldset = certificate_fieldsets.nth(i)
-            current_name = (
-                await fieldset.locator(".licenca-titulo .titulo.h3").text_content()
-                or ""
-            ).strip()
-            is_vencido = (
-                await fieldset.locator('*.badge--vermelho:has-text("Vencido")').count()
-                > 0
-            )
-
-            if (
-                is_vencido
-                and str(certificado.nome).upper() not in str(current_name).upper()
-            ):
-                error_msg = f"Não foi possível salvar: Outro certificado vencido encontrado ({current_name}) para o veículo {certificado.veiculo.placa}."
-                certificado.status = "falha_outros_vencidos"
-                certificado.error_message = error_msg
-                await sync_to_async(certificado.save)()
-                raise CommandError(error_msg)
+        # O preflight já verificou antes do upload; confirma com o estado atual da página.
+        resultado = avaliar_paineis(
+            await snapshot_paineis_certificado(page),
+            (str(c.nome) for c in certificados),
+        )
+        if not resultado.elegivel:
+            await self._recusar_por_outros_vencidos(certificados, resultado)
 
         logger.info(
             "Nenhum outro certificado vencido encontrado. Clicando em Salvar..."
         )
-        await page.locator("a#botaoAtualizar").click()
-        await expect(page).to_have_url(re.compile(r".*/veiculo/index"), timeout=60000)
+        await page.locator("a#botaoAtualizar").click(timeout=esperas.timeout_ms())
+        await esperas.url("salvar_veiculo", re.compile(r".*/veiculo/index"))
         logger.info("Operação salva com sucesso e página redirecionada.")
 
-    async def _run_automation_steps(self, certificado_id: int) -> None:
-        """Orquestra as etapas da automação."""
-        certificado = await self._get_and_validate_certificado(certificado_id)
-        browser = None
-        page = None
-        try:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=False)
-                page = await browser.new_page()
-                page.set_default_timeout(60000)
-
-                await login_to_portran(page, logger)
+    async def _preflight(
+        self,
+        certificados: list[CertificadoVeiculo],
+        paineis: list[PainelCertificado] | None = None,
+    ) -> None:
+        """Verifica, antes de qualquer upload, se o veículo poderá ser salvo.
+
+        Sem `paineis`, usa os vencidos registrados na última visita ao veículo (se
+        recentes) para decidir sem abrir o portal. Com `paineis`, avalia a página e
+        registra o resultado em `VeiculoIpiranga.documentos_vencidos`.
+
+        Raises:
+            AutomacaoAdiadaError: Se os outros vencidos têm certificados pendentes,
+                que serão enviados juntos em uma próxima visita.
+            CommandError: Se o veículo não poderá ser salvo.
+        """
+        nomes = [str(c.nome) for c in certificados]
+        veiculo = certificados[0].veiculo
+        if paineis is None:
+            vencidos = vencidos_em_cache(veiculo)
+            if vencidos is None:
+                return
+            resultado = avaliar(vencidos, nomes, do_cache=True)
+        else:
+            resultado = avaliar_paineis(paineis, nomes)
+            await sync_to_async(gravar_status_documentos)(
+                veiculo.id, [p.nome for p in paineis if p.vencido]
+            )
+        if not resultado.elegivel:
+            await self._recusar_por_outros_vencidos(certificados, resultado)
 
-                placa_encontrada = await self._navigate_and_find_placa(
-                    page, certificado.veiculo.placa
+    async def _recusar_por_outros_vencidos(  # noqa: PLR6301
+        self, certificados: list[CertificadoVeiculo], resultado: ResultadoPreflight
+    ) -> None:
+        """Adia a visita ou marca os certificados como `falha_outros_vencidos`."""
+        veiculo = certificados[0].veiculo
+        ids = [c.id for c in certificados]
+        nomes_pendentes = await sync_to_async(
+            lambda: list(
+                CertificadoVeiculo.objects.filter(
+                    veiculo_id=veiculo.id, status="pendente"
                 )
-                if not placa_encontrada:
-                    raise CommandError(
-                        f"Placa {certificado.veiculo.placa} não encontrada no portal."
-                    )
+                .exclude(pk__in=ids)
+                .values_list("nome", flat=True)
+            )
+        )()
+        if (
+            nomes_pendentes
+            and avaliar(
+                resultado.outros_vencidos, nomes_pendentes, resultado.do_cache
+            ).elegivel
+        ):
+            await sync_to_async(devolver_a_fila)(ids)
+            raise AutomacaoAdiadaError(
+                f"Outros certificados vencidos do veículo {veiculo.placa} ainda estão pendentes de envio; visita adiada para enviá-los juntos.",
+                retry_em=settings.IPIRANGA_VEHICLE_BATCH_WINDOW,
+            )
 
-                await self._update_certificate(page, certificado)
-                await self._check_other_expired_and_save(page, certificado)
+        origem = " (registrado na última visita)" if resultado.do_cache else ""
+        error_msg = f"Não foi possível salvar: Outro certificado vencido encontrado ({resultado.outros_vencidos[0]}) para o veículo {veiculo.placa}{origem}."
+        for certificado in certificados:
+            certificado.status = "falha_outros_vencidos"
+            certificado.error_message = error_msg
+            await sync_to_async(certificado.save)(
+                update_fields=["status", "error_message", "data_atualizacao"]
+            )
+        await sync_to_async(publicar_status)(ids)
+        raise CommandError(error_msg)
+
+    async def _acessar_veiculo(
+        self,
+        esperas: EsperasPagina,
+        certificados: list[CertificadoVeiculo],
+        cronometro: CronometroExecucao,
+        sonda: bool,
+    ) -> bool:
+        """Autentica e abre o veículo, alimentando o circuit breaker do portal.
+
+        Só erros do portal (`ERROS_DO_PORTAL`) contam como falha; erros de negócio
+        (`CommandError`) e locais (ex.: credenciais ausentes) não.
+        """
+        try:
+            with cronometro.etapa("login"):
+                await garantir_sessao_portran(esperas.page, logger, cronometro.deadline)
+            placa_encontrada = await self._navigate_and_find_placa(
+                esperas, certificados[0].veiculo.placa, cronometro, certificados
+            )
+        except ERROS_DO_PORTAL:
+            await registrar_falha_portal(sonda)
+            raise
+        await registrar_sucesso_portal()
+        return placa_encontrada
+
+    @staticmethod
+    async def _descartar_indice_sem_placa(placa: str) -> None:
+        """Descarta o índice em cache que não contém a placa.
+
+        A placa pode ter entrado nas listagens depois da montagem do índice; sem o
+        cache, a visita reconstrói o índice antes de buscá-la.
+        """
+        indice = await obter_indice_placas()
+        if indice is not None and indice.buscar(placa) is None:
+            logger.info(
+                f"[INDICE_PLACAS] Placa {placa} ausente do índice em cache. Reconstruindo na visita."
+            )
+            await invalidar_indice_placas()
 
+    async def _run_automation_steps(
+        self, certificado_ids: list[int], cronometro: CronometroExecucao, sonda: bool
+    ) -> None:
+        """Orquestra as etapas da automação, cronometrando cada uma.
+
+        Todos os certificados (do mesmo veículo) são atualizados na mesma visita e o
+        veículo é salvo uma única vez.
+        """
+        certificados = await self._validar_certificados(certificado_ids)
+        placa = certificados[0].veiculo.placa
+        rotulo = ", ".join(str(c.id) for c in certificados)
+        try:
+            await self._descartar_indice_sem_placa(placa)
+            with cronometro.etapa("preflight"):
+                await self._preflight(certificados)
+
+            async with AsyncExitStack() as pilha:
+                with cronometro.etapa("abrir_navegador"):
+                    context = await pilha.enter_async_context(
+                        get_browser_pool().context()
+                    )
+                    estatisticas = await instalar_politica_requisicoes(context)
+                    # No contexto, para valer também nas páginas irmãs das listagens.
+                    context.set_default_timeout(60000)
+                    page = await context.new_page()
+                esperas = EsperasPagina(
+                    page, logger, cronometro.esperas, cronometro.deadline
+                )
+                try:
+                    placa_encontrada = await self._acessar_veiculo(
+                        esperas, certificados, cronometro, sonda
+                    )
+                    if not placa_encontrada:
+                        raise CommandError(f"Placa {placa} não encontrada no portal.")
+
+                    paineis = await self._abrir_aba_certificados(esperas, cronometro)
+                    with cronometro.etapa("preflight"):
+                        await self._preflight(certificados, paineis)
+                    for certificado in certificados:
+                        await self._update_certificate(
+                            esperas, certificado, paineis, cronometro
+                        )
+                    with cronometro.etapa("salvar"):
+                        await self._check_other_expired_and_save(esperas, certificados)
+                except Exception:
+                    # O screenshot precisa ser capturado antes de o contexto ser devolvido ao pool.
+                    try:
+                        # Fora do prazo das etapas: usa parte da reserva de limpeza.
+                        await esperas.page.screenshot(
+                            path=f"logs/error_screenshot_cert_{certificados[0].id}.png",
+                            timeout=settings.IPIRANGA_DEADLINE_RESERVE * 500,
+                        )
+                    except Exception as screenshot_error:
+                        logger.warning(
+                            f"Não foi possível capturar o screenshot de erro: {screenshot_error}"
+                        )
+                    raise
+                finally:
+                    logger.info(
+                        f"[ESPERAS] Certificado(s) ID {rotulo}: {esperas.resumo()}"
+                    )
+                    if estatisticas is not None:
+                        logger.info(
+                            f"[REQUISICOES] Certificado(s) ID {rotulo}: {estatisticas.resumo()}"
+                        )
+
+            for certificado in certificados:
+                certificado.status = "enviado"
+                certificado.error_message = ""
+                await sync_to_async(certificado.save)(
+                    update_fields=["status", "error_message", "data_atualizacao"]
+                )
+            await sync_to_async(publicar_status)([c.id for c in certificados])
+            # Os vencidos foram todos substituídos nesta visita.
+            await sync_to_async(gravar_status_documentos)(
+                certificados[0].veiculo.id, []
+            )
+        except AutomacaoAdiadaError:
+            raise
         except Exception as e:
             logger.error(
-                f"FALHA na automação para o certificado ID {certificado_id}: {e}",
+                f"FALHA na automação para o(s) certificado(s) ID {rotulo}: {e}",
                 exc_info=True,
             )
-            certificado.status = "falha"
-            await sync_to_async(certificado.save)()
-            if page:
-                await page.screenshot(
-                    path=f"logs/error_screenshot_cert_{certificado_id}.png"
-                )
+            # Mantém status finais já gravados (ex.: falha_outros_vencidos).
+            await sync_to_async(marcar_falha_em_processamento)(
+                [c.id for c in certificados], str(e)
+            )
             raise CommandError(f"Erro na automação: {e}") from e
-        finally:
-            if browser:
-                await browser.close()
-            # Final cleanup is handled by a separate management command or process
 
     def handle(self, *args: str, **options: dict[str, Any]) -> None:
         """Executa o comando de automação de forma síncrona."""
         try:
-            # Extract certificado_id from options, if it exists
-            certificado_id = options.pop("certificado_id", None)
-            if certificado_id is None:
-                raise CommandError("certificado_id é um argumento obrigatório.")
+            certificado_ids = cast(list[int], options.pop("certificado_ids", None))
+            if not certificado_ids:
+                raise CommandError("certificado_ids é um argumento obrigatório.")
+            concorrencia = cast(int | None, options.pop("concorrencia", None))
 
-            # Pass the extracted certificado_id and the remaining options to handle_async
-            asyncio.run(self.handle_async(certificado_id, *args, **options))  # type: ignore[reportArgumentType]
+            try:
+                if len(certificado_ids) == 1:
+                    run_in_worker_loop(self.handle_async(certificado_ids[0]))
+                else:
+                    falhas = run_in_worker_loop(
+                        self.handle_many_async(certificado_ids, concorrencia)
+                    )
+                    for certificado_id, erro in falhas.items():
+                        self.stderr.write(
+                            self.style.ERROR(f"Certificado ID {certificado_id}: {erro}")
+                        )
+            finally:
+                shutdown_browser_pool()
         except CommandError as e:
             self.stderr.write(self.style.ERROR(f"Erro no comando: {e}"))
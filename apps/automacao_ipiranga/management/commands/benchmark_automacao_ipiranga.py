@@ -0,0 +1,170 @@
+"""Comando Django que mede certificados/minuto da automação contra o portal falso."""
+
+import logging
+import time
+from datetime import date
+from typing import Any
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db.models import Q
+
+from apps.automacao_ipiranga.browser_pool import (
+    run_in_worker_loop,
+    shutdown_browser_pool,
+)
+from apps.automacao_ipiranga.fake_portran import placa_falsa
+from apps.automacao_ipiranga.management.commands.automacao_documentos_ipiranga import (
+    Command as AutomacaoCommand,
+)
+from apps.automacao_ipiranga.models import CertificadoVeiculo, VeiculoIpiranga
+from apps.automacao_ipiranga.plate_index import invalidar_indice_placas
+from apps.common.storage import ContentAddressedStorage
+
+logger = logging.getLogger(__name__)
+
+PDF_MINIMO = b"%PDF-1.4\n%%EOF\n"
+
+
+class Command(BaseCommand):
+    """Executa um lote de certificados contra o portal falso e reporta a vazão."""
+
+    help = (
+        "Mede certificados/minuto da automação Ipiranga contra o portal falso "
+        "(requer DJANGO_SETTINGS_MODULE=core.settings_fake_portran)."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:  # noqa: PLR6301
+        """Adiciona os argumentos do benchmark."""
+        parser.add_argument(
+            "--certificados",
+            type=int,
+            default=20,
+            help="Quantidade de certificados (um por veículo da frota falsa).",
+        )
+        parser.add_argument(
+            "--concorrencia",
+            type=int,
+            default=None,
+            help="Certificados em paralelo (padrão: IPIRANGA_CONCURRENT_CERTIFICATES).",
+        )
+        parser.add_argument(
+            "--manter",
+            action="store_true",
+            help="Não remove os veículos e certificados criados para o benchmark.",
+        )
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ANN401
+        """Prepara os dados, executa o lote e imprime o resultado."""
+        url_portal = getattr(settings, "FAKE_PORTRAN_URL", "")
+        if not url_portal or not settings.IPIRANGA_LOGIN_URL.startswith(url_portal):
+            raise CommandError(
+                "O benchmark só pode rodar contra o portal falso. "
+                "Use DJANGO_SETTINGS_MODULE=core.settings_fake_portran."
+            )
+
+        tamanho_frota = self._resetar_portal(url_portal)
+        if not 1 <= options["certificados"] <= tamanho_frota:
+            raise CommandError(
+                f"--certificados deve estar entre 1 e o tamanho da frota falsa "
+                f"({tamanho_frota}); use `fake_portran_server --frota` para aumentá-la."
+            )
+        run_in_worker_loop(invalidar_indice_placas())
+        certificados = self._criar_certificados(options["certificados"])
+        ids = [c.id for c in certificados]
+
+        inicio = time.perf_counter()
+        try:
+            falhas = run_in_worker_loop(
+                AutomacaoCommand().handle_many_async(ids, options["concorrencia"])
+            )
+        finally:
+            shutdown_browser_pool()
+        duracao = time.perf_counter() - inicio
+
+        sucessos = len(ids) - len(falhas)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(ids)} certificados em {duracao:.1f}s: "
+                f"{sucessos} sucesso(s), {len(falhas)} falha(s), "
+                f"{sucessos / duracao * 60:.1f} certificados/min"
+            )
+        )
+        for certificado_id, erro in falhas.items():
+            self.stdout.write(f"  Certificado ID {certificado_id}: {erro}")
+
+        if not options["manter"]:
+            self._remover(certificados)
+
+    @staticmethod
+    def _resetar_portal(url_portal: str) -> int:
+        """Restaura a frota do portal falso para que todo CIPP volte a estar vencido.
+
+        Returns:
+            O tamanho da frota falsa.
+        """
+        try:
+            with urlopen(  # URL local vinda dos settings.
+                Request(f"{url_portal}/__fake__/reset", method="POST"), timeout=10
+            ) as resposta:
+                return int(resposta.read())
+        except (OSError, ValueError) as e:
+            raise CommandError(
+                f"Portal falso indisponível em {url_portal}. "
+                f"Inicie-o com `python manage.py fake_portran_server`. ({e})"
+            ) from e
+
+    @staticmethod
+    def _criar_certificados(quantidade: int) -> list[CertificadoVeiculo]:
+        """Cria um certificado CIPP por veículo da frota falsa.
+
+        Usa `bulk_create` para não disparar o sinal que enfileira a automação no Celery.
+        """
+        certificados: list[CertificadoVeiculo] = []
+        for i in range(1, quantidade + 1):
+            placa = placa_falsa(i)
+            veiculo, _ = VeiculoIpiranga.objects.get_or_create(placa=placa)
+            certificado = CertificadoVeiculo(
+                veiculo=veiculo,
+                nome="Cipp",
+                tipo_licenca="Cipp",
+                numero_certificado=f"B{i:06d}",
+                data_vencimento=date(2030, 12, 31),
+            )
+            certificado.arquivo.save(
+                f"{placa}_CIPP_B{i:06d}_31122030.pdf",
+                ContentFile(PDF_MINIMO),
+                save=False,
+            )
+            certificado.arquivo_sha256 = (
+                ContentAddressedStorage.sha256_do_nome(certificado.arquivo.name) or ""
+            )
+            certificados.append(certificado)
+        return CertificadoVeiculo.objects.bulk_create(certificados)
+
+    @staticmethod
+    def _remover(certificados: list[CertificadoVeiculo]) -> None:
+        """Remove os certificados do benchmark e os arquivos que só eles usam.
+
+        O storage é endereçado pelo conteúdo: um arquivo (ou o mesmo conteúdo, sob
+        outro nome) ainda referenciado por outro certificado é mantido.
+        """
+        CertificadoVeiculo.objects.filter(pk__in=[c.id for c in certificados]).delete()
+        nomes = {str(c.arquivo.name) for c in certificados}
+        shas = {str(c.arquivo_sha256) for c in certificados} - {""}
+        em_uso = list(
+            CertificadoVeiculo.objects.filter(
+                Q(arquivo__in=nomes) | Q(arquivo_sha256__in=shas)
+            ).values_list("arquivo", "arquivo_sha256")
+        )
+        nomes_em_uso = {nome for nome, _ in em_uso}
+        shas_em_uso = {sha for _, sha in em_uso}
+        for certificado in certificados:
+            if (
+                certificado.arquivo.name in nomes_em_uso
+                or certificado.arquivo_sha256 in shas_em_uso
+            ):
+                continue
+            certificado.arquivo.delete(save=False)
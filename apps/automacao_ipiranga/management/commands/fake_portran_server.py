@@ -0,0 +1,72 @@
+"""Comando Django que sobe o portal Portran falso para testes de carga locais."""
+
+import logging
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.automacao_ipiranga.fake_portran import (
+    ConfiguracaoPortranFalso,
+    criar_servidor,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Serve o portal Portran falso até ser interrompido (Ctrl+C)."""
+
+    help = (
+        "Sobe um servidor local que imita o portal Portran "
+        "(use com DJANGO_SETTINGS_MODULE=core.settings_fake_portran)."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:  # noqa: PLR6301
+        """Adiciona os argumentos do servidor e da frota simulada."""
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--porta", type=int, default=8765)
+        parser.add_argument(
+            "--frota", type=int, default=100, help="Quantidade de veículos simulados."
+        )
+        parser.add_argument(
+            "--latencia-ms",
+            type=int,
+            default=150,
+            help="Latência adicionada a cada requisição.",
+        )
+        parser.add_argument(
+            "--jitter-ms",
+            type=int,
+            default=50,
+            help="Variação aleatória máxima somada à latência.",
+        )
+        parser.add_argument(
+            "--taxa-erro-login",
+            type=float,
+            default=0.1,
+            help="Probabilidade da página 'Erro Inesperado' após o login.",
+        )
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ANN401
+        """Inicia o servidor e bloqueia até a interrupção."""
+        config = ConfiguracaoPortranFalso(
+            tamanho_frota=options["frota"],
+            latencia_ms=options["latencia_ms"],
+            jitter_ms=options["jitter_ms"],
+            taxa_erro_login=options["taxa_erro_login"],
+            seed=options["seed"],
+        )
+        servidor = criar_servidor(options["host"], options["porta"], config)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Portal Portran falso em http://{options['host']}:{options['porta']} "
+                f"({config.tamanho_frota} veículos, {config.latencia_ms} ms de latência)"
+            )
+        )
+        try:
+            servidor.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Encerrando o portal falso...")
+        finally:
+            servidor.server_close()
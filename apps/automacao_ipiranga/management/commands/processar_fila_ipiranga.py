@@ -0,0 +1,98 @@
+"""Comando Django que processa a fila de certificados pendentes direto do banco."""
+
+import asyncio
+import logging
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from apps.automacao_ipiranga.browser_pool import (
+    run_in_worker_loop,
+    shutdown_browser_pool,
+)
+from apps.automacao_ipiranga.fila import reservar_proximos_certificados
+from apps.automacao_ipiranga.management.commands.automacao_documentos_ipiranga import (
+    Command as AutomacaoIpirangaCommand,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Worker da fila de certificados (`IPIRANGA_DISPATCH_MODE=fila`).
+
+    Cada ciclo reserva os certificados elegíveis mais antigos e os envia agrupados
+    por veículo; a reserva (SKIP LOCKED, na mesma transação da seleção) permite
+    rodar vários workers.
+    """
+
+    help = "Processa continuamente os certificados pendentes da automação Ipiranga."
+
+    def add_arguments(self, parser: CommandParser) -> None:  # noqa: PLR6301
+        """Adiciona as opções do worker."""
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=None,
+            help="Certificados selecionados por ciclo (padrão: IPIRANGA_QUEUE_BATCH_SIZE).",
+        )
+        parser.add_argument(
+            "--concorrencia",
+            type=int,
+            default=None,
+            help="Veículos em paralelo (padrão: IPIRANGA_CONCURRENT_CERTIFICATES).",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=None,
+            help="Segundos de espera com a fila vazia (padrão: IPIRANGA_QUEUE_POLL_INTERVAL).",
+        )
+        parser.add_argument(
+            "--uma-vez",
+            action="store_true",
+            help="Processa um único ciclo e encerra.",
+        )
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ANN401
+        """Executa o laço do worker até ser interrompido."""
+        try:
+            run_in_worker_loop(
+                self._processar(
+                    lote=options["lote"] or settings.IPIRANGA_QUEUE_BATCH_SIZE,
+                    concorrencia=options["concorrencia"],
+                    intervalo=options["intervalo"]
+                    or settings.IPIRANGA_QUEUE_POLL_INTERVAL,
+                    uma_vez=options["uma_vez"],
+                )
+            )
+        except KeyboardInterrupt:
+            self.stdout.write("Worker da fila interrompido.")
+        finally:
+            shutdown_browser_pool()
+
+    async def _processar(
+        self, lote: int, concorrencia: int | None, intervalo: float, uma_vez: bool
+    ) -> None:
+        automacao = AutomacaoIpirangaCommand()
+        while True:
+            certificado_ids = await sync_to_async(reservar_proximos_certificados)(lote)
+            falhas: dict[int, str] = {}
+            if certificado_ids:
+                logger.info(
+                    f"[FILA] {len(certificado_ids)} certificado(s) reservado(s): {certificado_ids}"
+                )
+                falhas = await automacao.handle_many_async(
+                    certificado_ids, concorrencia, reservados=True
+                )
+                for certificado_id, erro in falhas.items():
+                    self.stderr.write(
+                        self.style.ERROR(f"Certificado ID {certificado_id}: {erro}")
+                    )
+            if uma_vez:
+                return
+            # Fila vazia ou tudo adiado/falho (ex.: circuito aberto): evita um laço ocupado.
+            if not certificado_ids or len(falhas) == len(certificado_ids):
+                await asyncio.sleep(intervalo)
@@ -0,0 +1,69 @@
+"""Comando Django que agrega os tempos por etapa das execuções da automação Ipiranga."""
+
+import logging
+from datetime import timedelta
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from apps.automacao_documentos.models import LogExecucaoAutomacao
+from apps.automacao_ipiranga.timing import (
+    NOME_AUTOMACAO,
+    EstatisticaEtapa,
+    percentis_por_etapa,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Imprime p50/p95 por etapa a partir de `LogExecucaoAutomacao.detalhes_json`."""
+
+    help = "Mostra p50/p95 por etapa das execuções recentes da automação Ipiranga."
+
+    def add_arguments(self, parser: CommandParser) -> None:  # noqa: PLR6301
+        """Adiciona os filtros do relatório."""
+        parser.add_argument(
+            "--dias", type=int, default=7, help="Janela de execuções, em dias."
+        )
+        parser.add_argument(
+            "--status",
+            choices=[s for s, _ in LogExecucaoAutomacao.STATUS_CHOICES],
+            default=None,
+            help="Considera apenas execuções com este status.",
+        )
+
+    def handle(self, *args: str, **options: Any) -> None:  # noqa: ANN401
+        """Consulta os logs e imprime as tabelas de etapas e de esperas."""
+        logs = LogExecucaoAutomacao.objects.filter(
+            automacao__nome=NOME_AUTOMACAO,
+            data_inicio__gte=timezone.now() - timedelta(days=options["dias"]),
+        )
+        if options["status"]:
+            logs = logs.filter(status=options["status"])
+        detalhes = list(logs.values_list("detalhes_json", flat=True))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(detalhes)} execuções nos últimos {options['dias']} dias"
+            )
+        )
+        self._imprimir("Etapas", percentis_por_etapa(detalhes, "spans"))
+        self._imprimir("Esperas de prontidão", percentis_por_etapa(detalhes, "esperas"))
+
+    def _imprimir(self, titulo: str, estatisticas: dict[str, EstatisticaEtapa]) -> None:
+        self.stdout.write(f"\n{titulo}:")
+        if not estatisticas:
+            self.stdout.write("  (sem dados)")
+            return
+        self.stdout.write(
+            f"  {'etapa':<24} {'n':>6} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}"
+        )
+        for etapa, e in sorted(
+            estatisticas.items(), key=lambda item: item[1].p95_ms, reverse=True
+        ):
+            self.stdout.write(
+                f"  {etapa:<24} {e.amostras:>6} {e.p50_ms:>10.0f} "
+                f"{e.p95_ms:>10.0f} {e.max_ms:>10.0f}"
+            )
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:27
+
+import os
+import re
+from datetime import date
+
+from django.db import migrations, models
+
+# Mesmo formato de extract_certificate_data_from_filename, copiado para que a
+# migração não dependa do código atual: PLACA_TIPOLICENCA_NUMERO_DDMMAAAA.pdf
+PADRAO_NOME_ARQUIVO = re.compile(
+    r"([A-Z0-9]+)_([A-Z0-9_]+)_([A-Z0-9]+)_(\d{2})(\d{2})(\d{4})\.pdf", re.IGNORECASE
+)
+
+
+def preencher_metadados(apps, schema_editor):
+    CertificadoVeiculo = apps.get_model('automacao_ipiranga', 'CertificadoVeiculo')
+    atualizados = []
+    for certificado in CertificadoVeiculo.objects.only('id', 'arquivo').iterator():
+        match = PADRAO_NOME_ARQUIVO.match(os.path.basename(certificado.arquivo.name or ''))
+        if not match:
+            continue
+        certificado.tipo_licenca = match.group(2).replace('_', ' ').title()
+        certificado.numero_certificado = match.group(3)
+        try:
+            certificado.data_vencimento = date(
+                int(match.group(6)), int(match.group(5)), int(match.group(4))
+            )
+        except ValueError:
+            certificado.data_vencimento = None
+        atualizados.append(certificado)
+    CertificadoVeiculo.objects.bulk_update(
+        atualizados,
+        ['tipo_licenca', 'numero_certificado', 'data_vencimento'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automacao_ipiranga', '0002_certificadoveiculo_tentativas_automacao_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificadoveiculo',
+            name='data_vencimento',
+            field=models.DateField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificadoveiculo',
+            name='numero_certificado',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='certificadoveiculo',
+            name='tipo_licenca',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.RunPython(preencher_metadados, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automacao_ipiranga', '0003_certificadoveiculo_metadados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificadoveiculo',
+            name='reservado_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='certificadoveiculo',
+            name='status',
+            field=models.CharField(choices=[('pendente', 'Pendente de Envio'), ('processando', 'Em Processamento'), ('enviado', 'Enviado com Sucesso'), ('falha', 'Falha no Envio'), ('falha_max_tentativas', 'Falha: Máximo de Tentativas Atingido'), ('falha_outros_vencidos', 'Falha: Outros Certificados Vencidos')], default='pendente', max_length=30),
+        ),
+        migrations.AddIndex(
+            model_name='certificadoveiculo',
+            index=models.Index(fields=['status', 'data_criacao'], name='certificado_fila_idx'),
+        ),
+    ]
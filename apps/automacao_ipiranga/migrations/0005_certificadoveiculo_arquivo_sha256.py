@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:38
+
+import hashlib
+
+import apps.common.storage
+from django.db import migrations, models
+
+
+def calcular_sha256(apps, schema_editor):
+    # Arquivos já gravados permanecem onde estão; apenas o hash é registrado.
+    CertificadoVeiculo = apps.get_model('automacao_ipiranga', 'CertificadoVeiculo')
+    atualizados = []
+    for certificado in CertificadoVeiculo.objects.only('id', 'arquivo').iterator():
+        if not certificado.arquivo or not certificado.arquivo.storage.exists(
+            certificado.arquivo.name
+        ):
+            continue
+        digest = hashlib.sha256()
+        with certificado.arquivo.open('rb') as arquivo:
+            for bloco in arquivo.chunks():
+                digest.update(bloco)
+        certificado.arquivo_sha256 = digest.hexdigest()
+        atualizados.append(certificado)
+    CertificadoVeiculo.objects.bulk_update(
+        atualizados, ['arquivo_sha256'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automacao_ipiranga', '0004_certificadoveiculo_fila'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificadoveiculo',
+            name='arquivo_sha256',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='certificadoveiculo',
+            name='arquivo',
+            field=models.FileField(max_length=255, storage=apps.common.storage.ContentAddressedStorage(), upload_to='certificados_veiculos/'),
+        ),
+        migrations.RunPython(calcular_sha256, migrations.RunPython.noop),
+    ]
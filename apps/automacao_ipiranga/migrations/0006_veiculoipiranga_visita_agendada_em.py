@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automacao_ipiranga', '0005_certificadoveiculo_arquivo_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='veiculoipiranga',
+            name='visita_agendada_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automacao_ipiranga', '0006_veiculoipiranga_visita_agendada_em'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='veiculoipiranga',
+            name='documentos_vencidos',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
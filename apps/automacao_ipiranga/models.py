@@ -1,19 +1,21 @@
 """Modelos para o aplicativo automacao_ipiranga."""
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import TYPE_CHECKING, ClassVar
 
 from django.db import models
 from django.db.models import (
     AutoField,
     CharField,
+    DateField,
     DateTimeField,
     FileField,
     ForeignKey,
     IntegerField,
+    JSONField,
 )  # Import specific field types for better typing
 
-from apps.common.storage import OriginalFilenameStorage
+from apps.common.storage import ContentAddressedStorage
 
 if TYPE_CHECKING:
     from django.db.models.manager import Manager
@@ -27,9 +29,19 @@ class VeiculoIpiranga(models.Model):
     status_documentos: CharField[str, str] = models.CharField(
         max_length=255, blank=True, default=""
     )
+    # Nomes dos certificados vencidos lidos na última visita (lista completa; o
+    # resumo em `status_documentos` é truncado e serve apenas para exibição)
+    documentos_vencidos: JSONField = models.JSONField(  # type: ignore[reportUnknownVariableType, reportMissingTypeArgument]
+        null=True, blank=True
+    )
     data_atualizacao: DateTimeField[datetime, datetime] = models.DateTimeField(
         auto_now=True
     )
+    # Visita agendada e ainda não concluída (agrupa os certificados enviados em
+    # sequência); visível a todos os processos, ao contrário de um cache local
+    visita_agendada_em: DateTimeField[datetime | None, datetime | None] = (
+        models.DateTimeField(null=True, blank=True)
+    )
 
     objects: ClassVar[Manager["VeiculoIpiranga"]] = models.Manager()  # type: ignore[reportIncompatibleVariableOverride, reportUndefinedVariable]
 
@@ -49,6 +61,7 @@ class CertificadoVeiculo(models.Model):
     id: AutoField[int, int] = models.AutoField(primary_key=True)
     STATUS_CHOICES: ClassVar[list[tuple[str, str]]] = [
         ("pendente", "Pendente de Envio"),
+        ("processando", "Em Processamento"),
         ("enviado", "Enviado com Sucesso"),
         ("falha", "Falha no Envio"),
         ("falha_max_tentativas", "Falha: Máximo de Tentativas Atingido"),
@@ -59,13 +72,33 @@ class CertificadoVeiculo(models.Model):
         VeiculoIpiranga, on_delete=models.CASCADE, related_name="certificados"
     )
     nome: CharField[str, str] = models.CharField(max_length=255)
+    # Dados extraídos do nome do arquivo na ingestão (PLACA_TIPO_NUMERO_DDMMAAAA.pdf)
+    tipo_licenca: CharField[str, str] = models.CharField(
+        max_length=100, blank=True, default=""
+    )
+    numero_certificado: CharField[str, str] = models.CharField(
+        max_length=50, blank=True, default="", db_index=True
+    )
+    data_vencimento: DateField[date | None, date | None] = models.DateField(
+        null=True, blank=True, db_index=True
+    )
     arquivo: FileField = models.FileField(
-        upload_to="certificados_veiculos/", storage=OriginalFilenameStorage()
+        upload_to="certificados_veiculos/",
+        storage=ContentAddressedStorage(),
+        max_length=255,
+    )
+    # SHA-256 do conteúdo de `arquivo`, para reconhecer reenvios do mesmo PDF
+    arquivo_sha256: CharField[str, str] = models.CharField(
+        max_length=64, blank=True, default="", db_index=True
     )
     status: CharField[str, str] = models.CharField(
         max_length=30, choices=STATUS_CHOICES, default="pendente"
     )
     tentativas_automacao: IntegerField[int, int] = models.IntegerField(default=0)
+    # Instante em que um worker reservou o certificado (status "processando")
+    reservado_em: DateTimeField[datetime | None, datetime | None] = (
+        models.DateTimeField(null=True, blank=True)
+    )
     data_criacao: DateTimeField[datetime, datetime] = models.DateTimeField(
         auto_now_add=True
     )
@@ -78,6 +111,17 @@ class CertificadoVeiculo(models.Model):
 
     objects: ClassVar[Manager["CertificadoVeiculo"]] = models.Manager()  # type: ignore[reportIncompatibleVariableOverride]
 
+    class Meta:
+        """Meta options para o modelo CertificadoVeiculo."""
+
+        app_label = "automacao_ipiranga"
+        indexes: ClassVar[list[models.Index]] = [
+            # Fila de trabalho: certificados por status, do mais antigo ao mais novo.
+            models.Index(
+                fields=["status", "data_criacao"], name="certificado_fila_idx"
+            ),
+        ]
+
     def __str__(self) -> str:
         """Retorna o nome do certificado e a placa do veículo associado."""
         return f"{self.nome} - {self.veiculo.placa}"
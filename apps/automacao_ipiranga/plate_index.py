@@ -0,0 +1,194 @@
+"""Índice de placas da frota construído a partir das listagens do portal Ipiranga.
+
+As listagens "Vencidos" e "À vencer" são lidas uma única vez (via HTTP quando
+possível, senão um snapshot da tabela renderizada) e o mapeamento placa → listagem/link de edição fica no
+cache do Django, compartilhado entre workers quando o backend é o Redis.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from dataclasses import dataclass, field, replace
+from typing import cast
+
+from django.conf import settings
+from django.core.cache import cache
+from playwright.async_api import Page
+
+from apps.automacao_ipiranga.dom_snapshot import (
+    SELETOR_TABELA_VEICULO,
+    LinhaVeiculo,
+    snapshot_tabela_veiculos,
+)
+from apps.automacao_ipiranga.html_snapshot import buscar_html, extrair_tabela_veiculos
+from apps.automacao_ipiranga.readiness import EsperasPagina
+from apps.common.locks import lock_do_loop
+from apps.common.rate_limit import registrar_sucesso_portran
+
+CHAVE_CACHE_INDICE = "automacao_ipiranga:indice_placas"
+
+
+def normalizar_placa(texto: str) -> str:
+    """Remove separadores e padroniza a placa em maiúsculas."""
+    return re.sub(r"[^A-Z0-9]", "", texto.upper())
+
+
+def listagens_portal() -> list[tuple[str, str]]:
+    """Retorna as listagens de veículos na ordem de prioridade de busca."""
+    return [
+        (settings.IPIRANGA_VENCIDOS_URL, "Vencidos"),
+        (settings.IPIRANGA_A_VENCER_URL, "À vencer"),
+    ]
+
+
+@dataclass(frozen=True)
+class EntradaIndicePlaca:
+    """Localização de um veículo nas listagens do portal."""
+
+    placa: str
+    listagem: str
+    url_listagem: str
+    href_edicao: str = ""
+
+
+@dataclass
+class IndicePlacas:
+    """Mapeamento placa → entrada, com o instante de construção."""
+
+    placas: dict[str, EntradaIndicePlaca] = field(default_factory=dict)
+    construido_em: float = field(default_factory=time.time)
+
+    def buscar(self, placa: str) -> EntradaIndicePlaca | None:
+        """Busca a entrada de uma placa no índice."""
+        return self.placas.get(normalizar_placa(placa))
+
+
+async def obter_indice_placas() -> IndicePlacas | None:
+    """Retorna o índice em cache, ou None se não existir ou tiver expirado."""
+    return cast(IndicePlacas | None, await cache.aget(CHAVE_CACHE_INDICE))
+
+
+async def salvar_indice_placas(indice: IndicePlacas) -> None:
+    """Grava o índice no cache pelo tempo restante de seu TTL."""
+    restante = settings.IPIRANGA_PLATE_INDEX_TTL - (time.time() - indice.construido_em)
+    if restante > 0:
+        await cache.aset(CHAVE_CACHE_INDICE, indice, timeout=restante)
+
+
+async def invalidar_indice_placas() -> None:
+    """Descarta o índice em cache, forçando uma reconstrução."""
+    await cache.adelete(CHAVE_CACHE_INDICE)
+
+
+async def ler_listagem(
+    esperas: EsperasPagina,
+    nome_pagina: str,
+    url: str,
+    logger: logging.Logger,
+    pagina_irma: bool = False,
+) -> tuple[list[LinhaVeiculo] | None, Page | None]:
+    """Lê as linhas de uma listagem, ou None se estiver indisponível.
+
+    Com `IPIRANGA_HTTP_SNAPSHOTS`, busca o HTML sem renderizar e só recorre ao
+    navegador se a tabela não vier no HTML (ou a sessão não for aceita). Com
+    `pagina_irma`, a renderização ocorre em uma nova página do mesmo contexto, para
+    que várias listagens carreguem ao mesmo tempo.
+
+    Returns:
+        As linhas e a página em que a listagem ficou renderizada (None via HTTP).
+    """
+    etapa = f"listagem_{nome_pagina}"
+    if settings.IPIRANGA_HTTP_SNAPSHOTS:
+        html = await buscar_html(esperas, etapa, url)
+        linhas = extrair_tabela_veiculos(html) if html is not None else None
+        if linhas is not None:
+            await registrar_sucesso_portran()
+            return linhas, None
+        logger.info(
+            f"[INDICE_PLACAS] Listagem {nome_pagina} sem tabela no HTML; usando o navegador."
+        )
+    if pagina_irma:
+        esperas = replace(esperas, page=await esperas.page.context.new_page())
+    try:
+        await esperas.navegar(etapa, url, SELETOR_TABELA_VEICULO)
+    except Exception as e:
+        logger.warning(f"[INDICE_PLACAS] Listagem {nome_pagina} indisponível: {e}")
+        if pagina_irma:
+            await esperas.page.close()
+        return None, None
+    return await snapshot_tabela_veiculos(esperas.page), esperas.page
+
+
+async def construir_indice_placas(
+    esperas: EsperasPagina,
+    logger: logging.Logger,
+    paginas_listagem: dict[str, Page] | None = None,
+) -> IndicePlacas:
+    """Lê as listagens do portal ao mesmo tempo e constrói o índice de placas.
+
+    A primeira listagem usa a página de `esperas`; as demais, páginas irmãs do
+    mesmo contexto. Quando `paginas_listagem` é informado, recebe as páginas que
+    renderizaram cada listagem (por URL) para que o clique no veículo ocorra nelas;
+    caso contrário, as páginas irmãs são fechadas.
+    """
+    listagens = listagens_portal()
+    for url, nome_pagina in listagens:
+        logger.info(f"[INDICE_PLACAS] Lendo listagem {nome_pagina} ({url})")
+    leituras = await asyncio.gather(
+        *(
+            ler_listagem(esperas, nome_pagina, url, logger, pagina_irma=i > 0)
+            for i, (url, nome_pagina) in enumerate(listagens)
+        )
+    )
+
+    indice = IndicePlacas()
+    completo = True
+    for (url, nome_pagina), (linhas, pagina) in zip(listagens, leituras, strict=True):
+        if linhas is None:
+            completo = False
+            continue
+        if pagina is not None:
+            if paginas_listagem is not None:
+                paginas_listagem[url] = pagina
+            elif pagina is not esperas.page:
+                await pagina.close()
+
+        for linha in linhas:
+            placa = normalizar_placa(linha.placa)
+            # A listagem de vencidos tem prioridade quando a placa aparece nas duas.
+            if placa and placa not in indice.placas:
+                indice.placas[placa] = EntradaIndicePlaca(
+                    placa=placa,
+                    listagem=nome_pagina,
+                    url_listagem=url,
+                    href_edicao=linha.href_edicao,
+                )
+
+    logger.info(f"[INDICE_PLACAS] Índice construído com {len(indice.placas)} placas.")
+    if completo:
+        await salvar_indice_placas(indice)
+    else:
+        # Um índice parcial faria placas válidas falharem rápido; não é persistido.
+        logger.warning("[INDICE_PLACAS] Índice parcial não foi gravado em cache.")
+    return indice
+
+
+async def obter_ou_construir_indice_placas(
+    esperas: EsperasPagina,
+    logger: logging.Logger,
+    paginas_listagem: dict[str, Page] | None = None,
+) -> IndicePlacas:
+    """Retorna o índice em cache ou o constrói, uma única vez por processo.
+
+    Com vários certificados em execução concorrente, apenas o primeiro contexto
+    percorre as listagens; os demais aguardam e reutilizam o índice gravado.
+    """
+    indice = await obter_indice_placas()
+    if indice is not None:
+        return indice
+    async with lock_do_loop("indice_placas"):
+        indice = await obter_indice_placas()
+        if indice is None:
+            indice = await construir_indice_placas(esperas, logger, paginas_listagem)
+        return indice
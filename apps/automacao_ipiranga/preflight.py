@@ -0,0 +1,99 @@
+"""Verificação de elegibilidade do veículo antes do upload dos certificados.
+
+O portal só permite salvar o veículo quando todos os certificados vencidos são
+substituídos na mesma visita. Os painéis lidos na aba de certificados indicam, antes
+de qualquer upload, se a visita pode ser concluída. O resultado fica em
+`VeiculoIpiranga.documentos_vencidos` (com um resumo legível em
+`status_documentos`), de modo que visitas seguintes à mesma placa
+possam ser recusadas (ou adiadas) sem abrir o portal enquanto a informação é recente.
+"""
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.automacao_ipiranga.dom_snapshot import PainelCertificado
+from apps.automacao_ipiranga.models import VeiculoIpiranga
+
+PREFIXO_VENCIDOS = "Vencidos: "
+SEM_VENCIDOS = "Sem vencidos"
+SEPARADOR = " | "
+
+
+@dataclass(frozen=True)
+class ResultadoPreflight:
+    """Certificados vencidos do veículo que a visita não substitui."""
+
+    outros_vencidos: list[str]
+    do_cache: bool
+
+    @property
+    def elegivel(self) -> bool:
+        """Indica se o veículo poderá ser salvo ao fim da visita."""
+        return not self.outros_vencidos
+
+
+def _corresponde(nome_painel: str, nome_certificado: str) -> bool:
+    # Mesmo critério de `PainelCertificado.corresponde`.
+    return nome_certificado.upper() in nome_painel.upper()
+
+
+def avaliar(
+    nomes_vencidos: Iterable[str], nomes_certificados: Iterable[str], do_cache: bool
+) -> ResultadoPreflight:
+    """Compara os certificados vencidos do veículo com os enviados na visita."""
+    nomes_certificados = list(nomes_certificados)
+    return ResultadoPreflight(
+        outros_vencidos=[
+            nome
+            for nome in nomes_vencidos
+            if not any(_corresponde(nome, c) for c in nomes_certificados)
+        ],
+        do_cache=do_cache,
+    )
+
+
+def avaliar_paineis(
+    paineis: list[PainelCertificado], nomes_certificados: Iterable[str]
+) -> ResultadoPreflight:
+    """Avalia a visita a partir dos painéis lidos na página do veículo."""
+    return avaliar(
+        (p.nome for p in paineis if p.vencido), nomes_certificados, do_cache=False
+    )
+
+
+def resumo_status_documentos(nomes_vencidos: Iterable[str]) -> str:
+    """Resumo legível gravado em `VeiculoIpiranga.status_documentos` (truncado)."""
+    nomes = list(nomes_vencidos)
+    if not nomes:
+        return SEM_VENCIDOS
+    return (PREFIXO_VENCIDOS + SEPARADOR.join(nomes))[:255]
+
+
+def vencidos_em_cache(veiculo: VeiculoIpiranga) -> list[str] | None:
+    """Certificados vencidos registrados na última visita, se a informação é recente.
+
+    Returns:
+        Os nomes dos painéis vencidos, lista vazia se não havia vencidos, ou None se
+        não há registro dentro de `IPIRANGA_PREFLIGHT_CACHE_TTL`.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.IPIRANGA_PREFLIGHT_CACHE_TTL)
+    if veiculo.data_atualizacao is None or veiculo.data_atualizacao < limite:
+        return None
+    vencidos = veiculo.documentos_vencidos
+    if not isinstance(vencidos, list):
+        return None
+    return [str(nome) for nome in vencidos]
+
+
+def gravar_status_documentos(veiculo_id: int, nomes_vencidos: Iterable[str]) -> None:
+    """Registra os certificados vencidos do veículo (atualiza `data_atualizacao`)."""
+    nomes = list(nomes_vencidos)
+    VeiculoIpiranga.objects.filter(pk=veiculo_id).update(
+        documentos_vencidos=nomes,
+        status_documentos=resumo_status_documentos(nomes),
+        data_atualizacao=timezone.now(),
+    )
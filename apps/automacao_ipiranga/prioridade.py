@@ -0,0 +1,65 @@
+"""Prioridade das visitas aos veículos na fila do Celery, pela urgência dos certificados.
+
+Com o broker Redis configurado com `priority_steps` (ver
+`CELERY_BROKER_TRANSPORT_OPTIONS`), as mensagens de menor prioridade numérica são
+entregues primeiro. Veículos já bloqueados na listagem "Vencidos" do portal vêm
+antes dos que estão "À vencer", e estes antes dos que não constam do índice de
+placas. Dentro de cada faixa, certificados de validade mais curta
+(`CertificadoVeiculo.data_vencimento`) passam à frente.
+"""
+
+from datetime import date
+from typing import cast
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.automacao_ipiranga.models import CertificadoVeiculo
+from apps.automacao_ipiranga.plate_index import CHAVE_CACHE_INDICE, IndicePlacas
+
+# Primeira prioridade de cada faixa; cada faixa ocupa três níveis (0 a 8).
+FAIXA_POR_LISTAGEM = {"Vencidos": 0, "À vencer": 3}
+FAIXA_FORA_DO_INDICE = 6
+DIAS_VALIDADE_CURTA = 90
+DIAS_VALIDADE_MEDIA = 365
+
+
+def prioridade_certificado(
+    data_vencimento: date | None, listagem: str | None, hoje: date
+) -> int:
+    """Prioridade Celery (0 = mais urgente) de um certificado pendente.
+
+    Args:
+        data_vencimento: Vencimento do novo certificado, se conhecido.
+        listagem: Listagem do portal em que a placa está ("Vencidos", "À vencer") ou
+            None se a placa não consta do índice.
+        hoje: Data de referência.
+    """
+    faixa = FAIXA_POR_LISTAGEM.get(listagem or "", FAIXA_FORA_DO_INDICE)
+    if data_vencimento is None:
+        return faixa + 1
+    dias = (data_vencimento - hoje).days
+    if dias <= DIAS_VALIDADE_CURTA:
+        return faixa
+    if dias <= DIAS_VALIDADE_MEDIA:
+        return faixa + 1
+    return faixa + 2
+
+
+def prioridade_veiculo(veiculo_id: int) -> int:
+    """Prioridade da visita ao veículo: a do seu certificado pendente mais urgente."""
+    pendentes = list(
+        CertificadoVeiculo.objects.filter(
+            veiculo_id=veiculo_id, status="pendente"
+        ).values_list("data_vencimento", "veiculo__placa")
+    )
+    if not pendentes:
+        return FAIXA_FORA_DO_INDICE + 1
+    indice = cast(IndicePlacas | None, cache.get(CHAVE_CACHE_INDICE))
+    entrada = indice.buscar(pendentes[0][1]) if indice else None
+    listagem = entrada.listagem if entrada else None
+    hoje = timezone.localdate()
+    return min(
+        prioridade_certificado(data_vencimento, listagem, hoje)
+        for data_vencimento, _ in pendentes
+    )
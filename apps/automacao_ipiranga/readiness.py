@@ -0,0 +1,170 @@
+"""Estratégias de prontidão de página para as etapas da automação Ipiranga.
+
+Em vez de `wait_for_load_state("networkidle")` (que espera 500 ms sem tráfego e
+nunca conclui se o portal fizer polling) e de pausas fixas, cada etapa espera pela
+condição específica de que precisa: um elemento visível, uma URL ou uma resposta
+HTTP (ou, sem uma URL conhecida, uma mudança no DOM). Toda espera é cronometrada para identificar quais dominam o tempo da execução.
+"""
+
+import logging
+import re
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from http import HTTPStatus
+
+from playwright.async_api import Locator, Page, Response, expect
+
+from apps.common.deadline import Deadline, limite_ms
+from apps.common.rate_limit import registrar_erro_portran, registrar_sucesso_portran
+
+TIMEOUT_PADRAO_MS = 30000
+
+
+class RespostaInesperadaError(Exception):
+    """A resposta HTTP aguardada por uma etapa chegou com status de erro."""
+
+    def __init__(self, etapa: str, status: int, url: str) -> None:
+        """Registra a etapa e a resposta recebida."""
+        super().__init__(f"{etapa}: resposta {status} de {url}")
+        self.etapa = etapa
+        self.status = status
+
+
+@dataclass(frozen=True)
+class MedicaoEspera:
+    """Duração de uma espera de prontidão."""
+
+    etapa: str
+    estrategia: str
+    duracao_ms: float
+    sucesso: bool
+
+
+@dataclass
+class EsperasPagina:
+    """Executa e cronometra as esperas de prontidão de uma página."""
+
+    page: Page
+    logger: logging.Logger
+    medicoes: list[MedicaoEspera] = field(default_factory=list[MedicaoEspera])
+    deadline: Deadline | None = None
+
+    def timeout_ms(self, maximo_ms: float = 60000, etapa: str = "") -> float:
+        """Timeout de uma chamada, limitado ao que resta do prazo da execução."""
+        return limite_ms(self.deadline, maximo_ms, etapa)
+
+    @contextmanager
+    def medir(self, etapa: str, estrategia: str) -> Iterator[None]:
+        """Cronometra o bloco como uma espera da etapa."""
+        inicio = time.perf_counter()
+        sucesso = False
+        try:
+            yield
+            sucesso = True
+        finally:
+            medicao = MedicaoEspera(
+                etapa=etapa,
+                estrategia=estrategia,
+                duracao_ms=(time.perf_counter() - inicio) * 1000,
+                sucesso=sucesso,
+            )
+            self.medicoes.append(medicao)
+            self.logger.debug(
+                f"[ESPERA] {etapa} ({estrategia}): {medicao.duracao_ms:.0f} ms"
+                + ("" if sucesso else " (falhou)")
+            )
+
+    async def navegar(
+        self, etapa: str, url: str, seletor_pronto: str, timeout_ms: float = 60000
+    ) -> None:
+        """Abre a URL e aguarda apenas o DOM e o elemento de que a etapa precisa."""
+        with self.medir(etapa, f"goto+{seletor_pronto}"):
+            resposta = await self.page.goto(
+                url,
+                wait_until="domcontentloaded",
+                timeout=self.timeout_ms(timeout_ms, etapa),
+            )
+            if (
+                resposta is not None
+                and resposta.status >= HTTPStatus.INTERNAL_SERVER_ERROR
+            ):
+                await registrar_erro_portran()
+            else:
+                await registrar_sucesso_portran()
+            await self.page.locator(seletor_pronto).first.wait_for(
+                state="visible", timeout=self.timeout_ms(timeout_ms, etapa)
+            )
+
+    async def elemento_visivel(
+        self, etapa: str, seletor: str, timeout_ms: float = TIMEOUT_PADRAO_MS
+    ) -> None:
+        """Aguarda o primeiro elemento do seletor ficar visível."""
+        with self.medir(etapa, f"visivel:{seletor}"):
+            await self.page.locator(seletor).first.wait_for(
+                state="visible", timeout=self.timeout_ms(timeout_ms, etapa)
+            )
+
+    async def url(
+        self, etapa: str, padrao: re.Pattern[str], timeout_ms: float = 60000
+    ) -> None:
+        """Aguarda a página chegar a uma URL que corresponda ao padrão."""
+        with self.medir(etapa, f"url:{padrao.pattern}"):
+            await expect(self.page).to_have_url(
+                padrao, timeout=self.timeout_ms(timeout_ms, etapa)
+            )
+
+    @asynccontextmanager
+    async def resposta(
+        self,
+        etapa: str,
+        predicado: Callable[[Response], bool],
+        timeout_ms: float = TIMEOUT_PADRAO_MS,
+    ) -> AsyncIterator[None]:
+        """Aguarda, após a ação executada no bloco, a resposta HTTP esperada.
+
+        Raises:
+            RespostaInesperadaError: Se a resposta chegar com status de erro.
+        """
+        with self.medir(etapa, "resposta"):
+            async with self.page.expect_response(
+                predicado, timeout=self.timeout_ms(timeout_ms, etapa)
+            ) as info:
+                yield
+            resposta = await info.value
+            self.logger.debug(
+                f"[ESPERA] {etapa}: resposta {resposta.status} de {resposta.url}"
+            )
+            if not resposta.ok:
+                if resposta.status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+                    await registrar_erro_portran()
+                raise RespostaInesperadaError(etapa, resposta.status, resposta.url)
+
+    @asynccontextmanager
+    async def mudanca_dom(
+        self, etapa: str, alvo: Locator, timeout_ms: float = TIMEOUT_PADRAO_MS
+    ) -> AsyncIterator[None]:
+        """Aguarda, após a ação executada no bloco, uma mudança no conteúdo do alvo.
+
+        Não depende de URLs do portal: basta que o HTML do elemento mude (ou que ele
+        seja removido da página).
+        """
+        elemento = await alvo.element_handle(timeout=self.timeout_ms(timeout_ms, etapa))
+        antes = await elemento.evaluate("e => e.innerHTML")
+        yield
+        with self.medir(etapa, "mudanca_dom"):
+            await self.page.wait_for_function(
+                "([e, antes]) => !e.isConnected || e.innerHTML !== antes",
+                arg=[elemento, antes],
+                timeout=self.timeout_ms(timeout_ms, etapa),
+            )
+
+    def resumo(self) -> str:
+        """Esperas ordenadas da mais lenta para a mais rápida."""
+        total = sum(m.duracao_ms for m in self.medicoes)
+        partes = [
+            f"{m.etapa}={m.duracao_ms:.0f}ms"
+            for m in sorted(self.medicoes, key=lambda m: m.duracao_ms, reverse=True)
+        ]
+        return f"{total:.0f} ms em esperas: " + ", ".join(partes)
@@ -0,0 +1,131 @@
+"""Política de interceptação de requisições dos contextos da automação Ipiranga.
+
+Aborta os tipos de recurso que a automação nunca lê (imagens, fontes, mídia) e
+requisições para domínios de rastreamento, reduzindo banda e CPU por navegador, e
+submete as navegações ao limitador de taxa do Portran.
+"""
+
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from urllib.parse import urlparse
+
+from django.conf import settings
+from playwright.async_api import BrowserContext, Request, Route
+
+from apps.common.rate_limit import aguardar_vez_portran
+
+
+@dataclass
+class EstatisticasRequisicoes:
+    """Contadores de requisições bloqueadas e tráfego efetivamente recebido."""
+
+    bloqueadas_por_tipo: Counter[str] = field(default_factory=Counter[str])
+    requisicoes_concluidas: int = 0
+    bytes_recebidos: int = 0
+    inicio: float = field(default_factory=time.monotonic)
+
+    def resumo(self) -> str:
+        """Resumo legível para o log da execução."""
+        bloqueadas = sum(self.bloqueadas_por_tipo.values())
+        detalhes = ", ".join(
+            f"{tipo}={total}" for tipo, total in self.bloqueadas_por_tipo.most_common()
+        )
+        return (
+            f"{bloqueadas} requisições bloqueadas ({detalhes or 'nenhuma'}); "
+            f"{self.requisicoes_concluidas} concluídas, "
+            f"{self.bytes_recebidos / 1024:.1f} KiB recebidos em "
+            f"{time.monotonic() - self.inicio:.1f}s"
+        )
+
+
+class PoliticaRequisicoes:
+    """Decide quais requisições de um contexto devem ser abortadas."""
+
+    def __init__(
+        self,
+        tipos_bloqueados: list[str],
+        dominios_bloqueados: list[str],
+        limitar_navegacoes: bool = False,
+    ) -> None:
+        """Inicializa a política com os tipos de recurso e domínios bloqueados.
+
+        Com `limitar_navegacoes`, cada navegação de documento aguarda sua vez no
+        limitador de taxa compartilhado do Portran antes de seguir.
+        """
+        self.limitar_navegacoes = limitar_navegacoes
+        self.tipos_bloqueados = frozenset(
+            t.strip().lower() for t in tipos_bloqueados if t.strip()
+        )
+        self.dominios_bloqueados = tuple(
+            d.strip().lower() for d in dominios_bloqueados if d.strip()
+        )
+
+    @property
+    def ativa(self) -> bool:
+        """Indica se há algo a interceptar (sem regras, não intercepta nada)."""
+        return bool(
+            self.tipos_bloqueados or self.dominios_bloqueados or self.limitar_navegacoes
+        )
+
+    def motivo_bloqueio(self, request: Request) -> str | None:
+        """Retorna o motivo do bloqueio da requisição, ou None se permitida."""
+        if request.resource_type in self.tipos_bloqueados:
+            return request.resource_type
+        host = (urlparse(request.url).hostname or "").lower()
+        if any(host == d or host.endswith(f".{d}") for d in self.dominios_bloqueados):
+            return "rastreador"
+        return None
+
+    async def instalar(
+        self,
+        context: BrowserContext,
+        estatisticas: EstatisticasRequisicoes | None = None,
+    ) -> None:
+        """Registra a rota de interceptação (e a coleta de estatísticas) no contexto."""
+
+        async def tratar_rota(route: Route) -> None:
+            motivo = self.motivo_bloqueio(route.request)
+            if motivo is None:
+                if self.limitar_navegacoes and route.request.is_navigation_request():
+                    await aguardar_vez_portran("navegacao")
+                await route.continue_()
+                return
+            if estatisticas is not None:
+                estatisticas.bloqueadas_por_tipo[motivo] += 1
+            await route.abort()
+
+        async def registrar_concluida(request: Request) -> None:
+            assert estatisticas is not None
+            estatisticas.requisicoes_concluidas += 1
+            try:
+                tamanhos = await request.sizes()
+            except Exception:
+                return
+            estatisticas.bytes_recebidos += (
+                tamanhos["responseBodySize"] + tamanhos["responseHeadersSize"]
+            )
+
+        if self.ativa:
+            await context.route("**/*", tratar_rota)
+        if estatisticas is not None:
+            context.on("requestfinished", registrar_concluida)
+
+
+async def instalar_politica_requisicoes(
+    context: BrowserContext,
+) -> EstatisticasRequisicoes | None:
+    """Aplica a política configurada nos settings ao contexto.
+
+    Retorna as estatísticas da execução quando `IPIRANGA_REQUEST_STATS` está ativo.
+    """
+    politica = PoliticaRequisicoes(
+        settings.IPIRANGA_BLOCKED_RESOURCE_TYPES,
+        settings.IPIRANGA_BLOCKED_DOMAINS,
+        limitar_navegacoes=settings.PORTRAN_RATE_LIMIT_ENABLED,
+    )
+    estatisticas = (
+        EstatisticasRequisicoes() if settings.IPIRANGA_REQUEST_STATS else None
+    )
+    await politica.instalar(context, estatisticas)
+    return estatisticas
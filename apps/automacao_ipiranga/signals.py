@@ -3,13 +3,14 @@
 import logging
 from typing import Any, cast
 
+from django.conf import settings
 from django.db import transaction
 from django.db.models import Model
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 from apps.automacao_ipiranga.models import CertificadoVeiculo
-from apps.automacao_ipiranga.tasks import run_automacao_ipiranga_task
+from apps.automacao_ipiranga.tasks import agendar_automacao_veiculo
 
 logger = logging.getLogger(__name__)
 
@@ -31,12 +32,16 @@ def trigger_automacao_certificado(
         f"Sender: {sender.__name__}, Instance ID: {certificado_instance.id}, "  # type: ignore[reportUnknownMemberType]
         f"Created: {created}, Status: {certificado_instance.status}"  # type: ignore[reportUnknownMemberType]
     )
+    if settings.IPIRANGA_DISPATCH_MODE == "fila":
+        # O comando processar_fila_ipiranga reserva os pendentes direto no banco.
+        return
     if created and certificado_instance.status == "pendente":  # type: ignore[reportUnknownMemberType]
         logger.info(
-            f"[SIGNAL] Condições atendidas (objeto criado e pendente). Disparando automação para o Certificado ID: {certificado_instance.id} via Celery."  # type: ignore[reportUnknownMemberType]
+            f"[SIGNAL] Condições atendidas (objeto criado e pendente). Agendando a visita ao veículo do Certificado ID: {certificado_instance.id} via Celery."  # type: ignore[reportUnknownMemberType]
         )
+        # Certificados do mesmo veículo enviados em sequência são processados juntos.
         transaction.on_commit(
-            lambda: run_automacao_ipiranga_task.delay(certificado_instance.id)  # type: ignore[reportUnknownMemberType]
+            lambda: agendar_automacao_veiculo(certificado_instance.veiculo_id)  # type: ignore[reportUnknownMemberType, reportAttributeAccessIssue]
         )
     else:
         logger.info(
@@ -0,0 +1,169 @@
+"""Canal de mudanças de status dos certificados para o dashboard (Server-Sent Events).
+
+Cada transição de status (reserva pela fila, adiamento, envio, falhas) publica o
+novo estado dos certificados no canal Redis `CANAL_STATUS`, após o commit. A view
+de streaming assina o canal e repassa ao navegador apenas os certificados que ele
+acompanha, numa única conexão por cliente.
+
+Sem `IPIRANGA_STATUS_REDIS_URL` (ou com o Redis indisponível), a view consulta o
+banco a cada `IPIRANGA_STATUS_STREAM_POLL_INTERVAL` segundos: uma consulta por
+cliente para todos os seus certificados, em vez de uma requisição por certificado.
+
+Os geradores são assíncronos e só rodam sob ASGI; sob WSGI o dashboard consulta o
+lote por `check_certificates_status_view`.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncIterator, Iterable
+from contextlib import aclosing
+from typing import Any
+
+import redis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from apps.automacao_ipiranga.models import CertificadoVeiculo
+
+logger = logging.getLogger(__name__)
+
+CANAL_STATUS = "automacao_ipiranga:status"
+ESTADOS_EM_ANDAMENTO = frozenset({"pendente", "processando"})
+# Intervalo máximo sem envio; mantém a conexão viva através de proxies.
+INTERVALO_HEARTBEAT = 15  # seconds
+
+_cliente_publicacao: redis.Redis | None = None
+
+
+def _consultar(certificado_ids: Iterable[int]) -> list[dict[str, Any]]:
+    """Estado atual dos certificados, no formato de `check_certificate_status_view`."""
+    return [
+        {
+            "id": linha["id"],
+            "status": linha["status"],
+            "error_message": linha["error_message"] or "",
+            "placa": linha["veiculo__placa"],
+        }
+        for linha in CertificadoVeiculo.objects.filter(
+            pk__in=list(certificado_ids)
+        ).values("id", "status", "error_message", "veiculo__placa")
+    ]
+
+
+def _publicar(certificado_ids: list[int]) -> None:
+    global _cliente_publicacao  # noqa: PLW0603
+    try:
+        if _cliente_publicacao is None:
+            _cliente_publicacao = redis.Redis.from_url(
+                settings.IPIRANGA_STATUS_REDIS_URL
+            )
+        with _cliente_publicacao.pipeline(transaction=False) as pipe:
+            for evento in _consultar(certificado_ids):
+                pipe.publish(CANAL_STATUS, json.dumps(evento))
+            pipe.execute()
+    except RedisError as e:
+        logger.warning(
+            f"[STATUS_STREAM] Falha ao publicar status dos certificados {certificado_ids}: {e}"
+        )
+
+
+def publicar_status(certificado_ids: Iterable[int]) -> None:
+    """Publica o status atual dos certificados, após o commit da transação corrente."""
+    ids = list(certificado_ids)
+    if ids and settings.IPIRANGA_STATUS_REDIS_URL:
+        transaction.on_commit(lambda: _publicar(ids))
+
+
+async def _por_redis(
+    certificado_ids: set[int], ate: float
+) -> AsyncIterator[dict[str, Any] | None]:
+    cliente = Redis.from_url(settings.IPIRANGA_STATUS_REDIS_URL)
+    pubsub = cliente.pubsub(ignore_subscribe_messages=True)
+    try:
+        await pubsub.subscribe(CANAL_STATUS)
+        # Estado inicial lido após a assinatura: nenhuma transição fica no intervalo.
+        for evento in await sync_to_async(_consultar)(certificado_ids):
+            yield evento
+        while time.monotonic() < ate:
+            mensagem = await pubsub.get_message(
+                timeout=min(INTERVALO_HEARTBEAT, max(ate - time.monotonic(), 0))
+            )
+            if mensagem is None:
+                yield None
+                continue
+            evento = json.loads(mensagem["data"])
+            if evento["id"] in certificado_ids:
+                yield evento
+    finally:
+        await pubsub.aclose()
+        await cliente.aclose()
+
+
+async def _por_consulta(
+    certificado_ids: set[int], ate: float
+) -> AsyncIterator[dict[str, Any] | None]:
+    while True:
+        for evento in await sync_to_async(_consultar)(certificado_ids):
+            yield evento
+        if time.monotonic() >= ate:
+            return
+        yield None
+        await asyncio.sleep(settings.IPIRANGA_STATUS_STREAM_POLL_INTERVAL)
+
+
+async def _fonte_eventos(
+    certificado_ids: set[int], ate: float
+) -> AsyncIterator[dict[str, Any] | None]:
+    """Eventos do canal Redis ou, sem ele, das consultas periódicas ao banco."""
+    if settings.IPIRANGA_STATUS_REDIS_URL:
+        try:
+            async with aclosing(_por_redis(certificado_ids, ate)) as eventos:
+                async for evento in eventos:
+                    yield evento
+            return
+        except RedisError as e:
+            logger.warning(
+                f"[STATUS_STREAM] Redis indisponível ({e}); consultando o banco periodicamente."
+            )
+    async with aclosing(_por_consulta(certificado_ids, ate)) as eventos:
+        async for evento in eventos:
+            yield evento
+
+
+async def acompanhar_status(
+    certificado_ids: Iterable[int],
+) -> AsyncIterator[dict[str, Any] | None]:
+    """Gera o estado inicial e as mudanças de status dos certificados informados.
+
+    Cada certificado é emitido uma vez por status (repetições são descartadas). O
+    gerador termina quando nenhum certificado está em andamento ou após
+    `IPIRANGA_STATUS_STREAM_MAX_DURATION` segundos; None indica apenas que
+    `INTERVALO_HEARTBEAT` segundos se passaram sem mudanças.
+
+    Args:
+        certificado_ids: IDs dos CertificadoVeiculo acompanhados.
+    """
+    ids = set(certificado_ids)
+    ate = time.monotonic() + settings.IPIRANGA_STATUS_STREAM_MAX_DURATION
+    estados: dict[int, str] = {}
+    ultimo_envio = time.monotonic()
+
+    async with aclosing(_fonte_eventos(ids, ate)) as eventos:
+        async for evento in eventos:
+            if evento is not None and estados.get(evento["id"]) != evento["status"]:
+                estados[evento["id"]] = evento["status"]
+                ultimo_envio = time.monotonic()
+                yield evento
+            elif time.monotonic() - ultimo_envio >= INTERVALO_HEARTBEAT:
+                ultimo_envio = time.monotonic()
+                yield None
+            if estados and not ESTADOS_EM_ANDAMENTO.intersection(estados.values()):
+                return
+            if not estados and evento is None:
+                # Nenhum dos IDs existe: não há o que acompanhar.
+                return
@@ -1,14 +1,26 @@
 """Tarefas Celery para o aplicativo automacao_ipiranga."""
 
-import asyncio
 import logging
+from datetime import timedelta
+from typing import Any
 
 from celery import Celery
 from celery.app.task import Task
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
 
+from apps.automacao_ipiranga.browser_pool import (
+    run_in_worker_loop,
+    shutdown_browser_pool,
+)
 from apps.automacao_ipiranga.management.commands.automacao_documentos_ipiranga import (
+    AutomacaoAdiadaError,
     Command as AutomacaoIpirangaCommand,
 )
+from apps.automacao_ipiranga.models import CertificadoVeiculo, VeiculoIpiranga
+from apps.automacao_ipiranga.prioridade import prioridade_veiculo
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +29,19 @@ app.config_from_object("django.conf:settings", namespace="CELERY")  # type: igno
 app.autodiscover_tasks()  # type: ignore[reportUnknownMemberType]
 
 
+@worker_process_shutdown.connect  # type: ignore[reportUnknownMemberType]
+def encerrar_browser_pool(**kwargs: Any) -> None:  # noqa: ANN401
+    """Fecha os navegadores do pool quando o processo worker é finalizado."""
+    shutdown_browser_pool()
+
+
 @app.task(bind=True)  # type: ignore[reportUnknownMemberType]
 def run_automacao_ipiranga_task(self: Task, certificado_veiculo_id: int) -> None:  # type: ignore[reportUnknownParameterType, reportMissingTypeArgument] # Celery Task typing workaround
     """Executa a tarefa de automação Ipiranga para um certificado de veículo específico.
 
+    A execução ocorre no event loop persistente do processo worker, reutilizando os
+    navegadores do pool entre tarefas.
+
     Args:
         self: A instância da tarefa Celery.
         certificado_veiculo_id: O ID do CertificadoVeiculo a ser processado.
@@ -31,34 +52,153 @@ def run_automacao_ipiranga_task(self: Task, certificado_veiculo_id: int) -> None
     try:
         # Instancia o comando e executa a lógica principal
         command_instance = AutomacaoIpirangaCommand()
-        asyncio.run(command_instance.handle_async(certificado_veiculo_id))
+        run_in_worker_loop(command_instance.handle_async(certificado_veiculo_id))
         logger.info(
             f"Tarefa Celery concluída para CertificadoVeiculo ID: {certificado_veiculo_id}"
         )
+    except AutomacaoAdiadaError as e:
+        # Portal indisponível: repete mais tarde sem consumir tentativas.
+        logger.warning(
+            f"Tarefa Celery adiada para CertificadoVeiculo ID: {certificado_veiculo_id}: {e}"
+        )
+        if not settings.CELERY_TASK_ALWAYS_EAGER:
+            raise self.retry(countdown=e.retry_em, max_retries=None) from e
     except Exception as e:
         logger.error(
             f"Erro na tarefa Celery para CertificadoVeiculo ID: {certificado_veiculo_id}: {e}",
             exc_info=True,
         )
 
-    """Executa a tarefa de automação Ipiranga para um certificado de veículo específico.
+
+@app.task(bind=True)  # type: ignore[reportUnknownMemberType]
+def run_automacao_ipiranga_lote_task(
+    self: Task, certificado_veiculo_ids: list[int]
+) -> None:  # type: ignore[reportUnknownParameterType, reportMissingTypeArgument] # Celery Task typing workaround
+    """Executa vários certificados em paralelo no mesmo processo worker.
+
+    Cada certificado roda em seu próprio BrowserContext, limitados por
+    `IPIRANGA_CONCURRENT_CERTIFICATES`; a falha de um não afeta os demais.
 
     Args:
         self: A instância da tarefa Celery.
-        certificado_veiculo_id: O ID do CertificadoVeiculo a ser processado.
+        certificado_veiculo_ids: Os IDs dos CertificadoVeiculo a serem processados.
     """
     logger.info(
-        f"Iniciando tarefa Celery para CertificadoVeiculo ID: {certificado_veiculo_id}"
+        f"Iniciando tarefa Celery em lote para CertificadoVeiculo IDs: {certificado_veiculo_ids}"
+    )
+    command_instance = AutomacaoIpirangaCommand()
+    falhas = run_in_worker_loop(
+        command_instance.handle_many_async(certificado_veiculo_ids)
+    )
+    for certificado_veiculo_id, erro in falhas.items():
+        logger.error(
+            f"Erro na tarefa Celery em lote para CertificadoVeiculo ID: {certificado_veiculo_id}: {erro}"
+        )
+
+
+def agendar_automacao_veiculo(veiculo_id: int, atraso: float | None = None) -> bool:
+    """Agenda uma visita ao veículo, agrupando os certificados enviados em sequência.
+
+    O primeiro certificado pendente agenda a tarefa com atraso de
+    `IPIRANGA_VEHICLE_BATCH_WINDOW` segundos (ou `atraso`, quando informado); os
+    seguintes, enquanto a visita não terminar, apenas entram no mesmo lote. Retorna
+    se uma nova tarefa foi agendada.
+    """
+    atraso = settings.IPIRANGA_VEHICLE_BATCH_WINDOW if atraso is None else atraso
+    agora = timezone.now()
+    # A marca expira sozinha se o worker morrer antes de concluir a visita.
+    expiracao = agora - timedelta(seconds=int(atraso) + settings.CELERY_TASK_TIME_LIMIT)
+    # UPDATE condicional: entre processos concorrentes, apenas um agenda a visita.
+    agendada = (
+        VeiculoIpiranga.objects.filter(pk=veiculo_id)
+        .filter(
+            Q(visita_agendada_em__isnull=True) | Q(visita_agendada_em__lt=expiracao)
+        )
+        .update(visita_agendada_em=agora)
     )
+    if not agendada:
+        logger.info(
+            f"Veículo ID {veiculo_id} já possui visita agendada; certificado incluído no lote."
+        )
+        return False
+    liberar_visita_veiculo_task.apply_async(  # type: ignore[reportFunctionMemberAccess]
+        (veiculo_id,), countdown=atraso
+    )
+    return True
+
+
+@app.task  # type: ignore[reportUnknownMemberType]
+def agendar_veiculos_task(veiculo_ids: list[int]) -> None:
+    """Agenda as visitas dos veículos de um envio em lote, fora da requisição web.
+
+    Args:
+        veiculo_ids: Os IDs dos VeiculoIpiranga com certificados recém-criados.
+    """
+    for veiculo_id in veiculo_ids:
+        agendar_automacao_veiculo(veiculo_id)
+
+
+@app.task  # type: ignore[reportUnknownMemberType]
+def liberar_visita_veiculo_task(veiculo_id: int) -> None:
+    """Ao fim da janela de agrupamento, enfileira a visita pela urgência do veículo.
+
+    Tarefas com countdown ficam retidas no worker até o horário e ignoram as filas de
+    prioridade do broker; por isso a janela é cumprida por esta tarefa leve, e a
+    visita entra na fila já sem atraso, com a prioridade do certificado pendente
+    mais urgente (inclusive os que chegaram durante a janela).
+
+    Args:
+        veiculo_id: O ID do VeiculoIpiranga a ser visitado.
+    """
+    prioridade = prioridade_veiculo(veiculo_id)
+    logger.info(
+        f"Visita ao veículo ID {veiculo_id} enfileirada com prioridade {prioridade}."
+    )
+    run_automacao_ipiranga_veiculo_task.apply_async(  # type: ignore[reportFunctionMemberAccess]
+        (veiculo_id,), priority=prioridade
+    )
+
+
+@app.task(bind=True)  # type: ignore[reportUnknownMemberType]
+def run_automacao_ipiranga_veiculo_task(self: Task, veiculo_id: int) -> None:  # type: ignore[reportUnknownParameterType, reportMissingTypeArgument] # Celery Task typing workaround
+    """Envia todos os certificados pendentes de um veículo em uma única visita ao portal.
+
+    Certificados criados durante a visita não agendam outra tarefa (a marca
+    `visita_agendada_em` ainda existe); ao final, se restarem pendentes, uma nova visita é
+    agendada para eles.
+
+    Args:
+        self: A instância da tarefa Celery.
+        veiculo_id: O ID do VeiculoIpiranga a ser processado.
+    """
+    logger.info(f"Iniciando tarefa Celery para VeiculoIpiranga ID: {veiculo_id}")
+    command_instance = AutomacaoIpirangaCommand()
+    atraso: float | None = None
     try:
-        # Instancia o comando e executa a lógica principal
-        command_instance = AutomacaoIpirangaCommand()
-        asyncio.run(command_instance.handle_async(certificado_veiculo_id))
+        certificado_ids = run_in_worker_loop(
+            command_instance.handle_veiculo_async(veiculo_id)
+        )
         logger.info(
-            f"Tarefa Celery concluída para CertificadoVeiculo ID: {certificado_veiculo_id}"
+            f"Tarefa Celery concluída para VeiculoIpiranga ID: {veiculo_id} (certificados {certificado_ids})"
+        )
+    except AutomacaoAdiadaError as e:
+        logger.warning(
+            f"Tarefa Celery adiada para VeiculoIpiranga ID: {veiculo_id}: {e}"
         )
+        atraso = e.retry_em
     except Exception as e:
         logger.error(
-            f"Erro na tarefa Celery para CertificadoVeiculo ID: {certificado_veiculo_id}: {e}",
+            f"Erro na tarefa Celery para VeiculoIpiranga ID: {veiculo_id}: {e}",
             exc_info=True,
         )
+    finally:
+        VeiculoIpiranga.objects.filter(pk=veiculo_id).update(visita_agendada_em=None)
+        # Em modo eager o countdown é ignorado: reagendar um adiamento entraria em laço.
+        reagendar = atraso is None or not settings.CELERY_TASK_ALWAYS_EAGER
+        if (
+            reagendar
+            and CertificadoVeiculo.objects.filter(
+                veiculo_id=veiculo_id, status="pendente"
+            ).exists()
+        ):
+            agendar_automacao_veiculo(veiculo_id, atraso)
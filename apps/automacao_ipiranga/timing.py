@@ -0,0 +1,181 @@
+"""Cronometragem por etapa das execuções da automação Ipiranga.
+
+Cada etapa de `_run_automation_steps` vira um span (início relativo, duração,
+sucesso) persistido em `LogExecucaoAutomacao.detalhes_json`, junto com as esperas
+de prontidão da página. `percentis_por_etapa` agrega esses spans em p50/p95.
+"""
+
+import logging
+import math
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any
+
+from django.utils import timezone
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from apps.automacao_documentos.models import Automacao, LogExecucaoAutomacao
+from apps.automacao_ipiranga.readiness import MedicaoEspera
+from apps.common.deadline import Deadline, DeadlineExcedidoError
+
+NOME_AUTOMACAO = "automacao_documentos_ipiranga"
+
+
+@dataclass(frozen=True)
+class SpanEtapa:
+    """Duração de uma etapa da automação, relativa ao início da execução."""
+
+    etapa: str
+    inicio_ms: float
+    duracao_ms: float
+    sucesso: bool
+
+
+@dataclass
+class CronometroExecucao:
+    """Registra os spans das etapas e as esperas de uma execução."""
+
+    spans: list[SpanEtapa] = field(default_factory=list[SpanEtapa])
+    esperas: list[MedicaoEspera] = field(default_factory=list[MedicaoEspera])
+    inicio: float = field(default_factory=time.perf_counter)
+    data_inicio: datetime = field(default_factory=timezone.now)
+    deadline: Deadline | None = None
+
+    @contextmanager
+    def etapa(self, nome: str) -> Iterator[None]:
+        """Cronometra o bloco como a etapa `nome` (inclusive se falhar ou expirar).
+
+        Com um `deadline`, a etapa não começa se o prazo já se esgotou, e um timeout
+        causado pelo fim do prazo é relançado como `DeadlineExcedidoError(nome)`.
+        """
+        if self.deadline is not None:
+            self.deadline.verificar(nome)
+        inicio = time.perf_counter()
+        sucesso = False
+        try:
+            yield
+            sucesso = True
+        except DeadlineExcedidoError as e:
+            if e.etapa.startswith(nome):
+                raise
+            etapa = f"{nome}/{e.etapa}" if e.etapa else nome
+            raise DeadlineExcedidoError(etapa, e.total) from e
+        except (PlaywrightTimeoutError, TimeoutError) as e:
+            if self.deadline is not None and self.deadline.esgotado():
+                raise DeadlineExcedidoError(nome, self.deadline.total) from e
+            raise
+        finally:
+            self.spans.append(
+                SpanEtapa(
+                    etapa=nome,
+                    inicio_ms=round((inicio - self.inicio) * 1000, 1),
+                    duracao_ms=round((time.perf_counter() - inicio) * 1000, 1),
+                    sucesso=sucesso,
+                )
+            )
+
+    def duracao_total_ms(self) -> float:
+        """Tempo decorrido desde o início da execução."""
+        return round((time.perf_counter() - self.inicio) * 1000, 1)
+
+    def como_json(self, certificado_ids: list[int]) -> dict[str, Any]:
+        """Representação gravada em `detalhes_json`."""
+        return {
+            "certificado_ids": certificado_ids,
+            "duracao_total_ms": self.duracao_total_ms(),
+            "spans": [asdict(s) for s in self.spans],
+            "esperas": [asdict(m) for m in self.esperas],
+        }
+
+    def resumo(self) -> str:
+        """Spans na ordem de execução, para o log."""
+        return ", ".join(
+            f"{s.etapa}={s.duracao_ms:.0f}ms" + ("" if s.sucesso else "(falhou)")
+            for s in self.spans
+        )
+
+
+def registrar_execucao(
+    cronometro: CronometroExecucao,
+    certificado_ids: list[int],
+    status: str,
+    mensagem: str = "",
+) -> LogExecucaoAutomacao:
+    """Grava a execução (uma visita ao veículo) e seus spans como um `LogExecucaoAutomacao`."""
+    automacao, _ = Automacao.objects.get_or_create(
+        nome=NOME_AUTOMACAO, defaults={"comando_django": NOME_AUTOMACAO}
+    )
+    log = LogExecucaoAutomacao.objects.create(
+        automacao=automacao,
+        data_fim=timezone.now(),
+        status=status,
+        mensagem=mensagem,
+        detalhes_json=cronometro.como_json(certificado_ids),
+    )
+    # `data_inicio` é auto_now_add; corrige para o início real da execução.
+    LogExecucaoAutomacao.objects.filter(pk=log.pk).update(
+        data_inicio=cronometro.data_inicio
+    )
+    return log
+
+
+def registrar_execucao_segura(
+    cronometro: CronometroExecucao,
+    certificado_ids: list[int],
+    status: str,
+    mensagem: str,
+    logger: logging.Logger,
+) -> None:
+    """Como `registrar_execucao`, mas uma falha ao gravar não afeta a automação."""
+    try:
+        registrar_execucao(cronometro, certificado_ids, status, mensagem)
+    except Exception as e:
+        logger.warning(
+            f"[TEMPOS] Não foi possível registrar os tempos do(s) certificado(s) ID {certificado_ids}: {e}"
+        )
+
+
+@dataclass(frozen=True)
+class EstatisticaEtapa:
+    """Distribuição das durações de uma etapa."""
+
+    amostras: int
+    p50_ms: float
+    p95_ms: float
+    max_ms: float
+
+
+def _percentil(valores_ordenados: list[float], p: float) -> float:
+    """Percentil pelo método nearest-rank."""
+    posicao = max(1, math.ceil(p * len(valores_ordenados)))
+    return valores_ordenados[posicao - 1]
+
+
+def percentis_por_etapa(
+    detalhes: Iterable[dict[str, Any] | None], chave: str = "spans"
+) -> dict[str, EstatisticaEtapa]:
+    """Agrega p50/p95 por etapa a partir de vários `detalhes_json`.
+
+    Args:
+        detalhes: Conteúdos de `LogExecucaoAutomacao.detalhes_json`.
+        chave: "spans" para as etapas ou "esperas" para as esperas de prontidão.
+    """
+    duracoes: defaultdict[str, list[float]] = defaultdict(list)
+    for detalhe in detalhes:
+        for item in (detalhe or {}).get(chave, []):
+            duracoes[str(item["etapa"])].append(float(item["duracao_ms"]))
+
+    estatisticas: dict[str, EstatisticaEtapa] = {}
+    for etapa, valores in duracoes.items():
+        valores.sort()
+        estatisticas[etapa] = EstatisticaEtapa(
+            amostras=len(valores),
+            p50_ms=_percentil(valores, 0.50),
+            p95_ms=_percentil(valores, 0.95),
+            max_ms=valores[-1],
+        )
+    return estatisticas
@@ -8,3 +8,9 @@ class CommonConfig(AppConfig):
 
     default_auto_field = "django.db.models.BigAutoField"  # type: ignore
     name = "apps.common"
+
+    def ready(self) -> None:  # noqa: PLR6301
+        """Valida as configurações do limitador de taxa do Portran."""
+        from apps.common.rate_limit import validar_configuracao  # noqa: PLC0415
+
+        validar_configuracao()
@@ -0,0 +1,119 @@
+"""Circuit breaker das falhas de login e navegação no portal Portran.
+
+Após `PORTRAN_CIRCUIT_FAILURE_THRESHOLD` falhas consecutivas o circuito abre por
+`PORTRAN_CIRCUIT_COOLDOWN` segundos: novas execuções são adiadas sem abrir o
+navegador nem consumir tentativas. Ao fim do intervalo o circuito fica meio aberto e
+libera uma execução de sonda por vez; o sucesso da sonda fecha o circuito e a falha
+o reabre. O estado fica no cache do Django, compartilhado entre workers quando o
+backend é o Redis.
+"""
+
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from playwright.async_api import Error as PlaywrightError
+
+from apps.common.deadline import DeadlineExcedidoError
+
+logger = logging.getLogger(__name__)
+
+CHAVE_FALHAS = "portran:circuito:falhas"
+CHAVE_ABERTO_ATE = "portran:circuito:aberto_ate"
+CHAVE_SONDA = "portran:circuito:sonda"
+
+# Erros que indicam indisponibilidade do portal (rede, timeouts, páginas que não
+# carregam). `expect()` do Playwright falha com AssertionError; o cancelamento vem
+# do prazo da visita esgotado. Erros locais (credenciais ausentes, dados inválidos)
+# não contam.
+ERROS_DO_PORTAL: tuple[type[BaseException], ...] = (
+    PlaywrightError,
+    TimeoutError,
+    AssertionError,
+    DeadlineExcedidoError,
+    asyncio.CancelledError,
+)
+
+
+class CircuitoAbertoError(Exception):
+    """O portal está indisponível; a execução deve ser repetida mais tarde."""
+
+    def __init__(self, retry_em: float) -> None:
+        """Inicializa o erro com o número de segundos até a próxima tentativa."""
+        self.retry_em = max(1.0, retry_em)
+        super().__init__(
+            f"Portal Portran indisponível (circuito aberto); nova tentativa em {self.retry_em:.0f}s."
+        )
+
+
+async def verificar_circuito_portran() -> bool:
+    """Verifica se uma nova execução pode acessar o portal.
+
+    Returns:
+        True se a execução é a sonda do circuito meio aberto; False se o circuito
+        está fechado.
+
+    Raises:
+        CircuitoAbertoError: Se o circuito está aberto, ou meio aberto com outra
+            sonda em andamento.
+    """
+    aberto_ate = await cache.aget(CHAVE_ABERTO_ATE)
+    if aberto_ate is None:
+        return False
+    restante = float(aberto_ate) - time.time()
+    if restante > 0:
+        raise CircuitoAbertoError(restante)
+    if await cache.aadd(CHAVE_SONDA, 1, timeout=settings.PORTRAN_CIRCUIT_PROBE_TIMEOUT):
+        logger.info("[CIRCUITO] Circuito meio aberto: liberando execução de sonda.")
+        return True
+    raise CircuitoAbertoError(settings.PORTRAN_CIRCUIT_COOLDOWN / 4)
+
+
+async def liberar_sonda() -> None:
+    """Libera a vaga de sonda de uma execução que terminou sem resultado do portal.
+
+    Sem isso, uma sonda encerrada antes de acessar o portal (ex.: placa ocupada,
+    validação) adiaria todas as execuções por `PORTRAN_CIRCUIT_PROBE_TIMEOUT`.
+    """
+    await cache.adelete(CHAVE_SONDA)
+
+
+async def _abrir_circuito() -> None:
+    cooldown = settings.PORTRAN_CIRCUIT_COOLDOWN
+    # A chave sobrevive ao cooldown para que o fim dele leve ao estado meio aberto.
+    await cache.aset(
+        CHAVE_ABERTO_ATE,
+        time.time() + cooldown,
+        timeout=cooldown + settings.PORTRAN_CIRCUIT_PROBE_TIMEOUT * 10,
+    )
+    await cache.adelete(CHAVE_SONDA)
+    logger.error(f"[CIRCUITO] Circuito aberto por {cooldown}s após falhas do portal.")
+
+
+async def registrar_falha_portal(sonda: bool = False) -> None:
+    """Registra uma falha de login/navegação, abrindo o circuito se necessário."""
+    if sonda:
+        await _abrir_circuito()
+        return
+    await cache.aadd(CHAVE_FALHAS, 0, timeout=settings.PORTRAN_CIRCUIT_COOLDOWN * 10)
+    try:
+        falhas = await cache.aincr(CHAVE_FALHAS)
+    except ValueError:
+        # A chave expirou entre o add e o incr.
+        falhas = 1
+        await cache.aset(
+            CHAVE_FALHAS, falhas, timeout=settings.PORTRAN_CIRCUIT_COOLDOWN * 10
+        )
+    logger.warning(f"[CIRCUITO] Falha do portal ({falhas} consecutiva(s)).")
+    if falhas >= settings.PORTRAN_CIRCUIT_FAILURE_THRESHOLD:
+        await _abrir_circuito()
+        await cache.adelete(CHAVE_FALHAS)
+
+
+async def registrar_sucesso_portal() -> None:
+    """Registra login e navegação bem-sucedidos, fechando o circuito."""
+    if await cache.aget(CHAVE_ABERTO_ATE) is not None:
+        logger.info("[CIRCUITO] Portal respondeu normalmente; circuito fechado.")
+    await cache.adelete_many([CHAVE_FALHAS, CHAVE_ABERTO_ATE, CHAVE_SONDA])
@@ -0,0 +1,59 @@
+"""Prazo (deadline) propagado pelas etapas de uma automação.
+
+Em vez de cada chamada do Playwright usar seu próprio timeout fixo (60 s), todas
+recebem no máximo o tempo restante do prazo da execução, descontada uma reserva
+para a limpeza (screenshot, gravação de status). Assim uma etapa lenta falha cedo,
+com um erro que a identifica, em vez de consumir o orçamento inteiro.
+"""
+
+import time
+from dataclasses import dataclass, field
+
+
+class DeadlineExcedidoError(Exception):
+    """O prazo da execução se esgotou durante a etapa indicada."""
+
+    def __init__(self, etapa: str, total: float) -> None:
+        """Inicializa o erro com a etapa responsável e o prazo total, em segundos."""
+        self.etapa = etapa
+        self.total = total
+        super().__init__(
+            f"Prazo de {total:.0f}s da automação esgotado na etapa '{etapa or 'desconhecida'}'."
+        )
+
+
+@dataclass
+class Deadline:
+    """Prazo de uma execução, medido no relógio monotônico."""
+
+    total: float
+    reserva: float = 0.0
+    inicio: float = field(default_factory=time.monotonic)
+
+    def restante(self) -> float:
+        """Segundos disponíveis para as etapas (já descontada a reserva)."""
+        return self.inicio + self.total - self.reserva - time.monotonic()
+
+    def esgotado(self) -> bool:
+        """Indica se não resta tempo para as etapas."""
+        return self.restante() <= 0
+
+    def verificar(self, etapa: str) -> None:
+        """Falha imediatamente se não houver tempo para iniciar a etapa."""
+        if self.esgotado():
+            raise DeadlineExcedidoError(etapa, self.total)
+
+    def timeout_ms(self, maximo_ms: float, etapa: str = "") -> float:
+        """Timeout para uma chamada: o menor entre `maximo_ms` e o tempo restante.
+
+        Nunca retorna 0, que o Playwright interpreta como "sem timeout".
+        """
+        restante_ms = self.restante() * 1000
+        if restante_ms <= 0:
+            raise DeadlineExcedidoError(etapa, self.total)
+        return min(maximo_ms, restante_ms)
+
+
+def limite_ms(deadline: Deadline | None, maximo_ms: float, etapa: str = "") -> float:
+    """Como `Deadline.timeout_ms`, aceitando a ausência de prazo."""
+    return maximo_ms if deadline is None else deadline.timeout_ms(maximo_ms, etapa)
@@ -0,0 +1,73 @@
+"""Primitivas de sincronização compartilhadas entre os aplicativos."""
+
+import asyncio
+import time
+import uuid
+import weakref
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+# asyncio.Lock fica associado ao event loop em que é usado; mantém um lock por
+# (loop, nome) para que corrotinas concorrentes do mesmo processo se coordenem.
+_locks_por_loop: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, asyncio.Lock]
+] = weakref.WeakKeyDictionary()
+
+
+def lock_do_loop(nome: str) -> asyncio.Lock:
+    """Retorna o asyncio.Lock identificado por `nome` no event loop atual."""
+    locks = _locks_por_loop.setdefault(asyncio.get_running_loop(), {})
+    lock = locks.get(nome)
+    if lock is None:
+        lock = locks[nome] = asyncio.Lock()
+    return lock
+
+
+class LeaseOcupadoError(Exception):
+    """O recurso já está reservado por outra execução."""
+
+    def __init__(self, chave: str, restante: float) -> None:
+        """Inicializa o erro com os segundos até o lease atual expirar."""
+        self.chave = chave
+        self.restante = max(1.0, restante)
+        super().__init__(
+            f"Recurso '{chave}' reservado por outra execução (expira em {self.restante:.0f}s)."
+        )
+
+
+@dataclass(frozen=True)
+class Lease:
+    """Reserva exclusiva e temporária de um recurso, identificada por um token."""
+
+    chave: str
+    token: str
+
+    async def liberar(self) -> None:
+        """Libera a reserva, se ela ainda pertencer a este lease.
+
+        O cache do Django não oferece compare-and-delete; entre a leitura e a remoção
+        só outro lease adquirido após a expiração deste poderia ser afetado, o que
+        exigiria a execução ultrapassar o TTL.
+        """
+        valor = await cache.aget(self.chave)
+        if valor is not None and valor[0] == self.token:
+            await cache.adelete(self.chave)
+
+
+async def adquirir_lease(chave: str, ttl: float) -> Lease:
+    """Reserva o recurso `chave` por até `ttl` segundos.
+
+    A reserva fica no cache do Django: com o backend Redis ela vale para todos os
+    workers; com o cache em memória, apenas para o processo atual. Ela expira sozinha
+    se o processo morrer sem liberá-la.
+
+    Raises:
+        LeaseOcupadoError: Se outro lease válido já reserva o recurso.
+    """
+    token = uuid.uuid4().hex
+    if await cache.aadd(chave, (token, time.time() + ttl), timeout=ttl):
+        return Lease(chave, token)
+    valor = await cache.aget(chave)
+    restante = float(valor[1]) - time.time() if valor is not None else 0.0
+    raise LeaseOcupadoError(chave, restante)
@@ -0,0 +1,125 @@
+"""Cache de sessões autenticadas do portal Portran/Ipiranga.
+
+Após um login bem-sucedido o `storage_state` do Playwright é persistido em disco e
+reaproveitado pelas execuções seguintes. O login completo só é refeito quando a
+sessão em cache expira (redirecionamento para fora do dashboard).
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, cast
+
+from django.conf import settings
+from filelock import AsyncFileLock
+from playwright.async_api import Page
+
+from apps.common.deadline import Deadline, limite_ms
+from apps.common.locks import lock_do_loop
+from apps.common.rate_limit import aguardar_vez_portran
+from apps.common.services import login_to_portran
+
+if TYPE_CHECKING:
+    from playwright._impl._api_structures import SetCookieParam
+
+
+def _caminho_sessao() -> Path:
+    return Path(settings.PORTRAN_SESSION_STATE_PATH)
+
+
+def _carregar_storage_state() -> dict[str, Any] | None:
+    """Lê o storage_state em cache, ignorando-o se estiver além do TTL."""
+    caminho = _caminho_sessao()
+    try:
+        idade = time.time() - caminho.stat().st_mtime
+        if idade > settings.PORTRAN_SESSION_TTL:
+            return None
+        return json.loads(caminho.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _salvar_storage_state(storage_state: dict[str, Any]) -> None:
+    """Grava o storage_state de forma atômica para não expor arquivos parciais."""
+    caminho = _caminho_sessao()
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+    temporario.write_text(json.dumps(storage_state), encoding="utf-8")
+    os.replace(temporario, caminho)
+
+
+def invalidar_sessao_portran() -> None:
+    """Remove a sessão em cache, forçando um novo login na próxima execução."""
+    _caminho_sessao().unlink(missing_ok=True)
+
+
+async def _aplicar_sessao(
+    page: Page,
+    storage_state: dict[str, Any],
+    logger: logging.Logger,
+    deadline: Deadline | None = None,
+) -> bool:
+    """Aplica os cookies em cache ao contexto e verifica se a sessão ainda é válida."""
+    await page.context.add_cookies(
+        cast("list[SetCookieParam]", storage_state.get("cookies", []))
+    )
+    await page.goto(
+        settings.IPIRANGA_DASHBOARD_URL,
+        timeout=limite_ms(deadline, 60000, "sessao_em_cache"),
+    )
+    if page.url.startswith(settings.IPIRANGA_DASHBOARD_URL):
+        logger.info("[SESSAO] Sessão Portran em cache reutilizada.")
+        return True
+
+    logger.info(
+        f"[SESSAO] Sessão Portran em cache expirada (redirecionado para {page.url})."
+    )
+    await page.context.clear_cookies()
+    return False
+
+
+async def garantir_sessao_portran(
+    page: Page, logger: logging.Logger, deadline: Deadline | None = None
+) -> None:
+    """Garante que o contexto da página esteja autenticado no portal Portran.
+
+    Reutiliza a sessão em cache quando possível. Quando é preciso autenticar, apenas
+    um worker por vez executa o login; os demais aguardam e reaproveitam a sessão
+    recém-gravada em vez de submeter o formulário de login ao mesmo tempo.
+
+    Com um `deadline`, a espera pelo lock e as navegações ficam limitadas ao tempo
+    restante do prazo da execução.
+    """
+    storage_state = _carregar_storage_state()
+    if storage_state and await _aplicar_sessao(page, storage_state, logger, deadline):
+        return
+
+    caminho_lock = _caminho_sessao().with_suffix(".lock")
+    caminho_lock.parent.mkdir(parents=True, exist_ok=True)
+    # O lock de arquivo coordena processos diferentes, mas locks fcntl são por
+    # processo: corrotinas concorrentes do mesmo processo usam o lock do loop.
+    async with (
+        lock_do_loop("sessao_portran"),
+        AsyncFileLock(
+            str(caminho_lock),
+            timeout=limite_ms(
+                deadline, settings.PORTRAN_SESSION_LOCK_TIMEOUT * 1000, "lock_sessao"
+            )
+            / 1000,
+        ),
+    ):
+        # Outro worker pode ter renovado a sessão enquanto aguardávamos o lock.
+        storage_state_atual = _carregar_storage_state()
+        if (
+            storage_state_atual
+            and storage_state_atual != storage_state
+            and await _aplicar_sessao(page, storage_state_atual, logger, deadline)
+        ):
+            return
+
+        await aguardar_vez_portran("login")
+        await login_to_portran(page, logger, deadline)
+        _salvar_storage_state(cast(dict[str, Any], await page.context.storage_state()))
+        logger.info("[SESSAO] Nova sessão Portran gravada em cache.")
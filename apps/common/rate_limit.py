@@ -0,0 +1,251 @@
+"""Limitador de taxa (token bucket) compartilhado para as requisições ao Portran.
+
+Logins e navegações consomem fichas de baldes separados. Com
+`PORTRAN_RATE_LIMIT_REDIS_URL` configurado, os baldes ficam no Redis e são
+compartilhados por todos os workers Celery (a reposição usa o relógio do Redis, via
+script Lua atômico); sem ele, cada processo usa um balde em memória.
+
+A taxa efetiva é a taxa base multiplicada por um fator adaptativo (AIMD): cada
+página de erro do portal reduz o fator pela metade e cada resposta bem-sucedida o
+aumenta um pouco, convergindo para a maior vazão que o portal sustenta.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+PREFIXO_CHAVE = "portran:rate_limit"
+TTL_CHAVES = 3600
+# Piso da taxa efetiva: evita divisão por zero e esperas infinitas.
+TAXA_MINIMA = 0.001  # fichas/s
+
+# Reserva uma ficha (o saldo pode ficar negativo) e retorna a espera em ms até a
+# vez do chamador, de modo que as esperas sejam enfileiradas sem novas tentativas.
+_LUA_RESERVAR = """
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local fator = tonumber(redis.call('HGET', KEYS[2], 'fator') or '1')
+local taxa = math.max(tonumber(ARGV[4]), tonumber(ARGV[1]) * fator)
+local capacidade = tonumber(ARGV[2])
+local estado = redis.call('HMGET', KEYS[1], 'fichas', 'ts')
+local fichas = tonumber(estado[1]) or capacidade
+local ts = tonumber(estado[2]) or agora
+fichas = math.min(capacidade, fichas + math.max(0, agora - ts) * taxa) - 1
+redis.call('HSET', KEYS[1], 'fichas', tostring(fichas), 'ts', tostring(agora))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+if fichas >= 0 then
+    return 0
+end
+return math.ceil(-fichas / taxa * 1000)
+"""
+
+# Ajuste AIMD do fator: ARGV[1] = 'erro' | 'sucesso'.
+_LUA_AJUSTAR = """
+local t = redis.call('TIME')
+local agora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local estado = redis.call('HMGET', KEYS[1], 'fator', 'reduzido_em')
+local fator = tonumber(estado[1]) or 1
+local reduzido_em = tonumber(estado[2]) or 0
+if ARGV[1] == 'erro' then
+    if agora - reduzido_em >= tonumber(ARGV[5]) then
+        fator = math.max(tonumber(ARGV[4]), fator * tonumber(ARGV[2]))
+        reduzido_em = agora
+    end
+else
+    fator = math.min(1, fator + tonumber(ARGV[3]))
+end
+redis.call('HSET', KEYS[1], 'fator', tostring(fator), 'reduzido_em', tostring(reduzido_em))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[6]))
+return tostring(fator)
+"""
+
+
+@dataclass(frozen=True)
+class ConfiguracaoBalde:
+    """Taxa base (fichas/s) e capacidade de rajada de um balde."""
+
+    taxa: float
+    capacidade: float
+
+
+def validar_configuracao() -> None:
+    """Valida as configurações do limitador (chamada na inicialização do app).
+
+    Raises:
+        ImproperlyConfigured: Se uma taxa, capacidade ou parâmetro AIMD for inválido.
+    """
+    if not settings.PORTRAN_RATE_LIMIT_ENABLED:
+        return
+    erros = [
+        f"{nome} deve ser maior que zero (atual: {getattr(settings, nome)})."
+        for nome in (
+            "PORTRAN_LOGIN_RATE",
+            "PORTRAN_NAVIGATION_RATE",
+            "PORTRAN_RATE_MIN_FACTOR",
+            "PORTRAN_RATE_DECREASE",
+        )
+        if getattr(settings, nome) <= 0
+    ]
+    erros.extend(
+        f"{nome} deve ser no mínimo 1 (atual: {getattr(settings, nome)})."
+        for nome in ("PORTRAN_LOGIN_BURST", "PORTRAN_NAVIGATION_BURST")
+        if getattr(settings, nome) < 1
+    )
+    if settings.PORTRAN_RATE_MIN_FACTOR > 1 or settings.PORTRAN_RATE_DECREASE >= 1:
+        erros.append(
+            "PORTRAN_RATE_MIN_FACTOR deve ser no máximo 1 e PORTRAN_RATE_DECREASE menor que 1."
+        )
+    if settings.PORTRAN_RATE_INCREASE < 0:
+        erros.append("PORTRAN_RATE_INCREASE não pode ser negativo.")
+    if erros:
+        raise ImproperlyConfigured("[RATE_LIMIT] " + " ".join(erros))
+
+
+def _baldes() -> dict[str, ConfiguracaoBalde]:
+    return {
+        "login": ConfiguracaoBalde(
+            settings.PORTRAN_LOGIN_RATE, settings.PORTRAN_LOGIN_BURST
+        ),
+        "navegacao": ConfiguracaoBalde(
+            settings.PORTRAN_NAVIGATION_RATE, settings.PORTRAN_NAVIGATION_BURST
+        ),
+    }
+
+
+class _LimitadorMemoria:
+    """Implementação por processo, para testes e ambientes sem Redis."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._fichas: dict[str, tuple[float, float]] = {}
+        self.fator = 1.0
+        self._reduzido_em = 0.0
+
+    def reservar(self, tipo: str, balde: ConfiguracaoBalde) -> float:
+        """Reserva uma ficha e retorna a espera em segundos."""
+        with self._lock:
+            agora = time.monotonic()
+            taxa = max(balde.taxa * self.fator, TAXA_MINIMA)
+            fichas, ts = self._fichas.get(tipo, (balde.capacidade, agora))
+            fichas = min(balde.capacidade, fichas + (agora - ts) * taxa) - 1
+            self._fichas[tipo] = (fichas, agora)
+            return 0.0 if fichas >= 0 else -fichas / taxa
+
+    def ajustar(self, erro: bool) -> float:
+        """Aplica o ajuste AIMD ao fator e o retorna."""
+        with self._lock:
+            agora = time.monotonic()
+            if not erro:
+                self.fator = min(1.0, self.fator + settings.PORTRAN_RATE_INCREASE)
+            elif agora - self._reduzido_em >= settings.PORTRAN_RATE_DECREASE_COOLDOWN:
+                self.fator = max(
+                    settings.PORTRAN_RATE_MIN_FACTOR,
+                    self.fator * settings.PORTRAN_RATE_DECREASE,
+                )
+                self._reduzido_em = agora
+            return self.fator
+
+
+_limitador_memoria = _LimitadorMemoria()
+# Conexões do redis.asyncio ficam presas ao event loop em que foram criadas.
+_clientes_por_loop: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Redis] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _cliente_redis() -> Redis | None:
+    url = settings.PORTRAN_RATE_LIMIT_REDIS_URL
+    if not url:
+        return None
+    loop = asyncio.get_running_loop()
+    cliente = _clientes_por_loop.get(loop)
+    if cliente is None:
+        cliente = _clientes_por_loop[loop] = Redis.from_url(url)
+    return cliente
+
+
+async def _reservar(tipo: str) -> float:
+    balde = _baldes()[tipo]
+    cliente = _cliente_redis()
+    if cliente is not None:
+        try:
+            espera_ms = await cliente.eval(  # type: ignore[reportGeneralTypeIssues]
+                _LUA_RESERVAR,
+                2,
+                f"{PREFIXO_CHAVE}:{tipo}",
+                f"{PREFIXO_CHAVE}:fator",
+                balde.taxa,
+                balde.capacidade,
+                TTL_CHAVES,
+                TAXA_MINIMA,
+            )
+            return int(espera_ms) / 1000
+        except RedisError as e:
+            logger.warning(
+                f"[RATE_LIMIT] Redis indisponível ({e}); usando o limitador em memória."
+            )
+    return _limitador_memoria.reservar(tipo, balde)
+
+
+async def aguardar_vez_portran(tipo: str = "navegacao") -> float:
+    """Aguarda a vez de enviar um login ou uma navegação ao portal.
+
+    Args:
+        tipo: "login" ou "navegacao".
+
+    Returns:
+        O tempo aguardado, em segundos.
+    """
+    if not settings.PORTRAN_RATE_LIMIT_ENABLED:
+        return 0.0
+    espera = await _reservar(tipo)
+    if espera > 0:
+        logger.debug(f"[RATE_LIMIT] Aguardando {espera:.2f}s ({tipo}).")
+        await asyncio.sleep(espera)
+    return espera
+
+
+async def _ajustar(erro: bool) -> float:
+    cliente = _cliente_redis()
+    if cliente is not None:
+        try:
+            fator = await cliente.eval(  # type: ignore[reportGeneralTypeIssues]
+                _LUA_AJUSTAR,
+                1,
+                f"{PREFIXO_CHAVE}:fator",
+                "erro" if erro else "sucesso",
+                settings.PORTRAN_RATE_DECREASE,
+                settings.PORTRAN_RATE_INCREASE,
+                settings.PORTRAN_RATE_MIN_FACTOR,
+                settings.PORTRAN_RATE_DECREASE_COOLDOWN,
+                TTL_CHAVES,
+            )
+            return float(fator)
+        except RedisError as e:
+            logger.warning(
+                f"[RATE_LIMIT] Redis indisponível ({e}); usando o limitador em memória."
+            )
+    return _limitador_memoria.ajustar(erro)
+
+
+async def registrar_erro_portran() -> None:
+    """Reduz a taxa após uma página de erro ou resposta 5xx do portal."""
+    if settings.PORTRAN_RATE_LIMIT_ENABLED:
+        fator = await _ajustar(erro=True)
+        logger.warning(f"[RATE_LIMIT] Erro do portal; fator de taxa em {fator:.2f}.")
+
+
+async def registrar_sucesso_portran() -> None:
+    """Recupera gradualmente a taxa após uma resposta bem-sucedida do portal."""
+    if settings.PORTRAN_RATE_LIMIT_ENABLED:
+        await _ajustar(erro=False)
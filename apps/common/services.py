@@ -4,11 +4,15 @@ import asyncio
 import logging
 import re
 from dataclasses import dataclass
+from datetime import date, datetime
 
 from decouple import config
 from django.conf import settings
 from playwright.async_api import Page, expect
 
+from apps.common.deadline import Deadline, limite_ms
+from apps.common.rate_limit import registrar_erro_portran, registrar_sucesso_portran
+
 EXPECTED_DATE_LENGTH = 8
 
 
@@ -21,9 +25,23 @@ class ExtractedCertificateData:
     numero_certificado: str
     data_vencimento_formatada: str
 
+    @property
+    def data_vencimento(self) -> date | None:
+        """Data de vencimento como `date`, ou None se não for uma data válida."""
+        try:
+            return datetime.strptime(self.data_vencimento_formatada, "%d/%m/%Y").date()
+        except ValueError:
+            return None
+
+
+async def login_to_portran(
+    page: Page, logger: logging.Logger, deadline: Deadline | None = None
+) -> None:
+    """Realiza o login no portal Portran/Ipiranga de forma centralizada e robusta.
 
-async def login_to_portran(page: Page, logger: logging.Logger) -> None:
-    """Realiza o login no portal Portran/Ipiranga de forma centralizada e robusta."""
+    Com um `deadline`, cada chamada do Playwright usa no máximo o tempo restante do
+    prazo da execução, em vez dos timeouts fixos.
+    """
     logger.info("--- Iniciando etapa de login centralizada ---")
 
     portran_user = config("PORTRAN_USER")
@@ -39,12 +57,14 @@ async def login_to_portran(page: Page, logger: logging.Logger) -> None:
         logger.info("Navegando para a página de login...")
         await page.goto(
             settings.IPIRANGA_LOGIN_URL,
-            timeout=60000,
+            timeout=limite_ms(deadline, 60000, "login"),
         )
 
         logger.info("Aguardando seletor de usuário.")
         user_selector = page.locator("#codigoUsuario")
-        await user_selector.wait_for(state="visible", timeout=60000)
+        await user_selector.wait_for(
+            state="visible", timeout=limite_ms(deadline, 60000, "login")
+        )
 
         logger.info("Preenchendo usuário...")
         await user_selector.fill(str(portran_user))
@@ -61,7 +81,8 @@ async def login_to_portran(page: Page, logger: logging.Logger) -> None:
             logger.info("Aguardando redirecionamento para o dashboard...")
             await expect(page).to_have_url(
                 settings.IPIRANGA_DASHBOARD_URL,
-                timeout=15000,  # Timeout reduzido para falhar rápido
+                # Timeout reduzido para falhar rápido
+                timeout=limite_ms(deadline, 15000, "login"),
             )
         except Exception:
             logger.warning(
@@ -76,11 +97,15 @@ async def login_to_portran(page: Page, logger: logging.Logger) -> None:
                 logger.warning(
                     "Detectada página de 'Erro Inesperado'. Tentando recuperar a sessão..."
                 )
-                await asyncio.sleep(
-                    5
-                )  # Pausa estratégica para aguardar a estabilização da sessão após erro inesperado.
+                # O portal está sobrecarregado: reduz a taxa de todos os workers.
+                await registrar_erro_portran()
+                # Pausa estratégica para aguardar a estabilização da sessão após erro inesperado.
+                await asyncio.sleep(min(5, limite_ms(deadline, 5000, "login") / 1000))
                 logger.info("Atualizando a página para tentar autenticar a sessão.")
-                await page.reload(wait_until="domcontentloaded")
+                await page.reload(
+                    wait_until="domcontentloaded",
+                    timeout=limite_ms(deadline, 30000, "login"),
+                )
 
                 # Tenta verificar o URL do dashboard novamente após o reload
                 logger.info(
@@ -88,7 +113,7 @@ async def login_to_portran(page: Page, logger: logging.Logger) -> None:
                 )
                 await expect(page).to_have_url(
                     settings.IPIRANGA_DASHBOARD_URL,
-                    timeout=60000,
+                    timeout=limite_ms(deadline, 60000, "login"),
                 )
             else:
                 logger.error(
@@ -97,16 +122,23 @@ async def login_to_portran(page: Page, logger: logging.Logger) -> None:
                 raise  # Re-levanta a exceção original se o erro não for o esperado
         # --- Fim da Lógica de Resiliência ---
 
+        await registrar_sucesso_portran()
         logger.info("Login realizado com sucesso!")
         logger.info("--- Fim da etapa de login ---")
 
     except Exception as e:
         logger.error(f"Falha na etapa de login: {e}")
         screenshot_path = settings.BASE_DIR / "logs" / "login_error_screenshot.png"
-        await page.screenshot(path=screenshot_path)
-        logger.error(
-            "Screenshot de erro de login capturado em 'login_error_screenshot.png'."
-        )
+        try:
+            # Sem limitar ao prazo: o screenshot usa a reserva de limpeza.
+            await page.screenshot(path=screenshot_path, timeout=10000)
+            logger.error(
+                "Screenshot de erro de login capturado em 'login_error_screenshot.png'."
+            )
+        except Exception as screenshot_error:
+            logger.warning(
+                f"Não foi possível capturar o screenshot de login: {screenshot_error}"
+            )
         raise  # Re-levanta a exceção para que o comando que chamou saiba que falhou
 
 
@@ -1,6 +1,21 @@
 """Configurações de armazenamento de arquivos para o aplicativo common."""
 
+import contextlib
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from typing import IO, Any
+
+from django.core.files import File
 from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.http import HttpRequest
+
+# Subdiretório do storage que recebe os uploads em andamento.
+DIRETORIO_UPLOADS = ".uploads"
 
 
 class OriginalFilenameStorage(FileSystemStorage):
@@ -18,3 +33,152 @@ class OriginalFilenameStorage(FileSystemStorage):
         # ATENÇÃO: Isso significa que arquivos com o mesmo nome serão sobrescritos.
         # Este comportamento é intencional para permitir a substituição de certificados existentes.
         return name
+
+
+def sha256_do_conteudo(content: File) -> str:
+    """SHA-256 (hexadecimal) do conteúdo, lido em blocos; o arquivo volta ao início."""
+    digest = hashlib.sha256()
+    if content.seekable():
+        content.seek(0)
+    for bloco in content.chunks():
+        digest.update(bloco)
+    if content.seekable():
+        content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Storage endereçado pelo conteúdo: cada arquivo fica sob o seu SHA-256.
+
+    `upload_to/ab/<sha256>/<nome original>`: o nome original é mantido (é o nome
+    visto no upload ao portal), e arquivos distintos com o mesmo nome não se
+    sobrescrevem. O mesmo conteúdo enviado de novo sob outro nome ganha, no
+    diretório do hash, um hard link (ou cópia) com esse nome; sob o mesmo nome,
+    reutiliza o arquivo já gravado.
+    """
+
+    @staticmethod
+    def sha256_do_nome(name: str) -> str | None:
+        """SHA-256 do conteúdo a partir do nome gravado, ou None se não for endereçado."""
+        sha256 = os.path.basename(os.path.dirname(name))
+        return sha256 if re.fullmatch(r"[0-9a-f]{64}", sha256) else None
+
+    def _vincular(self, existente: str, nome: str) -> None:
+        """Cria `nome` com o conteúdo de `existente` (mesmo diretório de hash)."""
+        try:
+            os.link(self.path(existente), self.path(nome))
+        except FileExistsError:
+            # Upload concorrente do mesmo conteúdo com o mesmo nome.
+            return
+        except OSError:
+            shutil.copyfile(self.path(existente), self.path(nome))
+        if self.file_permissions_mode is not None:
+            os.chmod(self.path(nome), self.file_permissions_mode)
+
+    def save(
+        self, name: str | None, content: File | IO[bytes], max_length: int | None = None
+    ) -> str:
+        """Grava o conteúdo no diretório do seu hash, com o nome do upload.
+
+        Se o conteúdo já está gravado, nada é copiado: o nome do upload é o arquivo
+        existente (mesmo nome) ou um link para ele.
+        """
+        if name is None:
+            name = str(content.name)
+        arquivo = content if isinstance(content, File) else File(content, name)
+        sha256 = getattr(arquivo, "sha256", "") or sha256_do_conteudo(arquivo)
+        diretorio, nome_arquivo = os.path.split(name)
+        diretorio_hash = os.path.join(diretorio, sha256[:2], sha256)
+        nome = os.path.join(diretorio_hash, nome_arquivo)
+        if self.exists(diretorio_hash):
+            _, existentes = self.listdir(diretorio_hash)
+            if nome_arquivo in existentes:
+                return nome
+            if existentes:
+                nome = self.get_available_name(nome, max_length)
+                self._vincular(
+                    os.path.join(diretorio_hash, sorted(existentes)[0]), nome
+                )
+                return nome
+        return super().save(nome, arquivo, max_length)
+
+
+class UploadEnderecado(UploadedFile):
+    """Upload gravado em um arquivo temporário dentro do storage, com o seu SHA-256."""
+
+    def __init__(
+        self,
+        name: str,
+        content_type: str | None,
+        charset: str | None,
+        content_type_extra: dict[str, Any] | None,
+        diretorio: str,
+    ) -> None:
+        """Cria o arquivo temporário em `diretorio`."""
+        _, ext = os.path.splitext(name)
+        arquivo = tempfile.NamedTemporaryFile(suffix=".upload" + ext, dir=diretorio)  # noqa: SIM115
+        super().__init__(arquivo, name, content_type, 0, charset, content_type_extra)
+        self.sha256 = ""
+
+    def temporary_file_path(self) -> str:
+        """Caminho do arquivo temporário (movido, e não copiado, por `save`)."""
+        return self.file.name  # type: ignore[reportOptionalMemberAccess]
+
+    def close(self) -> None:
+        """Fecha o arquivo, que pode já ter sido movido para o destino."""
+        with contextlib.suppress(FileNotFoundError):
+            self.file.close()  # type: ignore[reportOptionalMemberAccess]
+
+
+class ArquivoEnderecadoUploadHandler(FileUploadHandler):
+    """Grava os blocos de cada arquivo enviado direto no storage, calculando o hash.
+
+    Os blocos vão para `DIRETORIO_UPLOADS`, no mesmo sistema de arquivos do storage,
+    à medida que o multipart é lido (nada fica em memória). Assim,
+    `ContentAddressedStorage.save` apenas renomeia o arquivo para o diretório do seu
+    hash, sem copiá-lo nem relê-lo.
+    """
+
+    def __init__(
+        self,
+        request: HttpRequest | None = None,
+        storage: FileSystemStorage | None = None,
+    ) -> None:
+        """Usa `storage` (por padrão, um `ContentAddressedStorage`) como destino."""
+        super().__init__(request)
+        self.storage = storage or ContentAddressedStorage()
+        self.digest = hashlib.sha256()
+
+    def new_file(self, *args: Any, **kwargs: Any) -> None:  # noqa: ANN401
+        """Abre o arquivo temporário do novo upload."""
+        super().new_file(*args, **kwargs)
+        diretorio = self.storage.path(DIRETORIO_UPLOADS)
+        os.makedirs(diretorio, exist_ok=True)
+        self.file = UploadEnderecado(
+            str(self.file_name),
+            self.content_type,
+            self.charset,
+            self.content_type_extra,
+            diretorio,
+        )
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data: bytes, start: int) -> None:
+        """Grava o bloco recebido e o inclui no hash."""
+        self.file.write(raw_data)
+        self.digest.update(raw_data)
+
+    def file_complete(self, file_size: int) -> UploadEnderecado:
+        """Devolve o upload completo, já com tamanho e SHA-256."""
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.digest.hexdigest()
+        return self.file
+
+    def upload_interrupted(self) -> None:
+        """Remove o arquivo temporário de um upload interrompido."""
+        if hasattr(self, "file"):
+            caminho = self.file.temporary_file_path()
+            with contextlib.suppress(FileNotFoundError):
+                self.file.close()
+                os.remove(caminho)
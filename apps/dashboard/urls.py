@@ -14,4 +14,14 @@ urlpatterns = [
         views.check_certificate_status_view,
         name="check_certificate_status",
     ),
+    path(
+        "check-certificates-status/",
+        views.check_certificates_status_view,
+        name="check_certificates_status",
+    ),
+    path(
+        "certificate-status-stream/",
+        views.certificate_status_stream_view,
+        name="certificate_status_stream",
+    ),
 ]
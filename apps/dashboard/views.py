@@ -1,26 +1,102 @@
 """Views para o aplicativo dashboard."""
 
+import hashlib
+import json
 import logging
-from typing import Any
+from collections.abc import AsyncIterator
+from typing import Any, cast
 
-from django.http import HttpRequest, HttpResponse, JsonResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import FileField
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.middleware.csrf import CsrfViewMiddleware
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.csrf import csrf_exempt
 
-from apps.automacao_ipiranga.models import CertificadoVeiculo, VeiculoIpiranga
-from apps.common.services import (
-    extract_certificate_data_from_filename,
-)  # Importar a função
+from apps.automacao_ipiranga.ingestao import ingerir_certificados
+from apps.automacao_ipiranga.models import CertificadoVeiculo
+from apps.automacao_ipiranga.status_stream import (
+    ESTADOS_EM_ANDAMENTO,
+    acompanhar_status,
+)
+from apps.common.storage import ArquivoEnderecadoUploadHandler
 
 logger = logging.getLogger(__name__)
 
+# Limite de certificados por consulta em lote ou conexão de streaming.
+MAX_CERTIFICADOS_POR_CONSULTA = 200
+
+
+def _ids_da_requisicao(request: HttpRequest) -> list[int] | None:
+    """IDs de certificado em `?ids=1,2,3`, ou None se inválidos ou em excesso."""
+    try:
+        certificado_ids = sorted({
+            int(valor) for valor in request.GET.get("ids", "").split(",") if valor
+        })
+    except ValueError:
+        return None
+    if not certificado_ids or len(certificado_ids) > MAX_CERTIFICADOS_POR_CONSULTA:
+        return None
+    return certificado_ids
+
+
+def _erro_ids() -> JsonResponse:
+    return JsonResponse(
+        {
+            "error": f"Informe de 1 a {MAX_CERTIFICADOS_POR_CONSULTA} IDs de certificado válidos em ?ids=."
+        },
+        status=400,
+    )
+
 
 def orchestra_view(request: HttpRequest) -> HttpResponse:
     """Renderiza a página principal do dashboard."""
     return render(request, "dashboard/orchestra.html", {})
 
 
-def process_documents_view(request: HttpRequest) -> JsonResponse:
-    """Processa o upload de documentos e inicia a automação."""
+def _sem_resposta(request: HttpRequest) -> HttpResponse:
+    # `CsrfViewMiddleware` exige um `get_response`; só `process_view` é usado.
+    raise NotImplementedError
+
+
+def _verificar_csrf(request: HttpRequest) -> HttpResponse | None:
+    """Verificação do `CsrfViewMiddleware`; a resposta 403, se rejeitada."""
+    return CsrfViewMiddleware(_sem_resposta).process_view(request, None, (), {})
+
+
+@csrf_exempt
+async def process_documents_view(request: HttpRequest) -> HttpResponse:
+    """Processa o upload de documentos e inicia a automação.
+
+    Assíncrona: sob ASGI, o corpo da requisição é recebido sem ocupar uma thread. Os
+    arquivos são gravados em blocos direto no storage dos certificados
+    (`ArquivoEnderecadoUploadHandler`), que depois só os renomeia para o diretório
+    do hash.
+
+    O handler precisa ser instalado antes de o corpo ser lido. A verificação de
+    CSRF lê `request.POST` (o multipart inteiro, com a gravação dos blocos), por
+    isso roda aqui, em uma thread, e não no middleware nem em `csrf_protect`, que a
+    executariam no event loop.
+    """
+    campo = cast(FileField, CertificadoVeiculo._meta.get_field("arquivo"))
+    request.upload_handlers = [
+        ArquivoEnderecadoUploadHandler(request, storage=campo.storage)  # type: ignore[reportArgumentType]
+    ]
+    rejeicao = await sync_to_async(_verificar_csrf)(request)
+    if rejeicao is not None:
+        return rejeicao
+    return await _processar_documentos(request)
+
+
+async def _processar_documentos(request: HttpRequest) -> JsonResponse:
     logger.info(f"[POST] process_documents_view foi chamada. Método: {request.method}")
     logger.debug(
         "[%s] Requisição recebida para process_documents_view.", request.method
@@ -28,97 +104,62 @@ def process_documents_view(request: HttpRequest) -> JsonResponse:
 
     if request.method == "POST":
         logger.debug("[POST] Iniciando processamento de arquivos.")
-        uploaded_files: list[Any] = request.FILES.getlist("documents")
+        # O multipart normalmente já foi lido pela verificação de CSRF; se não foi
+        # (checagem desativada nos testes), o parser síncrono roda aqui, em thread.
+        uploaded_files: list[Any] = await sync_to_async(
+            lambda: request.FILES.getlist("documents")
+        )()
 
         if not uploaded_files:
             logger.warning("[POST] Nenhum arquivo enviado.")
             return JsonResponse({"error": "Nenhum arquivo enviado."}, status=400)
 
         processed_info: list[dict[str, Any]] = []
-        for uploaded_file in uploaded_files:
-            file_name: str = uploaded_file.name
-            logger.info(f"[POST] Processando arquivo: {file_name}")
-            logger.debug(
-                f"[POST] Tentando extrair placa e tipo de licença de: {file_name}"
-            )
-
-            placa: str | None = None
-            nome_certificado: str | None = None
-            status: str = "erro"
-
-            try:
-                # Extrai todos os dados necessários do nome do arquivo
-                # Esta função já valida o formato e levanta ValueError se inválido
-                extracted_data = extract_certificate_data_from_filename(
-                    file_name, logger
-                )
-                placa = extracted_data.placa
-                nome_certificado = extracted_data.tipo_licenca
-                numero_certificado = extracted_data.numero_certificado
-                vencimento_valor_portal = extracted_data.data_vencimento_formatada
-
-                logger.info(
-                    f"[POST] Placa extraída: {placa}, Tipo de Licença (Certificado): {nome_certificado}"
-                )
-
-                logger.debug(
-                    f"[POST] Tentando obter ou criar VeiculoIpiranga com placa: {placa}"
-                )
-                veiculo: VeiculoIpiranga  # type: ignore[reportUnknownVariableType]
-                created_veiculo: bool
-                veiculo, created_veiculo = VeiculoIpiranga.objects.get_or_create(  # type: ignore[reportUnknownMemberType]
-                    placa=placa, defaults={}
-                )
-                logger.debug(
-                    f"[POST] Resultado VeiculoIpiranga: veiculo={veiculo.placa}, created={created_veiculo}"  # type: ignore[reportUnknownMemberType]
-                )
-
-                certificado: CertificadoVeiculo = CertificadoVeiculo.objects.create(  # type: ignore[reportAssignmentType]
-                    veiculo=veiculo,
-                    nome=nome_certificado,
-                    arquivo=uploaded_file,
-                    status="pendente",
-                )
-                logger.info(
-                    f"[POST] Novo CertificadoVeiculo criado. ID: {certificado.id}"
-                )
-
-                logger.info(
-                    f"[POST] Certificado {nome_certificado} para {placa} salvo. ID: {certificado.id}"
-                )
-                status = f"Certificado {nome_certificado} para {placa} salvo com ID: {certificado.id} e status: {certificado.status}"
-                logger.info(f"[POST] Status final do certificado: {status}")
-
-                processed_info.append({
-                    "id": certificado.id if certificado else None,
-                    "file_name": file_name,
-                    "placa": placa,
-                    "nome_certificado": nome_certificado,
-                    "status": status,
-                    "numero_certificado": numero_certificado,
-                    "vencimento_valor_portal": vencimento_valor_portal,
-                })
-
-            except ValueError as ve:
-                logger.warning(f"[POST] Erro de validação do nome do arquivo: {ve}")
+        for resultado in await ingerir_certificados(uploaded_files, logger):
+            dados = resultado.dados
+            certificado = resultado.certificado
+            if resultado.status == "erro_validacao" or dados is None:
                 processed_info.append({
                     "id": None,
-                    "file_name": file_name,
+                    "file_name": resultado.file_name,
                     "placa": None,
                     "nome_certificado": None,
                     "status": "erro_validacao",
-                    "error_message": str(ve),
+                    "error_message": resultado.error_message,
                 })
-            except Exception as e:
-                error_msg = f"Erro CRÍTICO ao salvar certificado no banco de dados: {e}"
-                logger.critical(f"[POST] {error_msg}", exc_info=True)
+            elif certificado is None:
                 processed_info.append({
                     "id": None,
-                    "file_name": file_name,
-                    "placa": placa,
-                    "nome_certificado": nome_certificado,
+                    "file_name": resultado.file_name,
+                    "placa": dados.placa,
+                    "nome_certificado": dados.tipo_licenca,
                     "status": "erro_interno",
-                    "error_message": error_msg,
+                    "error_message": resultado.error_message,
+                })
+            elif resultado.status == "duplicado":
+                status = f"Certificado {dados.tipo_licenca} para {dados.placa} já registrado com ID: {certificado.id} e status: {certificado.status} (arquivo idêntico); nenhum novo envio ao portal."
+                logger.info(f"[POST] {status}")
+                processed_info.append({
+                    "id": certificado.id,
+                    "file_name": resultado.file_name,
+                    "placa": dados.placa,
+                    "nome_certificado": dados.tipo_licenca,
+                    "status": status,
+                    "duplicado": True,
+                    "numero_certificado": dados.numero_certificado,
+                    "vencimento_valor_portal": dados.data_vencimento_formatada,
+                })
+            else:
+                status = f"Certificado {dados.tipo_licenca} para {dados.placa} salvo com ID: {certificado.id} e status: {certificado.status}"
+                logger.info(f"[POST] {status}")
+                processed_info.append({
+                    "id": certificado.id,
+                    "file_name": resultado.file_name,
+                    "placa": dados.placa,
+                    "nome_certificado": dados.tipo_licenca,
+                    "status": status,
+                    "numero_certificado": dados.numero_certificado,
+                    "vencimento_valor_portal": dados.data_vencimento_formatada,
                 })
 
         logger.info("[POST] Processamento de arquivos concluído.")
@@ -133,13 +174,16 @@ def process_documents_view(request: HttpRequest) -> JsonResponse:
         return JsonResponse({"error": "Método não permitido."}, status=405)
 
 
-def check_certificate_status_view(
+async def check_certificate_status_view(
     request: HttpRequest, certificate_id: int
 ) -> JsonResponse:
     """Retorna o status de um CertificadoVeiculo."""
     certificado: CertificadoVeiculo | None = None
     try:
-        certificado = CertificadoVeiculo.objects.get(pk=certificate_id)  # type: ignore[reportAssignmentType]
+        # select_related: `certificado.veiculo` não pode disparar consulta síncrona.
+        certificado = await CertificadoVeiculo.objects.select_related("veiculo").aget(  # type: ignore[reportAssignmentType]
+            pk=certificate_id
+        )
         response_data: dict[str, Any] = {
             "id": certificado.id if certificado else None,
             "status": certificado.status if certificado else None,
@@ -160,3 +204,90 @@ def check_certificate_status_view(
             f"Erro ao buscar status do certificado {certificate_id}: {e}", exc_info=True
         )
         return JsonResponse({"error": "Erro interno do servidor."}, status=500)
+
+
+async def check_certificates_status_view(request: HttpRequest) -> HttpResponse:
+    """Retorna o status de vários CertificadoVeiculo (`?ids=1,2,3`) em uma consulta.
+
+    A resposta traz um ETag e um Last-Modified agregados do lote; requisições com
+    `If-None-Match` (ou `If-Modified-Since`) de um lote inalterado recebem 304 sem
+    corpo.
+    """
+    certificado_ids = _ids_da_requisicao(request)
+    if certificado_ids is None:
+        return _erro_ids()
+
+    certificados = [
+        certificado
+        async for certificado in CertificadoVeiculo.objects.select_related("veiculo")
+        .filter(pk__in=certificado_ids)
+        .order_by("pk")
+    ]
+    encontrados = {certificado.id for certificado in certificados}
+    response_data: dict[str, Any] = {
+        "certificados": [
+            {
+                "id": certificado.id,
+                "status": certificado.status,
+                "error_message": certificado.error_message or "",
+                "placa": certificado.veiculo.placa,
+            }
+            for certificado in certificados
+        ],
+        "nao_encontrados": [i for i in certificado_ids if i not in encontrados],
+    }
+    response = JsonResponse(response_data)
+
+    # O ETag cobre o corpo inteiro; o Last-Modified é a última alteração do lote.
+    etag = quote_etag(hashlib.sha256(response.content).hexdigest()[:32])
+    atualizacoes = [c.data_atualizacao for c in certificados if c.data_atualizacao]
+    last_modified = int(max(atualizacoes).timestamp()) if atualizacoes else None
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # Força a revalidação a cada consulta, em vez de reaproveitar a resposta.
+    response["Cache-Control"] = "no-cache"
+    return get_conditional_response(
+        request, etag=etag, last_modified=last_modified, response=response
+    )
+
+
+def certificate_status_stream_view(
+    request: HttpRequest,
+) -> HttpResponse:
+    """Transmite (Server-Sent Events) as mudanças de status de vários certificados.
+
+    Os IDs vêm em `?ids=1,2,3`. Cada mudança é enviada como um evento `status` com
+    o mesmo corpo de `check_certificate_status_view`; quando nenhum certificado
+    está mais em andamento, um evento `fim` encerra o stream. Se a conexão cair
+    antes disso, o EventSource do navegador reconecta e recebe o estado atual.
+
+    Só é servido sob ASGI: sob WSGI, o Django consumiria o gerador assíncrono
+    inteiro antes de responder, com uma thread presa por conexão até
+    `IPIRANGA_STATUS_STREAM_MAX_DURATION`. Nesse caso a resposta é 204, que o
+    EventSource trata como falha definitiva (sem reconectar), e o dashboard passa a
+    usar `check_certificates_status_view`.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    certificado_ids = _ids_da_requisicao(request)
+    if certificado_ids is None:
+        return _erro_ids()
+
+    async def eventos() -> AsyncIterator[str]:
+        estados: dict[int, str] = {}
+        async for evento in acompanhar_status(certificado_ids):
+            if evento is None:
+                yield ": heartbeat\n\n"
+                continue
+            estados[evento["id"]] = evento["status"]
+            yield f"event: status\ndata: {json.dumps(evento)}\n\n"
+        if not ESTADOS_EM_ANDAMENTO.intersection(estados.values()):
+            yield "event: fim\ndata: {}\n\n"
+
+    response = StreamingHttpResponse(eventos(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Desativa o buffer de proxies (nginx), que atrasaria os eventos.
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -155,6 +155,18 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Cache
+# Use "django.core.cache.backends.redis.RedisCache" (ex.: redis://localhost:6379/1)
+# para compartilhar o cache entre os workers Celery.
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    }
+}
+
 # Celery Settings
 CELERY_BROKER_URL = config("CELERY_BROKER_URL", default="redis://localhost:6379/0")
 CELERY_RESULT_BACKEND = config(
@@ -178,7 +190,17 @@ CELERY_TASK_TIME_LIMIT = config(
 CELERY_TASK_SOFT_TIME_LIMIT = config(
     "CELERY_TASK_SOFT_TIME_LIMIT", default=240, cast=int
 )  # 4 minutes
-CELERY_BROKER_TRANSPORT_OPTIONS = {"visibility_timeout": 3600}  # 1 hour for Redis
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": 3600,  # 1 hour for Redis
+    # Filas por prioridade (0 = mais urgente), consumidas em ordem de prioridade
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+# Sem prioridade explícita o Redis usaria a fila 0, a mais urgente
+CELERY_TASK_DEFAULT_PRIORITY = 7
+# Cada processo reserva uma mensagem por vez, para não reter tarefas menos urgentes
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_WORKER_MAX_TASKS_PER_CHILD = config(
     "CELERY_WORKER_MAX_TASKS_PER_CHILD", default=100, cast=int
 )
@@ -206,6 +228,140 @@ IPIRANGA_DASHBOARD_URL = config(
 
 MAX_AUTOMATION_ATTEMPTS = config("MAX_AUTOMATION_ATTEMPTS", default=3, cast=int)
 
+# Cache de sessão autenticada do Portran (storage_state do Playwright)
+PORTRAN_SESSION_STATE_PATH = config(
+    "PORTRAN_SESSION_STATE_PATH",
+    default=str(BASE_DIR / ".sessions" / "portran_storage_state.json"),
+)
+PORTRAN_SESSION_TTL = config(
+    "PORTRAN_SESSION_TTL", default=1800, cast=int
+)  # 30 minutes
+PORTRAN_SESSION_LOCK_TIMEOUT = config(
+    "PORTRAN_SESSION_LOCK_TIMEOUT", default=120, cast=int
+)
+
+# Limitador de taxa (token bucket) das requisições ao Portran
+PORTRAN_RATE_LIMIT_ENABLED = config(
+    "PORTRAN_RATE_LIMIT_ENABLED", default=True, cast=bool
+)
+PORTRAN_RATE_LIMIT_REDIS_URL = config(
+    "PORTRAN_RATE_LIMIT_REDIS_URL", default=""
+)  # Vazio: balde em memória por processo (não compartilhado entre workers)
+PORTRAN_LOGIN_RATE = config("PORTRAN_LOGIN_RATE", default=0.2, cast=float)  # logins/s
+PORTRAN_LOGIN_BURST = config("PORTRAN_LOGIN_BURST", default=1, cast=float)
+PORTRAN_NAVIGATION_RATE = config(
+    "PORTRAN_NAVIGATION_RATE", default=2.0, cast=float
+)  # navegações/s
+PORTRAN_NAVIGATION_BURST = config("PORTRAN_NAVIGATION_BURST", default=4, cast=float)
+PORTRAN_RATE_DECREASE = config(
+    "PORTRAN_RATE_DECREASE", default=0.5, cast=float
+)  # Fator multiplicativo a cada página de erro
+PORTRAN_RATE_INCREASE = config(
+    "PORTRAN_RATE_INCREASE", default=0.02, cast=float
+)  # Incremento aditivo a cada resposta bem-sucedida
+PORTRAN_RATE_MIN_FACTOR = config("PORTRAN_RATE_MIN_FACTOR", default=0.1, cast=float)
+PORTRAN_RATE_DECREASE_COOLDOWN = config(
+    "PORTRAN_RATE_DECREASE_COOLDOWN", default=5, cast=float
+)  # seconds; erros simultâneos de vários workers contam como uma redução
+
+# Circuit breaker das falhas de login/navegação no Portran
+PORTRAN_CIRCUIT_FAILURE_THRESHOLD = config(
+    "PORTRAN_CIRCUIT_FAILURE_THRESHOLD", default=5, cast=int
+)  # Falhas consecutivas até abrir o circuito
+PORTRAN_CIRCUIT_COOLDOWN = config(
+    "PORTRAN_CIRCUIT_COOLDOWN", default=120, cast=int
+)  # seconds
+PORTRAN_CIRCUIT_PROBE_TIMEOUT = config(
+    "PORTRAN_CIRCUIT_PROBE_TIMEOUT", default=180, cast=int
+)  # seconds; libera outra sonda se a anterior não reportar resultado
+
+# Índice de placas das listagens Vencidos/À vencer
+IPIRANGA_PLATE_INDEX_TTL = config(
+    "IPIRANGA_PLATE_INDEX_TTL", default=600, cast=int
+)  # 10 minutes
+
+# Leitura das páginas somente-leitura (listagens) via HTTP, sem renderizar no navegador
+IPIRANGA_HTTP_SNAPSHOTS = config("IPIRANGA_HTTP_SNAPSHOTS", default=True, cast=bool)
+
+# Espera pela resposta do upload após "Enviar novo certificado"
+# Regex da URL do POST de upload (XHR do botão "Enviar novo certificado"). Vazio:
+# aguarda uma mudança no fieldset e o salvamento valida o envio.
+IPIRANGA_UPLOAD_RESPONSE_URL_PATTERN = config(
+    "IPIRANGA_UPLOAD_RESPONSE_URL_PATTERN", default=""
+)
+IPIRANGA_UPLOAD_RESPONSE_TIMEOUT = config(
+    "IPIRANGA_UPLOAD_RESPONSE_TIMEOUT", default=15000, cast=int
+)  # ms
+
+# Reserva do prazo de cada execução para screenshot e gravação de status; as etapas
+# usam no máximo o tempo restante do prazo descontada esta reserva
+IPIRANGA_DEADLINE_RESERVE = config(
+    "IPIRANGA_DEADLINE_RESERVE", default=10, cast=int
+)  # seconds
+
+# Validade dos certificados vencidos registrados em VeiculoIpiranga.status_documentos
+# para recusar, sem abrir o portal, visitas que não poderiam salvar o veículo
+IPIRANGA_PREFLIGHT_CACHE_TTL = config(
+    "IPIRANGA_PREFLIGHT_CACHE_TTL", default=1800, cast=int
+)  # seconds
+
+# Certificados executados em paralelo (um BrowserContext cada) por processo worker
+IPIRANGA_CONCURRENT_CERTIFICATES = config(
+    "IPIRANGA_CONCURRENT_CERTIFICATES", default=4, cast=int
+)
+
+# Janela para agrupar os certificados de um mesmo veículo em uma única visita
+IPIRANGA_VEHICLE_BATCH_WINDOW = config(
+    "IPIRANGA_VEHICLE_BATCH_WINDOW", default=10, cast=int
+)  # seconds
+
+# Despacho dos certificados pendentes: "celery" (sinal post_save agenda uma tarefa
+# por veículo) ou "fila" (o comando processar_fila_ipiranga reserva os pendentes
+# direto no banco, sem sinal nem broker)
+IPIRANGA_DISPATCH_MODE = config("IPIRANGA_DISPATCH_MODE", default="celery")
+IPIRANGA_QUEUE_BATCH_SIZE = config("IPIRANGA_QUEUE_BATCH_SIZE", default=20, cast=int)
+IPIRANGA_QUEUE_POLL_INTERVAL = config(
+    "IPIRANGA_QUEUE_POLL_INTERVAL", default=5, cast=float
+)  # seconds
+# Reservas mais antigas que isto (worker morto) voltam para a fila
+IPIRANGA_QUEUE_CLAIM_TIMEOUT = config(
+    "IPIRANGA_QUEUE_CLAIM_TIMEOUT", default=600, cast=int
+)  # seconds
+
+# Acompanhamento de status no dashboard (Server-Sent Events). Com a URL do Redis,
+# cada transição de status é publicada e enviada ao navegador na hora; vazio: a
+# conexão de cada cliente consulta o banco periodicamente
+IPIRANGA_STATUS_REDIS_URL = config("IPIRANGA_STATUS_REDIS_URL", default="")
+IPIRANGA_STATUS_STREAM_POLL_INTERVAL = config(
+    "IPIRANGA_STATUS_STREAM_POLL_INTERVAL", default=2, cast=float
+)  # seconds
+# O navegador reconecta sozinho (EventSource) ao fim deste prazo
+IPIRANGA_STATUS_STREAM_MAX_DURATION = config(
+    "IPIRANGA_STATUS_STREAM_MAX_DURATION", default=600, cast=int
+)  # seconds
+
+# Pool de navegadores (por processo worker)
+IPIRANGA_BROWSER_POOL_SIZE = config("IPIRANGA_BROWSER_POOL_SIZE", default=1, cast=int)
+IPIRANGA_BROWSER_MAX_USES = config(
+    "IPIRANGA_BROWSER_MAX_USES", default=50, cast=int
+)  # Recicla o navegador após N contextos entregues
+IPIRANGA_BROWSER_HEADLESS = config(
+    "IPIRANGA_BROWSER_HEADLESS", default=not DEBUG, cast=bool
+)  # Em desenvolvimento o navegador continua visível para depuração
+
+# Interceptação de requisições: recursos que a automação nunca lê
+IPIRANGA_BLOCKED_RESOURCE_TYPES = config(
+    "IPIRANGA_BLOCKED_RESOURCE_TYPES", default="image,font,media", cast=Csv()
+)
+IPIRANGA_BLOCKED_DOMAINS = config(
+    "IPIRANGA_BLOCKED_DOMAINS",
+    default="google-analytics.com,googletagmanager.com,doubleclick.net,hotjar.com,clarity.ms,facebook.net",
+    cast=Csv(),
+)
+IPIRANGA_REQUEST_STATS = config(
+    "IPIRANGA_REQUEST_STATS", default=False, cast=bool
+)  # Registra no log requisições bloqueadas e bytes recebidos por execução
+
 
 # MySQL Infractions Table
 MYSQL_INFRACOES_TABLE = config("MYSQL_INFRACOES_TABLE", default="tbl_infracoes_exemplo")
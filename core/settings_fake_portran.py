@@ -0,0 +1,47 @@
+"""Perfil de configurações que aponta a automação Ipiranga para o portal falso local.
+
+Uso:
+    python manage.py fake_portran_server
+    DJANGO_SETTINGS_MODULE=core.settings_fake_portran \
+        python manage.py benchmark_automacao_ipiranga
+"""
+
+import os
+
+from decouple import config
+
+from core.settings import *  # noqa: F403
+from core.settings import BASE_DIR
+
+FAKE_PORTRAN_URL = config("FAKE_PORTRAN_URL", default="http://127.0.0.1:8765").rstrip(
+    "/"
+)
+
+IPIRANGA_LOGIN_URL = f"{FAKE_PORTRAN_URL}/WAPortranNew/usuario/exibir"
+IPIRANGA_VENCIDOS_URL = (
+    f"{FAKE_PORTRAN_URL}/WAPortranNew/veiculo/index?situacoesDocumentos=2"
+)
+IPIRANGA_A_VENCER_URL = (
+    f"{FAKE_PORTRAN_URL}/WAPortranNew/veiculo/index?situacoesDocumentos=3"
+)
+IPIRANGA_DASHBOARD_URL = f"{FAKE_PORTRAN_URL}/WAPortranNew/dashboard/index"
+# Endpoint de upload do portal falso (`fake_portran.py`); o do portal real não é
+# conhecido, por isso não há valor padrão em `core.settings`.
+IPIRANGA_UPLOAD_RESPONSE_URL_PATTERN = r"/WAPortranNew/veiculo/certificado/"
+
+# Sessão e índice separados dos do portal real
+PORTRAN_SESSION_STATE_PATH = str(
+    BASE_DIR / ".sessions" / "fake_portran_storage_state.json"
+)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "fake-portran",
+    }
+}
+
+# O portal falso aceita quaisquer credenciais
+os.environ.setdefault("PORTRAN_USER", "usuario-falso")
+os.environ.setdefault("PORTRAN_PASSWORD", "senha-falsa")
+
+CELERY_TASK_ALWAYS_EAGER = True